@@ -0,0 +1,36 @@
+"""
+Move finished attempts older than a cutoff from `attempts` to `attempts_archive`, in small transactions, so the
+table the bot writes to stays small. Run it periodically, e.g. daily from cron:
+
+    python archive_attempts.py --older-than-days 90
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from database.database import SessionLocal
+from services import AttemptArchiveService
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=int, default=90)
+    parser.add_argument("--batch-size", type=int, default=1000, help="attempts moved per transaction")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+    archived = 0
+    while True:
+        with SessionLocal() as session:
+            moved = AttemptArchiveService(session).archive_batch(cutoff, args.batch_size)
+        if not moved:
+            break
+        archived += moved
+        print(f"Archived {archived} attempts...")
+    print(f"Done: {archived} attempts submitted before {cutoff:%Y-%m-%d} archived.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import math
+import re
+import time
+from typing import Any
+
+from langchain_core.callbacks import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_WORDS = ("array", "delegado", "clase", "método", "variable", "bucle", "lista", "interfaz", "objeto", "herencia",
+          "excepción", "cadena", "diccionario", "recursión", "función", "tipo", "valor", "referencia")
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model for benchmarks: the same prompt always gets the same answer, after a fixed latency.
+    Token usage is reported from the word counts so the LLM metrics and spans look like a real model's.
+    """
+
+    latency: float = 0.2
+    answer_words: int = 60
+    model_name: str = "fake-chat"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _response(self, messages: list[BaseMessage]) -> AIMessage:
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = _digest(prompt)
+        words = [_WORDS[digest[i % len(digest)] % len(_WORDS)] for i in range(self.answer_words)]
+        input_tokens = len(prompt.split())
+        return AIMessage(
+            content=" ".join(words),
+            usage_metadata={"input_tokens": input_tokens, "output_tokens": len(words),
+                            "total_tokens": input_tokens + len(words)},
+        )
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                  run_manager: CallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._response(messages))])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                         run_manager: AsyncCallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._response(messages))])
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, dimensions: int = 256, latency: float = 0.05):
+        """
+        Deterministic embeddings for benchmarks: hashed bag of words, so texts sharing words are close.
+
+        Args:
+            dimensions (int): Size of the vectors.
+            latency (float): Seconds every call takes, as a remote embedding API would.
+        """
+        self.dimensions = dimensions
+        self.latency = latency
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        for word in re.findall(r"\w+", text.lower()):
+            digest = _digest(word)
+            vector[int.from_bytes(digest[:4], "little") % self.dimensions] += 1.0 if digest[4] % 2 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+
+def synthetic_corpus(documents: int = 200, words: int = 300) -> list[str]:
+    """Deterministic pseudo-text standing in for the course PDFs."""
+    corpus = []
+    for index in range(documents):
+        digest = _digest(f"document-{index}")
+        corpus.append(" ".join(_WORDS[digest[i % len(digest)] * (i + 1) % len(_WORDS)] for i in range(words)))
+    return corpus
@@ -0,0 +1,65 @@
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from rag.intents import INTENTS, QUESTION
+
+
+@dataclass
+class LabeledMessage:
+    message: str
+    intent: str
+
+
+def load_labeled_messages(path: str) -> list[LabeledMessage]:
+    """Load the labeled set, a JSON list of {"message": "hola", "intent": "greeting"}."""
+    entries = json.loads(Path(path).read_text(encoding="utf-8"))
+    return [LabeledMessage(entry["message"], entry["intent"]) for entry in entries]
+
+
+def evaluate_classifier(classify: Callable[[str], str], messages: list[LabeledMessage]) -> dict:
+    """
+    Run a classifier over the labeled messages.
+
+    A false rejection is a question for the tutor that gets a canned answer instead, the costly mistake; a false
+    acceptance is a message that could have had a canned answer and goes to the RAG chain, which only costs time.
+
+    Returns:
+        dict: Accuracy, false rejection and acceptance rates, per-intent recall, per-message latency and the
+            misclassified messages.
+    """
+    predictions, latencies = [], []
+    for labeled in messages:
+        start = time.perf_counter()
+        predictions.append(classify(labeled.message))
+        latencies.append(time.perf_counter() - start)
+
+    questions = [(labeled, predicted) for labeled, predicted in zip(messages, predictions)
+                 if labeled.intent == QUESTION]
+    others = [(labeled, predicted) for labeled, predicted in zip(messages, predictions)
+              if labeled.intent != QUESTION]
+    latencies_us = np.array(latencies) * 1e6
+    return {
+        "messages": len(messages),
+        "accuracy": round(sum(labeled.intent == predicted
+                              for labeled, predicted in zip(messages, predictions)) / max(len(messages), 1), 4),
+        "false_rejection_rate": round(sum(predicted != QUESTION for _, predicted in questions)
+                                      / max(len(questions), 1), 4),
+        "false_acceptance_rate": round(sum(predicted == QUESTION for _, predicted in others) / max(len(others), 1), 4),
+        "recall": {
+            intent: round(sum(predicted == intent for labeled, predicted in zip(messages, predictions)
+                              if labeled.intent == intent)
+                          / count, 4)
+            for intent in INTENTS
+            if (count := sum(labeled.intent == intent for labeled in messages))
+        },
+        "latency_us": {"p50": round(float(np.percentile(latencies_us, 50)), 1),
+                       "p99": round(float(np.percentile(latencies_us, 99)), 1),
+                       "max": round(float(latencies_us.max()), 1)} if latencies else {},
+        "errors": [{"message": labeled.message, "expected": labeled.intent, "predicted": predicted}
+                   for labeled, predicted in zip(messages, predictions) if labeled.intent != predicted],
+    }
@@ -0,0 +1,62 @@
+import time
+
+import numpy as np
+
+from rag.snapshot import VectorSnapshot
+from telegram_bot.scheduler import SchedulerMetrics
+
+
+def synthetic_vectors(count: int, dimensions: int, latent_dimensions: int = 64, seed: int = 0) -> np.ndarray:
+    """
+    Unit vectors spanning few directions plus noise and a shared offset, roughly how chunk embeddings of one
+    course are spread: similar to each other, with a low intrinsic dimension. Fewer latent dimensions make the
+    neighbours easier to tell apart.
+    """
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(count, latent_dimensions)) @ rng.normal(size=(latent_dimensions, dimensions))
+    noise = rng.normal(scale=1.5 * np.sqrt(latent_dimensions / dimensions), size=(count, dimensions))
+    vectors = latent + noise + 2 * rng.normal(size=dimensions)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def sample_queries(vectors: np.ndarray, count: int, noise: float = 0.5, seed: int = 1) -> np.ndarray:
+    """Stored vectors with noise added, so every query has close neighbours without being one of them."""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(len(vectors), size=count, replace=len(vectors) < count)]
+    queries = queries + rng.normal(scale=noise / np.sqrt(vectors.shape[1]), size=queries.shape)
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def evaluate_quantization(snapshot: VectorSnapshot, queries: np.ndarray, k: int, modes: list[str],
+                          rescore_factors: list[int]) -> list[dict]:
+    """
+    Recall@k of every quantized mode against the exact search, with the memory scanned per query (the index kept
+    in memory, plus the float32 rows read to rescore) and the search latency.
+    """
+    exact = [[position for position, _ in snapshot.search(query, k)] for query in queries]
+    row_bytes = snapshot.vectors.shape[1] * snapshot.vectors.itemsize
+    rows, baseline_p50 = [], None
+    for mode in modes:
+        quantized = snapshot.quantized(mode)
+        for factor in [None] if quantized is None else rescore_factors:
+            latencies, recalls = [], []
+            for query, expected in zip(queries, exact):
+                start = time.perf_counter()
+                found = snapshot.search(query, k, quantization=mode, rescore_factor=factor)
+                latencies.append(time.perf_counter() - start)
+                recalls.append(len({position for position, _ in found} & set(expected)) / max(len(expected), 1))
+            p50 = SchedulerMetrics.percentile(latencies, 0.50)
+            baseline_p50 = baseline_p50 or p50
+            index_bytes = snapshot.vectors.nbytes if quantized is None else quantized.nbytes
+            rows.append({
+                "mode": mode,
+                "rescore": "-" if quantized is None else factor,
+                f"recall@{k}": round(float(np.mean(recalls)), 4),
+                "index_mb": round(index_bytes / 2 ** 20, 2),
+                "memory_ratio": round(index_bytes / snapshot.vectors.nbytes, 3),
+                "rescored_kb": 0 if quantized is None else round(k * factor * row_bytes / 1024, 1),
+                "p50_ms": round(p50 * 1000, 3),
+                "p95_ms": round(SchedulerMetrics.percentile(latencies, 0.95) * 1000, 3),
+                "speedup": round(baseline_p50 / p50, 2) if p50 else 0.0,
+            })
+    return rows
@@ -0,0 +1,109 @@
+import json
+from pathlib import Path
+from typing import Any
+
+from benchmarks.workload import WorkloadResult
+from telegram_bot.scheduler import SchedulerMetrics
+from tracing.watchdog import LoopWatchdog
+
+# Result paths compared against a baseline and whether higher values are better
+COMPARED_RESULTS = {
+    ("throughput",): True,
+    ("latency_ms", "p50"): False,
+    ("latency_ms", "p95"): False,
+    ("latency_ms", "p99"): False,
+    ("event_loop", "blocked_fraction"): False,
+}
+
+
+def _latency_summary(latencies: list[float]) -> dict[str, float]:
+    return {
+        "count": len(latencies),
+        "p50": round(SchedulerMetrics.percentile(latencies, 0.50) * 1000, 2),
+        "p95": round(SchedulerMetrics.percentile(latencies, 0.95) * 1000, 2),
+        "p99": round(SchedulerMetrics.percentile(latencies, 0.99) * 1000, 2),
+        "max": round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+def event_loop_summary(watchdog: LoopWatchdog, duration: float) -> dict[str, float]:
+    """Time the loop was blocked over the run, from the heartbeat lags of the watchdog."""
+    blocked = watchdog.lagged_seconds
+    return {
+        "blocked_seconds": round(blocked, 4),
+        "blocked_fraction": round(blocked / duration, 4) if duration else 0.0,
+        "lag_p99_ms": round(SchedulerMetrics.percentile(watchdog.lags, 0.99) * 1000, 2),
+        "lag_max_ms": round(max(watchdog.lags, default=0.0) * 1000, 2),
+    }
+
+
+def summarize(config: dict[str, Any], result: WorkloadResult, duration: float,
+              event_loop: dict[str, float]) -> dict[str, Any]:
+    latencies = [timing.latency for timing in result.timings]
+    return {
+        "config": config,
+        "results": {
+            "updates": len(latencies),
+            "errors": result.errors,
+            "duration_s": round(duration, 3),
+            "throughput": round(len(latencies) / duration, 2) if duration else 0.0,
+            "latency_ms": _latency_summary(latencies),
+            "by_command": {command: _latency_summary(values)
+                           for command, values in sorted(result.latencies_by_command().items())},
+            "event_loop": event_loop,
+        },
+    }
+
+
+def format_report(report: dict[str, Any]) -> str:
+    results = report["results"]
+    latency = results["latency_ms"]
+    loop = results["event_loop"]
+    lines = [
+        f"Updates: {results['updates']} in {results['duration_s']}s ({results['throughput']} updates/s), "
+        f"errors: {results['errors']}",
+        f"Latency p50/p95/p99/max: {latency['p50']} / {latency['p95']} / {latency['p99']} / {latency['max']} ms",
+        f"Event loop blocked: {loop['blocked_seconds']}s ({loop['blocked_fraction']:.1%}), "
+        f"lag p99/max: {loop['lag_p99_ms']} / {loop['lag_max_ms']} ms",
+        "",
+        f"{'command':<16}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}",
+    ]
+    for command, summary in results["by_command"].items():
+        lines.append(f"{command:<16}{summary['count']:>7}{summary['p50']:>10}{summary['p95']:>10}"
+                     f"{summary['p99']:>10}{summary['max']:>10}")
+    return "\n".join(lines)
+
+
+def save_report(report: dict[str, Any], path: str):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def compare_with_baseline(report: dict[str, Any], baseline_path: str, tolerance: float) -> list[str]:
+    """
+    Compare a run with a saved baseline.
+
+    Args:
+        report (dict): Report of the current run.
+        baseline_path (str): JSON report saved with --save-baseline.
+        tolerance (float): Allowed relative degradation, e.g. 0.2 for 20%.
+
+    Returns:
+        list[str]: One message per result that regressed beyond the tolerance; empty when the run passes.
+    """
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    regressions = []
+    if baseline["config"] != report["config"]:
+        regressions.append(f"Configuration differs from the baseline: {baseline['config']}")
+    for path, higher_is_better in COMPARED_RESULTS.items():
+        expected, actual = baseline["results"], report["results"]
+        for key in path:
+            expected, actual = expected[key], actual[key]
+        if higher_is_better:
+            regressed = actual < expected * (1 - tolerance)
+        else:
+            # Small absolute values are dominated by noise, so they get an absolute slack as well
+            regressed = actual > expected * (1 + tolerance) + (0.01 if path[0] == "event_loop" else 1.0)
+        if regressed:
+            regressions.append(f"{'.'.join(path)}: {actual} (baseline {expected})")
+    return regressions
@@ -0,0 +1,302 @@
+import json
+import math
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from rag.chunkers import StructureAwareChunker
+from rag.rerank import create_reranker
+from telegram_bot.scheduler import SchedulerMetrics
+
+
+@dataclass
+class LabeledQuestion:
+    question: str
+    # (PDF file name, 1-based page number) pairs that answer the question
+    expected_pages: set[tuple[str, int]]
+
+
+def load_labeled_questions(path: str) -> list[LabeledQuestion]:
+    """
+    Load the labeled set, a JSON list of
+    {"question": "¿Qué es un delegado?", "pages": [{"source": "libro.pdf", "page": 42}]}.
+    """
+    entries = json.loads(Path(path).read_text(encoding="utf-8"))
+    return [
+        LabeledQuestion(entry["question"], {(page["source"], int(page["page"])) for page in entry["pages"]})
+        for entry in entries
+    ]
+
+
+def chunk_page(chunk: Document) -> tuple[str, int]:
+    """Source page of a chunk in the labeled set's terms: file name and 1-based page."""
+    return os.path.basename(chunk.metadata.get("source", "")), int(chunk.metadata.get("page", 0)) + 1
+
+
+def _recursive_chunker(chunk_size: int, chunk_overlap: int) -> Callable[[list[Document]], list[Document]]:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return splitter.split_documents
+
+
+# Chunkers under evaluation, from the PDF pages to the indexed chunks
+CHUNKERS: dict[str, Callable[[list[Document]], list[Document]]] = {
+    "recursive-5000": _recursive_chunker(5000, 200),
+    "recursive-2000": _recursive_chunker(2000, 200),
+    "recursive-1000": _recursive_chunker(1000, 100),
+    "structure-400": StructureAwareChunker(target_tokens=400).split_documents,
+    "structure-200": StructureAwareChunker(target_tokens=200, max_tokens=600).split_documents,
+}
+
+
+def tokenize(text: str) -> list[str]:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return re.findall(r"\w+", "".join(char for char in decomposed if not unicodedata.combining(char)))
+
+
+class BM25:
+    def __init__(self, texts: list[str], k1: float = 1.5, b: float = 0.75):
+        """Okapi BM25 over the chunk texts, for the lexical side of the hybrid retriever."""
+        self.k1 = k1
+        self.b = b
+        self.term_frequencies = [Counter(tokenize(text)) for text in texts]
+        self.lengths = np.array([sum(frequencies.values()) for frequencies in self.term_frequencies], dtype=np.float32)
+        self.average_length = float(self.lengths.mean()) if len(texts) else 0.0
+        document_frequency = Counter(term for frequencies in self.term_frequencies for term in frequencies)
+        self.idf = {term: math.log(1 + (len(texts) - count + 0.5) / (count + 0.5))
+                    for term, count in document_frequency.items()}
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.term_frequencies), dtype=np.float32)
+        normalization = self.k1 * (1 - self.b + self.b * self.lengths / (self.average_length or 1.0))
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            frequencies = np.array([frequencies.get(term, 0) for frequencies in self.term_frequencies],
+                                   dtype=np.float32)
+            scores += idf * frequencies * (self.k1 + 1) / (frequencies + normalization)
+        return scores
+
+
+class RetrievalIndex(ABC):
+    name = ""
+
+    def __init__(self, directory: Path):
+        """
+        Args:
+            directory (Path): Where the index stores its files, to measure its size on disk.
+        """
+        self.directory = directory
+
+    @abstractmethod
+    def build(self, chunks: list[Document], vectors: np.ndarray):
+        pass
+
+    @abstractmethod
+    def search(self, query: str, query_vector: np.ndarray, k: int) -> list[int]:
+        """Positions in `chunks` of the best k chunks, best first."""
+
+    def size_on_disk(self) -> int:
+        return sum(path.stat().st_size for path in self.directory.rglob("*") if path.is_file())
+
+
+class ExactIndex(RetrievalIndex):
+    """Brute-force cosine similarity over a normalized float32 matrix."""
+    name = "numpy"
+
+    def build(self, chunks: list[Document], vectors: np.ndarray):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.matrix = np.ascontiguousarray(vectors / np.where(norms == 0, 1, norms), dtype=np.float32)
+        np.save(self.directory / "vectors.npy", self.matrix)
+
+    def similarities(self, query_vector: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(query_vector) or 1.0
+        return self.matrix @ (query_vector / norm).astype(np.float32)
+
+    def search(self, query: str, query_vector: np.ndarray, k: int) -> list[int]:
+        similarities = self.similarities(query_vector)
+        k = min(k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        return top[np.argsort(-similarities[top])].tolist()
+
+
+class ChromaIndex(RetrievalIndex):
+    """The store used by the bot, persisted to disk."""
+    name = "chroma"
+
+    def build(self, chunks: list[Document], vectors: np.ndarray):
+        import chromadb
+
+        client = chromadb.PersistentClient(path=str(self.directory))
+        self.collection = client.create_collection("retrieval_eval", metadata={"hnsw:space": "cosine"})
+        batch_size = 1000
+        for start in range(0, len(chunks), batch_size):
+            end = min(start + batch_size, len(chunks))
+            self.collection.add(ids=[str(position) for position in range(start, end)],
+                                embeddings=vectors[start:end].tolist(),
+                                documents=[chunk.page_content for chunk in chunks[start:end]])
+
+    def search(self, query: str, query_vector: np.ndarray, k: int) -> list[int]:
+        result = self.collection.query(query_embeddings=[query_vector.tolist()], n_results=k, include=[])
+        return [int(position) for position in result["ids"][0]]
+
+
+class HybridIndex(ExactIndex):
+    """Dense and BM25 rankings merged with reciprocal rank fusion."""
+    name = "hybrid"
+    RRF_K = 60
+    CANDIDATES = 50
+
+    def build(self, chunks: list[Document], vectors: np.ndarray):
+        super().build(chunks, vectors)
+        self.bm25 = BM25([chunk.page_content for chunk in chunks])
+        with open(self.directory / "bm25.pkl", "wb") as file:
+            pickle.dump(self.bm25, file)
+
+    def search(self, query: str, query_vector: np.ndarray, k: int) -> list[int]:
+        fused: Counter[int] = Counter()
+        for scores in (self.similarities(query_vector), self.bm25.scores(query)):
+            candidates = min(self.CANDIDATES, len(scores))
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+            for rank, position in enumerate(top[np.argsort(-scores[top])]):
+                fused[int(position)] += 1 / (self.RRF_K + rank + 1)
+        return [position for position, _ in fused.most_common(k)]
+
+
+class RerankedIndex(ExactIndex):
+    """Exact search over-fetching CANDIDATES chunks, reranked and cut as by RerankingRetriever."""
+    CANDIDATES = 30
+    reranker_spec = ""
+
+    def build(self, chunks: list[Document], vectors: np.ndarray):
+        super().build(chunks, vectors)
+        self.texts = [chunk.page_content for chunk in chunks]
+        self.reranker = create_reranker(self.reranker_spec)
+        self.min_score = float(os.getenv("RERANK_MIN_SCORE", str(self.reranker.default_min_score)))
+
+    def search(self, query: str, query_vector: np.ndarray, k: int) -> list[int]:
+        candidates = super().search(query, query_vector, self.CANDIDATES)
+        scores = self.reranker.score(query, [self.texts[position] for position in candidates])
+        order = np.argsort(-scores, kind="stable")[:k]
+        kept = [int(position) for position in order if scores[position] >= self.min_score] or order[:1].tolist()
+        return [candidates[position] for position in kept]
+
+
+class LexicalRerankedIndex(RerankedIndex):
+    name = "numpy+lexical"
+    reranker_spec = "lexical"
+
+
+class CrossEncoderRerankedIndex(RerankedIndex):
+    name = "numpy+cross-encoder"
+    reranker_spec = "cross-encoder"
+
+
+INDEXES: dict[str, type[RetrievalIndex]] = {index.name: index for index in (
+    ChromaIndex, ExactIndex, HybridIndex, LexicalRerankedIndex, CrossEncoderRerankedIndex)}
+
+
+def _ranking_metrics(rankings: list[list[tuple[str, int]]], questions: list[LabeledQuestion],
+                     ks: list[int]) -> dict[str, float]:
+    metrics = {}
+    for k in ks:
+        recalls = [len(question.expected_pages & set(ranking[:k])) / len(question.expected_pages)
+                   for ranking, question in zip(rankings, questions)]
+        metrics[f"recall@{k}"] = round(sum(recalls) / len(recalls), 4)
+    reciprocal_ranks = []
+    for ranking, question in zip(rankings, questions):
+        rank = next((index + 1 for index, page in enumerate(ranking) if page in question.expected_pages), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    metrics["mrr"] = round(sum(reciprocal_ranks) / len(reciprocal_ranks), 4)
+    # Of the pages returned (at most the largest k), those that answer the question
+    max_k = max(ks)
+    precisions = [len(question.expected_pages & set(ranking[:max_k])) / len(ranking[:max_k]) if ranking else 0.0
+                  for ranking, question in zip(rankings, questions)]
+    metrics["precision"] = round(sum(precisions) / len(precisions), 4)
+    metrics["pages"] = round(sum(len(ranking[:max_k]) for ranking in rankings) / len(rankings), 2)
+    return metrics
+
+
+def evaluate_configuration(chunks: list[Document], vectors: np.ndarray, embed_seconds: float,
+                           index_class: type[RetrievalIndex], embeddings: Embeddings,
+                           questions: list[LabeledQuestion], ks: list[int]) -> dict:
+    """
+    Build one index over already embedded chunks and run the labeled questions against it.
+
+    Returns:
+        dict: Quality (recall@k, MRR, precision and pages returned), build time, index size and per-query latency
+            of the configuration.
+    """
+    directory = Path(tempfile.mkdtemp(prefix=f"retrieval-{index_class.name}-"))
+    try:
+        index = index_class(directory)
+        start = time.perf_counter()
+        index.build(chunks, vectors)
+        index_seconds = time.perf_counter() - start
+
+        max_k = max(ks)
+        rankings, latencies = [], []
+        for question in questions:
+            start = time.perf_counter()
+            query_vector = np.asarray(embeddings.embed_query(question.question), dtype=np.float32)
+            positions = index.search(question.question, query_vector, max_k)
+            latencies.append(time.perf_counter() - start)
+            # Several chunks of the same page count once, at the rank of the first
+            ranking = list(dict.fromkeys(chunk_page(chunks[position]) for position in positions))
+            rankings.append(ranking)
+
+        return {
+            **_ranking_metrics(rankings, questions, ks),
+            "chunks": len(chunks),
+            "embed_s": round(embed_seconds, 3),
+            "index_s": round(index_seconds, 3),
+            "size_mb": round(index.size_on_disk() / 1e6, 3),
+            "query_p50_ms": round(SchedulerMetrics.percentile(latencies, 0.50) * 1000, 2),
+            "query_p95_ms": round(SchedulerMetrics.percentile(latencies, 0.95) * 1000, 2),
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def evaluate(pages: list[Document], questions: list[LabeledQuestion], embeddings: Embeddings,
+             chunkers: list[str], indexes: list[str], ks: list[int]) -> list[dict]:
+    """
+    Evaluate every chunker × index combination. Chunks are embedded once per chunker and shared by the indexes,
+    so the embedding time is reported separately from the index build time.
+    """
+    rows = []
+    for chunker_name in chunkers:
+        start = time.perf_counter()
+        chunks = CHUNKERS[chunker_name](pages)
+        chunk_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectors = np.asarray(embeddings.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+        embed_seconds = time.perf_counter() - start
+
+        for index_name in indexes:
+            row = evaluate_configuration(chunks, vectors, embed_seconds, INDEXES[index_name], embeddings, questions, ks)
+            rows.append({"chunker": chunker_name, "index": index_name, "chunk_s": round(chunk_seconds, 3), **row})
+    return rows
+
+
+def format_rows(rows: list[dict]) -> str:
+    columns = list(rows[0]) if rows else []
+    widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns}
+    lines = ["  ".join(column.ljust(widths[column]) for column in columns)]
+    lines.extend("  ".join(str(row[column]).ljust(widths[column]) for column in columns) for row in rows)
+    return "\n".join(lines)
@@ -0,0 +1,194 @@
+import asyncio
+import itertools
+import random
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from telegram import Update
+from telegram.ext import Application, CallbackContext
+
+from database.models import Topic, Exercise, ExerciseHint, ExerciseTestCase, StudentExercise
+from telegram_bot.fake_telegram import FakeBotApiRequest, make_message_update
+from telegram_bot.outbound import OutboundSender
+
+COMMANDS = ("ask", "exercise", "hint", "solution", "submit")
+DEFAULT_MIX = "ask=3,exercise=2,hint=2,solution=1,submit=2"
+
+QUESTIONS = [
+    "¿Qué es un delegado?", "que es un delegado", "¿Cómo funciona la herencia?", "Diferencia entre clase y objeto",
+    "¿Qué es una interfaz?", "¿Cómo recorro un array?", "¿Qué es la recursión?", "¿Para qué sirve un diccionario?",
+    "¿Qué es una excepción?", "¿Cómo declaro una variable?", "¿Qué es un tipo por referencia?",
+    "¿Cómo funciona un bucle for?", "¿Qué es un método estático?", "¿Cómo concateno cadenas?",
+]
+
+CODE_VARIANTS = [
+    "class Program { static void Main() { System.Console.WriteLine(1); } }",
+    "class Program {\n  static void Main() {\n    System.Console.WriteLine(1); // same program\n  }\n}",
+    "class Program { static void Main() { System.Console.WriteLine(2); } }",
+]
+
+_EXERCISE_ID_PATTERN = re.compile(r"^\*(\d+)\\\.")
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    """Parse "ask=3,exercise=2" into relative weights."""
+    weights = {}
+    for part in mix.split(","):
+        command, _, weight = part.partition("=")
+        command = command.strip().lstrip("/")
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown command '{command}', expected one of {', '.join(COMMANDS)}")
+        weights[command] = int(weight or 1)
+    return weights
+
+
+def enable_sqlite_student_exercise_ids():
+    """
+    student_exercise has a composite primary key, which SQLite cannot autoincrement. Postgres fills the id
+    from its sequence; on SQLite the benchmark assigns it itself. Call before creating the tables.
+    """
+    StudentExercise.__table__.c.id.autoincrement = False
+    ids = itertools.count(1)
+
+    @event.listens_for(StudentExercise, "before_insert")
+    def assign_id(mapper, connection, target):
+        if target.id is None:
+            target.id = next(ids)
+
+
+def seed_catalog(session: Session, topics: int = 3, exercises_per_level: int = 3) -> list[str]:
+    """Create the benchmark topics with exercises, hints and test cases. Returns the topic names."""
+    names = [f"Benchmark {index + 1}" for index in range(topics)]
+    if session.query(Topic).filter(Topic.name.in_(names)).count() == topics:
+        return names
+
+    for name in names:
+        topic = Topic(name=name, description=f"Descripción del tema {name}.")
+        session.add(topic)
+        for level in ('Basic', 'Intermediate', 'Advanced'):
+            for index in range(exercises_per_level):
+                exercise = Exercise(
+                    title=f"{name} {level} {index + 1}",
+                    description=f"Escribe un programa que imprima 1.\n```csharp\n{CODE_VARIANTS[0]}\n```",
+                    difficulty=level,
+                    solution=f"Solución:\n```csharp\n{CODE_VARIANTS[0]}\n```",
+                    topic=topic,
+                )
+                exercise.hints = [ExerciseHint(order=order, hint_text=f"Pista {order + 1}") for order in range(3)]
+                exercise.test_cases = [ExerciseTestCase(order=0, input="", expected_output="1")]
+                session.add(exercise)
+    session.commit()
+    return names
+
+
+@dataclass
+class UpdateTiming:
+    command: str
+    latency: float
+
+
+@dataclass
+class WorkloadResult:
+    timings: list[UpdateTiming] = field(default_factory=list)
+    errors: int = 0
+
+    async def record_error(self, update: object, context: CallbackContext):
+        """Error handler for the application under test: process_update handles handler exceptions itself."""
+        self.errors += 1
+
+    def latencies_by_command(self) -> dict[str, list[float]]:
+        latencies = defaultdict(list)
+        for timing in self.timings:
+            latencies[timing.command].append(timing.latency)
+        return latencies
+
+
+class SimulatedStudent:
+    _update_ids = itertools.count(1)
+
+    def __init__(self, application: Application, request: FakeBotApiRequest, user_id: int, topics: list[str],
+                 weights: dict[str, int], rng: random.Random, result: WorkloadResult, think_time: float = 0.0,
+                 outbound: OutboundSender | None = None):
+        """
+        A student talking to the bot: registers with /start and then sends commands drawn from the mix.
+
+        Args:
+            application (Application): Application of the TelegramBot under test.
+            request (FakeBotApiRequest): Fake Bot API of the application, where the bot replies are read from.
+            user_id (int): Telegram user id, also used as chat id.
+            topics (list[str]): Topic names to ask exercises for.
+            weights (dict[str, int]): Relative frequency of each command.
+            rng (random.Random): Source of randomness, seeded for reproducible runs.
+            result (WorkloadResult): Where update latencies are collected.
+            think_time (float): Seconds between two messages of the same student.
+            outbound (OutboundSender): Sender of the bot replies, waited for before reading them.
+        """
+        self.application = application
+        self.request = request
+        self.user_id = user_id
+        self.topics = topics
+        self.commands = list(weights)
+        self.weights = list(weights.values())
+        self.rng = rng
+        self.result = result
+        self.think_time = think_time
+        self.outbound = outbound
+        self.exercise_ids: list[int] = []
+
+    async def send(self, text: str, command: str) -> list[str]:
+        """Process one message and return the bot replies it produced."""
+        sent_before = len(self.request.sent_messages)
+        update = Update.de_json(make_message_update(next(self._update_ids), self.user_id, text), self.application.bot)
+        start = time.perf_counter()
+        try:
+            await self.application.process_update(update)
+        except Exception:
+            self.result.errors += 1
+        self.result.timings.append(UpdateTiming(command, time.perf_counter() - start))
+        if self.outbound is not None:
+            # Handlers return before their replies are sent
+            await self.outbound.flush(self.user_id)
+        if self.think_time:
+            await asyncio.sleep(self.think_time)
+        return [message.get("text", "") for message in self.request.sent_messages[sent_before:]
+                if int(message["chat_id"]) == self.user_id]
+
+    async def register(self):
+        replies = await self.send("/start", "start")
+        if any("ingresa tu nombre" in reply for reply in replies):
+            await self.send("Estudiante", "start_name")
+            await self.send(f"Simulado {self.user_id}", "start_lastname")
+
+    async def run(self, requests: int):
+        await self.register()
+        for _ in range(requests):
+            command = self.rng.choices(self.commands, self.weights)[0]
+            await getattr(self, f"_{command}")()
+
+    async def _ask(self):
+        await self.send(f"/ask {self.rng.choice(QUESTIONS)}", "ask")
+
+    async def _exercise(self):
+        for reply in await self.send(f"/exercise {self.rng.choice(self.topics)}", "exercise"):
+            if match := _EXERCISE_ID_PATTERN.match(reply):
+                self.exercise_ids.append(int(match.group(1)))
+
+    async def _hint(self):
+        if not self.exercise_ids:
+            return await self._exercise()
+        await self.send(f"/hint {self.rng.choice(self.exercise_ids)}", "hint")
+
+    async def _solution(self):
+        if not self.exercise_ids:
+            return await self._exercise()
+        await self.send(f"/solution {self.rng.choice(self.exercise_ids)}", "solution")
+
+    async def _submit(self):
+        if not self.exercise_ids:
+            return await self._exercise()
+        await self.send(f"/submit {self.rng.choice(self.exercise_ids)}", "submit")
+        await self.send(self.rng.choice(CODE_VARIANTS), "submit_code")
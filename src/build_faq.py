@@ -0,0 +1,92 @@
+"""
+Precompute answers for the questions students ask most, so /ask can answer them without running the RAG chain.
+
+Candidates are a definition question per catalog topic and the largest groups of similar past questions, read from
+the questions table the bot logs /ask to (or from a file, one per line). They are answered with the tutor's chain, a few at a time, and stored in faq_entries waiting for review: only approved
+entries answer students (set faq_entries.approved, or pass --approve to trust the generated answers).
+
+    python build_faq.py --days 30 --top 50
+    python build_faq.py --no-topics --questions ../data/question_log.txt --refresh
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from database.database import SessionLocal
+from database.models import FaqEntry
+from rag.ai_tutor import AITutor
+from rag.faq import FaqBuilder, cluster_questions, question_key, topic_candidates
+from rag.utils import embedding_model, get_embeddings, get_gemini_llm, get_retriever
+from rag.text import strip_command
+from services import FaqService, QuestionService, TopicService
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", help="past questions, one per line, instead of the logged ones")
+    parser.add_argument("--days", type=int, default=30, help="days of logged questions to group")
+    parser.add_argument("--top", type=int, default=50, help="groups of past questions to answer")
+    parser.add_argument("--threshold", type=float, default=0.85, help="similarity for questions to be grouped")
+    parser.add_argument("--no-topics", action="store_true", help="skip the per-topic definitions")
+    parser.add_argument("--concurrency", type=int, default=4, help="questions answered at the same time")
+    parser.add_argument("--refresh", action="store_true", help="also regenerate the questions already stored")
+    parser.add_argument("--approve", action="store_true", help="store the answers as already reviewed")
+    return parser.parse_args()
+
+
+def load_questions(path: str | None, days: int) -> list[str]:
+    if path is None:
+        with SessionLocal() as session:
+            return QuestionService(session).get_asked_questions(datetime.now(timezone.utc) - timedelta(days=days))
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as file:
+        return [question for question in (strip_command(line) for line in file) if question]
+
+
+async def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with SessionLocal() as session:
+        topics = [(topic.id, topic.name) for topic in TopicService(session).get_all().item or []]
+
+    embeddings = get_embeddings()
+    candidates = [] if args.no_topics else topic_candidates(topics)
+    candidates += cluster_questions(load_questions(args.questions, args.days), embeddings, args.threshold, args.top)
+
+    if not args.refresh:
+        with SessionLocal() as session:
+            existing = FaqService(session).get_existing_keys(
+                [question_key(candidate.question, candidate.topic_id) for candidate in candidates])
+        candidates = [candidate for candidate in candidates
+                      if question_key(candidate.question, candidate.topic_id) not in existing]
+    print(f"Answering {len(candidates)} questions...")
+
+    builder = FaqBuilder(AITutor(get_gemini_llm(), get_retriever(topics)), embeddings, args.concurrency)
+    answers = await builder.build(candidates)
+
+    with SessionLocal() as session:
+        FaqService(session).save_entries([
+            FaqEntry(
+                question_key=question_key(answer.candidate.question, answer.candidate.topic_id),
+                question=answer.candidate.question,
+                answer=answer.answer,
+                topic_id=answer.candidate.topic_id,
+                source=answer.candidate.source,
+                frequency=answer.candidate.frequency,
+                embedding=answer.embedding.tobytes(),
+                embedding_model=embedding_model,
+                approved=args.approve,
+                hits=0,
+            )
+            for answer in answers
+        ])
+    print(f"Stored {len(answers)} of {len(candidates)} answers"
+          f"{'' if args.approve else ', pending review'}.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
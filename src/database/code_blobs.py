@@ -0,0 +1,19 @@
+import hashlib
+
+import zstandard
+
+# Submissions are small and similar: a fast level compresses them almost as well as a slow one
+COMPRESSION_LEVEL = 6
+
+
+def hash_code(code: str) -> str:
+    """Content address of a code body in code_blobs."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def compress_code(code: str) -> bytes:
+    return zstandard.compress(code.encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def decompress_code(body: bytes) -> str:
+    return zstandard.decompress(body).decode("utf-8")
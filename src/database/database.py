@@ -2,8 +2,13 @@ import os
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
+from metrics import get_registry
+from metrics.pool import InstrumentedQueuePool
+from tracing.sql import instrument_sqlalchemy
+
 load_dotenv()
 
 def get_database_url() -> str:
@@ -14,6 +19,16 @@ def get_database_url() -> str:
     return db_url
 
 
+def get_engine_options(url: str) -> dict:
+    """SQLite keeps its own pool classes; server databases get a pool that reports checkout waits."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {"poolclass": InstrumentedQueuePool}
+
+
 # Database engine and session setup
-engine = create_engine(get_database_url(), echo=True)
+engine = create_engine(get_database_url(), echo=True, **get_engine_options(get_database_url()))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_sqlalchemy(engine)
+get_registry().gauge("db_pool_checked_out", "Connections currently checked out of the pool",
+                     function=lambda: getattr(engine.pool, "checkedout", lambda: 0)())
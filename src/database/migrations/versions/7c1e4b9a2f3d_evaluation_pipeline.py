@@ -0,0 +1,67 @@
+"""Evaluation pipeline
+
+Revision ID: 7c1e4b9a2f3d
+Revises: 2d42ca06c1fe
+Create Date: 2026-10-19 10:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e4b9a2f3d'
+down_revision: Union[str, None] = '2d42ca06c1fe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+attempt_verdict = sa.Enum('Pending', 'Accepted', 'Wrong Answer', 'Compilation Error', 'Runtime Error',
+                          'Time Limit Exceeded', 'Internal Error', name='attempt_verdict')
+evaluation_job_status = sa.Enum('Queued', 'Running', 'Done', 'Failed', name='evaluation_job_status')
+
+
+def upgrade() -> None:
+    op.create_table('exercise_test_cases',
+    sa.Column('order', sa.Integer(), nullable=False),
+    sa.Column('input', sa.Text(), nullable=True),
+    sa.Column('expected_output', sa.Text(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    attempt_verdict.create(op.get_bind(), checkfirst=True)
+    op.add_column('attempts', sa.Column('verdict', attempt_verdict, server_default='Pending', nullable=False))
+    op.add_column('attempts', sa.Column('evaluation_output', sa.Text(), nullable=True))
+    op.add_column('attempts', sa.Column('evaluated_at', sa.DateTime(), nullable=True))
+    op.create_table('evaluation_jobs',
+    sa.Column('attempt_id', sa.Integer(), nullable=False),
+    sa.Column('status', evaluation_job_status, nullable=False),
+    sa.Column('tries', sa.Integer(), nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('notified', sa.Boolean(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['attempt_id'], ['attempts.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('attempt_id')
+    )
+    op.create_index(op.f('ix_evaluation_jobs_status'), 'evaluation_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_evaluation_jobs_status'), table_name='evaluation_jobs')
+    op.drop_table('evaluation_jobs')
+    op.drop_column('attempts', 'evaluated_at')
+    op.drop_column('attempts', 'evaluation_output')
+    op.drop_column('attempts', 'verdict')
+    op.drop_table('exercise_test_cases')
+    evaluation_job_status.drop(op.get_bind(), checkfirst=True)
+    attempt_verdict.drop(op.get_bind(), checkfirst=True)
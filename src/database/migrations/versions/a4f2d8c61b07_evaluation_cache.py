@@ -0,0 +1,40 @@
+"""Evaluation cache
+
+Revision ID: a4f2d8c61b07
+Revises: 7c1e4b9a2f3d
+Create Date: 2026-10-19 11:03:15.274911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f2d8c61b07'
+down_revision: Union[str, None] = '7c1e4b9a2f3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('evaluation_cache',
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('verdict', sa.String(length=50), nullable=False),
+    sa.Column('output', sa.Text(), nullable=True),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cache_key')
+    )
+    op.add_column('attempts', sa.Column('evaluation_key', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_attempts_evaluation_key'), 'attempts', ['evaluation_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_attempts_evaluation_key'), table_name='attempts')
+    op.drop_column('attempts', 'evaluation_key')
+    op.drop_table('evaluation_cache')
@@ -0,0 +1,43 @@
+"""Broadcasts
+
+Revision ID: a7d3e9b2c415
+Revises: f2c8a6d94e13
+Create Date: 2026-10-19 15:47:12.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9b2c415'
+down_revision: Union[str, None] = 'f2c8a6d94e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('broadcasts',
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('status', sa.Enum('Pending', 'Sending', 'Done', name='broadcast_status'), nullable=False),
+    sa.Column('requested_by_chat_id', sa.String(), nullable=False),
+    sa.Column('last_user_id', sa.Integer(), nullable=False),
+    sa.Column('sent', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('recipients', sa.Integer(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_broadcasts_status'), 'broadcasts', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_broadcasts_status'), table_name='broadcasts')
+    op.drop_table('broadcasts')
+    sa.Enum(name='broadcast_status').drop(op.get_bind(), checkfirst=True)
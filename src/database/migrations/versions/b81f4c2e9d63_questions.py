@@ -0,0 +1,53 @@
+"""Questions
+
+Revision ID: b81f4c2e9d63
+Revises: a7d3e9b2c415
+Create Date: 2026-10-19 17:02:48.913570
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f4c2e9d63'
+down_revision: Union[str, None] = 'a7d3e9b2c415'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('questions',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('topic_id', sa.Integer(), nullable=True),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('standalone_question', sa.Text(), nullable=True),
+    sa.Column('clean_query', sa.Text(), nullable=True),
+    sa.Column('intent', sa.String(length=20), nullable=True),
+    sa.Column('answered_by', sa.Enum('Canned', 'Cache', 'Faq', 'Rag', 'Rejected', 'Error',
+                                     name='question_answered_by'), nullable=False),
+    sa.Column('chunk_ids', sa.Text(), nullable=True),
+    sa.Column('answer', sa.Text(), nullable=True),
+    sa.Column('latency_ms', sa.Integer(), nullable=False),
+    sa.Column('asked_at', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['topic_id'], ['topics.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_questions_answered_by'), 'questions', ['answered_by'], unique=False)
+    op.create_index(op.f('ix_questions_asked_at'), 'questions', ['asked_at'], unique=False)
+    op.create_index(op.f('ix_questions_topic_id'), 'questions', ['topic_id'], unique=False)
+    op.create_index(op.f('ix_questions_user_id'), 'questions', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_questions_user_id'), table_name='questions')
+    op.drop_index(op.f('ix_questions_topic_id'), table_name='questions')
+    op.drop_index(op.f('ix_questions_asked_at'), table_name='questions')
+    op.drop_index(op.f('ix_questions_answered_by'), table_name='questions')
+    op.drop_table('questions')
+    sa.Enum(name='question_answered_by').drop(op.get_bind(), checkfirst=True)
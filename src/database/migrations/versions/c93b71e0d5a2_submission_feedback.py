@@ -0,0 +1,34 @@
+"""Submission feedback
+
+Revision ID: c93b71e0d5a2
+Revises: a4f2d8c61b07
+Create Date: 2026-10-19 11:48:02.905317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c93b71e0d5a2'
+down_revision: Union[str, None] = 'a4f2d8c61b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+feedback_status = sa.Enum('Pending', 'Generating', 'Ready', 'Notified', name='feedback_status')
+
+
+def upgrade() -> None:
+    feedback_status.create(op.get_bind(), checkfirst=True)
+    op.add_column('attempts', sa.Column('feedback', sa.Text(), nullable=True))
+    op.add_column('attempts', sa.Column('feedback_status', feedback_status, nullable=True))
+    op.create_index(op.f('ix_attempts_feedback_status'), 'attempts', ['feedback_status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_attempts_feedback_status'), table_name='attempts')
+    op.drop_column('attempts', 'feedback_status')
+    op.drop_column('attempts', 'feedback')
+    feedback_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,36 @@
+"""Feedback retries
+
+Revision ID: d6e2a9c4f185
+Revises: b81f4c2e9d63
+Create Date: 2026-10-19 18:21:37.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6e2a9c4f185'
+down_revision: Union[str, None] = 'b81f4c2e9d63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # ADD VALUE cannot be used in the transaction that adds it
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE feedback_status ADD VALUE IF NOT EXISTS 'Failed'")
+    op.add_column('attempts', sa.Column('feedback_tries', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('attempts', sa.Column('feedback_claimed_at', sa.DateTime(), nullable=True))
+    op.add_column('attempts', sa.Column('feedback_retry_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    # Postgres cannot drop an enum value: attempts given up on are left without feedback instead
+    op.execute("UPDATE attempts SET feedback_status = NULL WHERE feedback_status = 'Failed'")
+    op.drop_column('attempts', 'feedback_retry_at')
+    op.drop_column('attempts', 'feedback_claimed_at')
+    op.drop_column('attempts', 'feedback_tries')
@@ -0,0 +1,48 @@
+"""FAQ entries
+
+Revision ID: e5b1f7a3c820
+Revises: c93b71e0d5a2
+Create Date: 2026-10-19 14:21:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b1f7a3c820'
+down_revision: Union[str, None] = 'c93b71e0d5a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('faq_entries',
+    sa.Column('question_key', sa.String(length=64), nullable=False),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=False),
+    sa.Column('topic_id', sa.Integer(), nullable=True),
+    sa.Column('source', sa.Enum('Topic', 'History', name='faq_source'), nullable=False),
+    sa.Column('frequency', sa.Integer(), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=False),
+    sa.Column('embedding_model', sa.String(length=100), nullable=False),
+    sa.Column('approved', sa.Boolean(), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['topic_id'], ['topics.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('question_key')
+    )
+    op.create_index(op.f('ix_faq_entries_approved'), 'faq_entries', ['approved'], unique=False)
+    op.create_index(op.f('ix_faq_entries_topic_id'), 'faq_entries', ['topic_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_faq_entries_topic_id'), table_name='faq_entries')
+    op.drop_index(op.f('ix_faq_entries_approved'), table_name='faq_entries')
+    op.drop_table('faq_entries')
+    sa.Enum(name='faq_source').drop(op.get_bind(), checkfirst=True)
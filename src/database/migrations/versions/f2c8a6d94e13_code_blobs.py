@@ -0,0 +1,132 @@
+"""Code blobs and attempts archive
+
+Revision ID: f2c8a6d94e13
+Revises: e5b1f7a3c820
+Create Date: 2026-10-19 15:02:44.130862
+
+"""
+import hashlib
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import zstandard
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a6d94e13'
+down_revision: Union[str, None] = 'e5b1f7a3c820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+code_blobs = sa.table('code_blobs',
+                      sa.column('code_hash', sa.String), sa.column('body', sa.LargeBinary),
+                      sa.column('size', sa.Integer), sa.column('created_at', sa.DateTime),
+                      sa.column('updated_at', sa.DateTime))
+attempts = sa.table('attempts',
+                    sa.column('id', sa.Integer), sa.column('submitted_code', sa.String),
+                    sa.column('code_hash', sa.String))
+
+
+def _backfill_code_hashes(connection):
+    """Move the code of every attempt to code_blobs, a batch at a time."""
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(attempts.c.id, attempts.c.submitted_code)
+            .where(attempts.c.id > last_id)
+            .order_by(attempts.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        hashes = {}
+        for attempt_id, code in rows:
+            hashes[attempt_id] = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        existing = set(connection.execute(
+            sa.select(code_blobs.c.code_hash).where(code_blobs.c.code_hash.in_(set(hashes.values())))).scalars())
+        now = datetime.now(timezone.utc)
+        new_blobs = {}
+        for attempt_id, code in rows:
+            code_hash = hashes[attempt_id]
+            if code_hash not in existing and code_hash not in new_blobs:
+                encoded = code.encode("utf-8")
+                new_blobs[code_hash] = {"code_hash": code_hash, "body": zstandard.compress(encoded, 6),
+                                        "size": len(encoded), "created_at": now, "updated_at": now}
+        if new_blobs:
+            connection.execute(code_blobs.insert(), list(new_blobs.values()))
+        for attempt_id, code_hash in hashes.items():
+            connection.execute(attempts.update().where(attempts.c.id == attempt_id).values(code_hash=code_hash))
+        last_id = rows[-1][0]
+
+
+def _restore_submitted_code(connection):
+    rows = connection.execute(
+        sa.select(attempts.c.id, code_blobs.c.body)
+        .join(code_blobs, code_blobs.c.code_hash == attempts.c.code_hash)
+    )
+    for attempt_id, body in rows.all():
+        connection.execute(attempts.update().where(attempts.c.id == attempt_id)
+                           .values(submitted_code=zstandard.decompress(body).decode("utf-8")))
+
+
+def upgrade() -> None:
+    op.create_table('code_blobs',
+    sa.Column('code_hash', sa.String(length=64), nullable=False),
+    sa.Column('body', sa.LargeBinary(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code_hash')
+    )
+    op.add_column('attempts', sa.Column('code_hash', sa.String(length=64), nullable=True))
+    _backfill_code_hashes(op.get_bind())
+    with op.batch_alter_table('attempts') as batch_op:
+        batch_op.alter_column('code_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_index(batch_op.f('ix_attempts_code_hash'), ['code_hash'], unique=False)
+        batch_op.create_foreign_key('attempts_code_hash_fkey', 'code_blobs', ['code_hash'], ['code_hash'])
+        batch_op.drop_column('submitted_code')
+
+    op.create_table('attempts_archive',
+    sa.Column('attempt_id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('code_hash', sa.String(length=64), nullable=False),
+    sa.Column('verdict', sa.String(length=50), nullable=False),
+    sa.Column('evaluation_output', sa.Text(), nullable=True),
+    sa.Column('evaluated_at', sa.DateTime(), nullable=True),
+    sa.Column('evaluation_key', sa.String(length=64), nullable=True),
+    sa.Column('feedback', sa.Text(), nullable=True),
+    sa.Column('submitted_at', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['code_hash'], ['code_blobs.code_hash'], ),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('attempt_id')
+    )
+    op.create_index(op.f('ix_attempts_archive_student_id'), 'attempts_archive', ['student_id'], unique=False)
+    op.create_index(op.f('ix_attempts_archive_submitted_at'), 'attempts_archive', ['submitted_at'], unique=False)
+
+
+def downgrade() -> None:
+    # Archived attempts are not moved back to `attempts`; they are dropped with the table
+    op.drop_index(op.f('ix_attempts_archive_submitted_at'), table_name='attempts_archive')
+    op.drop_index(op.f('ix_attempts_archive_student_id'), table_name='attempts_archive')
+    op.drop_table('attempts_archive')
+
+    op.add_column('attempts', sa.Column('submitted_code', sa.String(), nullable=True))
+    _restore_submitted_code(op.get_bind())
+    with op.batch_alter_table('attempts') as batch_op:
+        batch_op.alter_column('submitted_code', existing_type=sa.String(), nullable=False)
+        batch_op.drop_constraint('attempts_code_hash_fkey', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_attempts_code_hash'))
+        batch_op.drop_column('code_hash')
+    op.drop_table('code_blobs')
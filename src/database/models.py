@@ -1,10 +1,12 @@
 from datetime import datetime, timezone
 
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime, ForeignKey, Enum
+    Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean, LargeBinary
 )
 from sqlalchemy.orm import declarative_base, relationship
 
+from .code_blobs import decompress_code
+
 # Base for all models
 Base = declarative_base()
 
@@ -81,6 +83,9 @@ class Exercise(BaseModel):
     # Relationship with hints
     hints = relationship("ExerciseHint", back_populates="exercise")
 
+    # Relationship with the test cases used to evaluate submissions
+    test_cases = relationship("ExerciseTestCase", back_populates="exercise", order_by="ExerciseTestCase.order")
+
 
 class StudentExercise(BaseModel):
     __tablename__ = 'student_exercise'
@@ -118,8 +123,167 @@ class StudentHint(BaseModel):
     hint = relationship("ExerciseHint", back_populates="students_received")
 
 
+class ExerciseTestCase(BaseModel):
+    __tablename__ = 'exercise_test_cases'
+
+    order = Column(Integer, nullable=False, default=0)
+    input = Column(Text, nullable=True)
+    expected_output = Column(Text, nullable=False)
+    exercise_id = Column(Integer, ForeignKey('exercises.id'), nullable=False)
+
+    # Relationship with exercise
+    exercise = relationship("Exercise", back_populates="test_cases")
+
+
+class CodeBlob(BaseModel):
+    __tablename__ = 'code_blobs'
+
+    # sha256 of the code: identical submissions share one row, which is never updated
+    code_hash = Column(String(64), unique=True, nullable=False)
+    # zstd-compressed UTF-8 code and its uncompressed size in bytes
+    body = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+
+    @property
+    def code(self) -> str:
+        return decompress_code(self.body)
+
+
 class Attempt(BaseModel):
     __tablename__ = 'attempts'
     student_id = Column(Integer, ForeignKey('students.id'), nullable=False)
     exercise_id = Column(Integer, ForeignKey('exercises.id'), nullable=False)
-    submitted_code = Column(String, nullable=False)
+    # The code lives in code_blobs and is only loaded when `submitted_code` is read
+    code_hash = Column(String(64), ForeignKey('code_blobs.code_hash'), nullable=False, index=True)
+
+    # Evaluation results, written back by the evaluation workers
+    verdict = Column(Enum('Pending', 'Accepted', 'Wrong Answer', 'Compilation Error', 'Runtime Error',
+                          'Time Limit Exceeded', 'Internal Error', name='attempt_verdict'),
+                     default='Pending', nullable=False)
+    evaluation_output = Column(Text, nullable=True)
+    evaluated_at = Column(DateTime, nullable=True)
+
+    # Hash of the normalized code, exercise and test suite; identical submissions share it
+    evaluation_key = Column(String(64), nullable=True, index=True)
+
+    # Tutor feedback generated by the LLM once the attempt has been evaluated
+    feedback = Column(Text, nullable=True)
+    feedback_status = Column(Enum('Pending', 'Generating', 'Ready', 'Notified', 'Failed', name='feedback_status'),
+                             nullable=True, index=True)
+    # Generation tries so far; a failed try waits until feedback_retry_at, a crashed one is reclaimed once stale
+    feedback_tries = Column(Integer, nullable=False, default=0, server_default='0')
+    feedback_claimed_at = Column(DateTime, nullable=True)
+    feedback_retry_at = Column(DateTime, nullable=True)
+
+    student = relationship("Student")
+    exercise = relationship("Exercise")
+    code_blob = relationship("CodeBlob")
+
+    @property
+    def submitted_code(self) -> str:
+        return self.code_blob.code
+
+
+class AttemptArchive(BaseModel):
+    __tablename__ = 'attempts_archive'
+
+    # Finished attempts moved out of `attempts` once they are old; rows are only ever inserted
+    attempt_id = Column(Integer, unique=True, nullable=False)
+    student_id = Column(Integer, ForeignKey('students.id'), nullable=False, index=True)
+    exercise_id = Column(Integer, ForeignKey('exercises.id'), nullable=False)
+    code_hash = Column(String(64), ForeignKey('code_blobs.code_hash'), nullable=False)
+    verdict = Column(String(50), nullable=False)
+    evaluation_output = Column(Text, nullable=True)
+    evaluated_at = Column(DateTime, nullable=True)
+    evaluation_key = Column(String(64), nullable=True)
+    feedback = Column(Text, nullable=True)
+    # When the attempt was submitted; created_at is when it was archived
+    submitted_at = Column(DateTime, nullable=False, index=True)
+
+
+class EvaluationJob(BaseModel):
+    __tablename__ = 'evaluation_jobs'
+
+    attempt_id = Column(Integer, ForeignKey('attempts.id'), unique=True, nullable=False)
+    status = Column(Enum('Queued', 'Running', 'Done', 'Failed', name='evaluation_job_status'),
+                    default='Queued', nullable=False, index=True)
+    tries = Column(Integer, nullable=False, default=0)
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    # Whether the student has already been told about the result
+    notified = Column(Boolean, nullable=False, default=False)
+
+    attempt = relationship("Attempt")
+
+
+class EvaluationCacheEntry(BaseModel):
+    __tablename__ = 'evaluation_cache'
+
+    cache_key = Column(String(64), unique=True, nullable=False)
+    verdict = Column(String(50), nullable=False)
+    output = Column(Text, nullable=True)
+    hits = Column(Integer, nullable=False, default=0)
+
+
+class FaqEntry(BaseModel):
+    __tablename__ = 'faq_entries'
+
+    # Hash of the topic and the normalized question, so rebuilding the FAQ does not duplicate entries
+    question_key = Column(String(64), unique=True, nullable=False)
+    question = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    topic_id = Column(Integer, ForeignKey('topics.id'), nullable=True, index=True)
+    source = Column(Enum('Topic', 'History', name='faq_source'), nullable=False)
+    # How many past questions the entry stands for
+    frequency = Column(Integer, nullable=False, default=1)
+
+    # float32 embedding of the question, only comparable with query embeddings of the same model
+    embedding = Column(LargeBinary, nullable=False)
+    embedding_model = Column(String(100), nullable=False)
+
+    # Only reviewed entries answer students
+    approved = Column(Boolean, nullable=False, default=False, index=True)
+    hits = Column(Integer, nullable=False, default=0)
+
+    topic = relationship("Topic")
+
+
+class Broadcast(BaseModel):
+    __tablename__ = 'broadcasts'
+
+    message = Column(Text, nullable=False)
+    status = Column(Enum('Pending', 'Sending', 'Done', name='broadcast_status'),
+                    default='Pending', nullable=False, index=True)
+    # Administrator who sent it, told about the result when it finishes
+    requested_by_chat_id = Column(String, nullable=False)
+
+    # Checkpoint: students are messaged in id order and every batch sent moves it forward
+    last_user_id = Column(Integer, nullable=False, default=0)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    recipients = Column(Integer, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class Question(BaseModel):
+    __tablename__ = 'questions'
+
+    # Every /ask message, written in batches by the question log; rows are only ever inserted
+    user_id = Column(String, nullable=False, index=True)
+    topic_id = Column(Integer, ForeignKey('topics.id'), nullable=True, index=True)
+    question = Column(Text, nullable=False)
+    # Follow-ups condensed with the conversation, and the query searched after cleanup
+    standalone_question = Column(Text, nullable=True)
+    clean_query = Column(Text, nullable=True)
+    intent = Column(String(20), nullable=True)
+    answered_by = Column(Enum('Canned', 'Cache', 'Faq', 'Rag', 'Rejected', 'Error', name='question_answered_by'),
+                         nullable=False, index=True)
+    # JSON list of the ids of the chunks given to the LLM
+    chunk_ids = Column(Text, nullable=True)
+    answer = Column(Text, nullable=True)
+    latency_ms = Column(Integer, nullable=False)
+    # When the question arrived; created_at is when its batch was written
+    asked_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1 @@
+from evaluation.sandbox import CSharpSandbox, EvaluationResult, TestCaseData
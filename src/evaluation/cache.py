@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+from metrics.cache import CACHE_REQUESTS
+
+
+# Literals and comments, in the order they have to be recognised so that "//" inside a string
+# is not taken for a comment and a quote inside a comment is not taken for a string.
+_LEXEME_PATTERN = re.compile(r'''
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>\$?@"(?:[^"]|"")*"|@?\$?"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])+')
+  | (?P<space>\s+)
+''', re.VERBOSE | re.DOTALL)
+
+# Multi-character operators are single tokens, longest first: split into characters, `i++ + j` and `i + ++j`
+# would both become `i + + + j`
+_OPERATORS = ['>>>=', '<<=', '>>=', '??=', '>>>', '=>', '==', '!=', '<=', '>=', '&&', '||', '++', '--', '+=', '-=',
+              '*=', '/=', '%=', '&=', '|=', '^=', '<<', '>>', '??', '?.', '?[', '::', '->', '..']
+
+_TOKEN_PATTERN = re.compile(r'''
+    \$?@"(?:[^"]|"")*"|@?\$?"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])+'
+  | [A-Za-z_@][A-Za-z0-9_]*
+  | \d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?[A-Za-z]*
+  | ''' + '|'.join(re.escape(operator) for operator in _OPERATORS) + r'''
+  | \S
+''', re.VERBOSE)
+
+
+def normalize_csharp(code: str, tokenize: bool = False) -> str:
+    """
+    Normalize C# source so that submissions differing only in comments or whitespace compare equal.
+
+    Args:
+        code (str): The submitted source.
+        tokenize (bool): Re-emit the code as a token stream, which also ignores whitespace
+            between operators and punctuation (e.g. `a+b` and `a + b`).
+
+    Returns:
+        str: The normalized source.
+    """
+    parts = []
+    position = 0
+    for match in _LEXEME_PATTERN.finditer(code):
+        parts.append(code[position:match.start()])
+        if match.lastgroup == 'string':
+            parts.append(match.group())
+        elif not parts or parts[-1] != ' ':
+            # Comments and whitespace both separate tokens; spaces inside strings are left alone
+            parts.append(' ')
+        position = match.end()
+    parts.append(code[position:])
+    stripped = ''.join(parts).strip()
+
+    if tokenize:
+        return ' '.join(_TOKEN_PATTERN.findall(stripped))
+    return stripped
+
+
+def code_fingerprint(code: str, tokenize: bool | None = None) -> str:
+    """Hash of the normalized code."""
+    if tokenize is None:
+        tokenize = os.getenv("EVALUATION_CACHE_TOKENIZE", "1") == "1"
+    return hashlib.sha256(normalize_csharp(code, tokenize).encode("utf-8")).hexdigest()
+
+
+def source_hash(code: str) -> str:
+    """Hash of the exact source, for what must not be shared between programs that only look alike."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def compute_suite_version(test_cases) -> str:
+    """Digest of the test cases: it changes whenever a test case is added, removed or edited."""
+    digest = hashlib.sha256()
+    for test_case in test_cases:
+        digest.update((test_case.input or "").encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(test_case.expected_output.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def evaluation_cache_key(exercise_id: int, suite_version: str, fingerprint: str) -> str:
+    return hashlib.sha256(f"{exercise_id}:{suite_version}:{fingerprint}".encode("utf-8")).hexdigest()
+
+
+class ArtifactCache:
+    """
+    On-disk cache of compiled programs keyed by the hash of the exact source (`source_hash`), shared by the worker processes
+    of a host. Entries are written with an atomic rename, so concurrent workers never see partial files.
+    """
+    def __init__(self, directory: str | None = None, max_entries: int = 2000):
+        self.directory = Path(directory or os.getenv("EVALUATION_ARTIFACT_DIR",
+                                                     os.path.join(tempfile.gettempdir(), "csharp_artifacts")))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+    def _path(self, fingerprint: str) -> Path:
+        return self.directory / f"{fingerprint}.exe"
+
+    def restore(self, fingerprint: str, destination: str) -> bool:
+        """Copy the cached program to `destination`. Returns False on a cache miss."""
+        path = self._path(fingerprint)
+        try:
+            shutil.copyfile(path, destination)
+        except FileNotFoundError:
+            CACHE_REQUESTS.labels("compiled_program", "miss").inc()
+            return False
+        os.utime(path)
+        CACHE_REQUESTS.labels("compiled_program", "hit").inc()
+        return True
+
+    def store(self, fingerprint: str, program_path: str):
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(program_path, temporary_path)
+        os.replace(temporary_path, self._path(fingerprint))
+        self._prune()
+
+    def _prune(self):
+        entries = list(self.directory.glob("*.exe"))
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            entry.unlink(missing_ok=True)
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+
+from database.database import SessionLocal
+from database.models import Attempt
+from evaluation.cache import code_fingerprint
+from rag.feedback import SubmissionFeedbackGenerator, FeedbackRequest
+from services.feedback_service import FeedbackService
+from metrics import get_registry
+from metrics.cache import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_ATTEMPTS = get_registry().counter("feedback_attempts_total", "Attempts that went through the feedback stage")
+
+
+class FeedbackStage:
+    def __init__(self, generator: SubmissionFeedbackGenerator, window: float | None = None, batch_limit: int = 100):
+        """
+        Collects evaluated attempts over a short window and generates their feedback in one batch.
+
+        Args:
+            generator (SubmissionFeedbackGenerator): Generator that calls the LLM.
+            window (float): Seconds to accumulate pending attempts before generating a batch.
+            batch_limit (int): Maximum number of attempts taken per batch.
+        """
+        self.generator = generator
+        self.window = window or float(os.getenv("FEEDBACK_BATCH_WINDOW", "5"))
+        self.batch_limit = batch_limit
+
+    async def run_forever(self):
+        while True:
+            await asyncio.sleep(self.window)
+            try:
+                await self.process_batch()
+            except Exception as e:
+                logger.error(f"Error generating submission feedback: {e}", exc_info=True)
+
+    async def process_batch(self) -> int:
+        """Generate feedback for the attempts pending right now. Returns the number of attempts handled."""
+        attempts = await asyncio.to_thread(self._claim_attempts)
+        if not attempts:
+            return 0
+
+        # Micro-batch per exercise and call the LLM once per distinct code
+        requests_by_key: dict[tuple[int, str], FeedbackRequest] = {}
+        attempts_by_key: dict[tuple[int, str], list[int]] = defaultdict(list)
+        for attempt in attempts:
+            key = (attempt.exercise_id, attempt.evaluation_key or code_fingerprint(attempt.submitted_code))
+            attempts_by_key[key].append(attempt.id)
+            if key not in requests_by_key:
+                requests_by_key[key] = FeedbackRequest(
+                    exercise_title=attempt.exercise.title,
+                    exercise_description=attempt.exercise.description,
+                    code=attempt.submitted_code,
+                    verdict=attempt.verdict,
+                    evaluation_output=attempt.evaluation_output,
+                )
+
+        # Code that already got feedback in an earlier batch does not need a new call
+        existing_feedback = await asyncio.to_thread(self._get_existing_feedback, [key[1] for key in requests_by_key])
+        feedback_by_attempt = {}
+        for key in list(requests_by_key):
+            if key[1] in existing_feedback:
+                CACHE_REQUESTS.labels("feedback", "hit").inc()
+                for attempt_id in attempts_by_key[key]:
+                    feedback_by_attempt[attempt_id] = existing_feedback[key[1]]
+                del requests_by_key[key]
+            else:
+                CACHE_REQUESTS.labels("feedback", "miss").inc()
+
+        keys = sorted(requests_by_key, key=lambda item: item[0])
+        responses = await self.generator.agenerate([requests_by_key[key] for key in keys])
+
+        failed_attempt_ids = []
+        for key, response in zip(keys, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Feedback generation failed for exercise {key[0]}: {response}")
+                failed_attempt_ids.extend(attempts_by_key[key])
+                continue
+            for attempt_id in attempts_by_key[key]:
+                feedback_by_attempt[attempt_id] = response
+
+        await asyncio.to_thread(self._save, feedback_by_attempt, failed_attempt_ids)
+        FEEDBACK_ATTEMPTS.inc(len(attempts))
+        logger.info(f"Generated feedback for {len(attempts)} attempts with {len(keys)} LLM calls")
+        return len(attempts)
+
+    def _claim_attempts(self) -> list[Attempt]:
+        with SessionLocal(expire_on_commit=False) as session:
+            return FeedbackService(session).claim_pending_attempts(self.batch_limit)
+
+    @staticmethod
+    def _get_existing_feedback(evaluation_keys: list[str]) -> dict[str, str]:
+        with SessionLocal() as session:
+            return FeedbackService(session).get_existing_feedback(evaluation_keys)
+
+    @staticmethod
+    def _save(feedback_by_attempt: dict[int, str], failed_attempt_ids: list[int]):
+        with SessionLocal() as session:
+            service = FeedbackService(session)
+            service.save_feedback(feedback_by_attempt)
+            given_up = service.release_attempts(failed_attempt_ids)
+        if given_up:
+            logger.warning(f"Gave up generating feedback for {given_up} attempts after "
+                           f"{FeedbackService.MAX_TRIES} tries")
@@ -0,0 +1,177 @@
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import tempfile
+from dataclasses import dataclass, field
+
+from evaluation.cache import ArtifactCache
+
+
+@dataclass
+class TestCaseData:
+    """Plain copy of an ExerciseTestCase, safe to hand to a worker process."""
+    input: str | None
+    expected_output: str
+
+
+@dataclass
+class RunResult:
+    returncode: int | None
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+
+
+@dataclass
+class EvaluationResult:
+    verdict: str
+    output: str = ""
+    passed: int = 0
+    total: int = 0
+    details: list[str] = field(default_factory=list)
+
+
+class CSharpSandbox:
+    """
+    Compiles and runs C# submissions inside a throwaway directory with OS resource limits.
+    """
+    MAX_OUTPUT_CHARS = 4000
+
+    def __init__(self, compiler: str | None = None, runtime: str | None = None,
+                 time_limit: float | None = None, memory_limit_mb: int | None = None,
+                 compile_time_limit: float | None = None, artifact_cache: ArtifactCache | None = None):
+        """
+        Args:
+            compiler (str): Compiler executable (default: CSHARP_COMPILER or "mcs").
+            runtime (str): Runtime used to execute the compiled program (default: CSHARP_RUNTIME or "mono").
+            time_limit (float): CPU/wall seconds allowed for each test case run.
+            memory_limit_mb (int): Address-space limit for the program, 0 disables it.
+            compile_time_limit (float): Wall seconds allowed for compilation.
+            artifact_cache (ArtifactCache): Cache of compiled programs, reused for identical code.
+        """
+        self.compiler = compiler or os.getenv("CSHARP_COMPILER", "mcs")
+        self.runtime = runtime if runtime is not None else os.getenv("CSHARP_RUNTIME", "mono")
+        self.time_limit = time_limit or float(os.getenv("EVALUATION_TIME_LIMIT", "2"))
+        self.memory_limit_mb = memory_limit_mb if memory_limit_mb is not None else \
+            int(os.getenv("EVALUATION_MEMORY_LIMIT_MB", "0"))
+        self.compile_time_limit = compile_time_limit or float(os.getenv("EVALUATION_COMPILE_TIME_LIMIT", "30"))
+        self.artifact_cache = artifact_cache
+
+    def evaluate(self, code: str, test_cases: list[TestCaseData], fingerprint: str | None = None) -> EvaluationResult:
+        """
+        Compile the code and run it against every test case.
+
+        Args:
+            code (str): The submitted C# source.
+            test_cases (list[TestCaseData]): The exercise test cases, in order.
+            fingerprint (str): Hash of the exact code (`source_hash`), used to reuse a cached compilation.
+
+        Returns:
+            EvaluationResult: The verdict and a short report for the student.
+        """
+        workdir = tempfile.mkdtemp(prefix="submission_")
+        try:
+            program_path = os.path.join(workdir, "program.exe")
+            use_cache = self.artifact_cache is not None and fingerprint is not None
+
+            if not (use_cache and self.artifact_cache.restore(fingerprint, program_path)):
+                compilation = self.compile(code, workdir)
+                if compilation.timed_out or compilation.returncode != 0:
+                    return EvaluationResult(verdict="Compilation Error",
+                                            output=self._truncate(compilation.stdout + compilation.stderr))
+                if use_cache:
+                    self.artifact_cache.store(fingerprint, program_path)
+
+            return self.run_test_cases(workdir, test_cases)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def compile(self, code: str, workdir: str) -> RunResult:
+        source_path = os.path.join(workdir, "Program.cs")
+        with open(source_path, "w", encoding="utf-8") as source_file:
+            source_file.write(code)
+
+        command = [self.compiler, "-nologo", "-out:program.exe", "Program.cs"]
+        return self._execute(command, workdir, None, self.compile_time_limit, limit_resources=False)
+
+    def run_test_cases(self, workdir: str, test_cases: list[TestCaseData]) -> EvaluationResult:
+        if not test_cases:
+            # Nothing to check the behaviour against: a clean compilation is all we can judge
+            return EvaluationResult(verdict="Accepted", output="El código compila correctamente.")
+
+        details = []
+        passed = 0
+        for index, test_case in enumerate(test_cases, start=1):
+            result = self.run(workdir, test_case.input)
+
+            if result.timed_out:
+                return EvaluationResult(verdict="Time Limit Exceeded", passed=passed, total=len(test_cases),
+                                        output=f"Prueba {index}: se excedió el tiempo límite.")
+            if result.returncode != 0:
+                return EvaluationResult(verdict="Runtime Error", passed=passed, total=len(test_cases),
+                                        output=self._truncate(f"Prueba {index}:\n{result.stderr}"))
+            if self._normalize_output(result.stdout) != self._normalize_output(test_case.expected_output):
+                details.append(f"Prueba {index}: salida incorrecta.")
+                continue
+            passed += 1
+
+        verdict = "Accepted" if passed == len(test_cases) else "Wrong Answer"
+        return EvaluationResult(verdict=verdict, passed=passed, total=len(test_cases),
+                                output="\n".join(details), details=details)
+
+    def run(self, workdir: str, stdin: str | None) -> RunResult:
+        command = [self.runtime, "program.exe"] if self.runtime else [os.path.join(workdir, "program.exe")]
+        return self._execute(command, workdir, stdin, self.time_limit, limit_resources=True)
+
+    def _execute(self, command: list[str], workdir: str, stdin: str | None, timeout: float,
+                 limit_resources: bool) -> RunResult:
+        preexec_fn = self._limit_resources if limit_resources else os.setsid
+        process = subprocess.Popen(
+            command,
+            cwd=workdir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env={"PATH": os.getenv("PATH", "/usr/bin:/bin"), "HOME": workdir},
+            preexec_fn=preexec_fn,
+            text=True,
+        )
+
+        try:
+            stdout, stderr = process.communicate(input=stdin or "", timeout=timeout)
+            return RunResult(returncode=process.returncode, stdout=stdout, stderr=stderr)
+        except subprocess.TimeoutExpired:
+            self._kill_process_group(process)
+            stdout, stderr = process.communicate()
+            return RunResult(returncode=None, stdout=stdout, stderr=stderr, timed_out=True)
+
+    def _limit_resources(self):
+        """Runs in the child before exec: own process group plus CPU, memory and file size limits."""
+        os.setsid()
+        cpu_seconds = max(1, int(self.time_limit) + 1)
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (10 * 1024 * 1024, 10 * 1024 * 1024))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if self.memory_limit_mb:
+            limit = self.memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    @staticmethod
+    def _kill_process_group(process: subprocess.Popen):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def _normalize_output(output: str) -> str:
+        lines = [line.rstrip() for line in output.strip().splitlines()]
+        return "\n".join(lines)
+
+    def _truncate(self, text: str) -> str:
+        text = text.strip()
+        if len(text) <= self.MAX_OUTPUT_CHARS:
+            return text
+        return text[:self.MAX_OUTPUT_CHARS] + "\n..."
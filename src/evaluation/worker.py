@@ -0,0 +1,83 @@
+import logging
+import multiprocessing
+import os
+import socket
+import time
+
+from database.database import SessionLocal
+from evaluation.cache import ArtifactCache, source_hash
+from evaluation.sandbox import CSharpSandbox
+from metrics import start_metrics_server_from_env
+from services.evaluation_service import EvaluationService
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationWorker:
+    def __init__(self, worker_id: str, sandbox: CSharpSandbox, poll_interval: float = 1.0):
+        """
+        Pulls jobs from the evaluation_jobs table and runs them in the sandbox.
+
+        Args:
+            worker_id (str): Identifier stored on the jobs this worker locks.
+            sandbox (CSharpSandbox): Sandbox used to compile and run the submissions.
+            poll_interval (float): Seconds to wait before polling again when the queue is empty.
+        """
+        self.worker_id = worker_id
+        self.sandbox = sandbox
+        self.poll_interval = poll_interval
+
+    def run_forever(self):
+        logger.info(f"Evaluation worker {self.worker_id} started")
+        while True:
+            if not self.process_next_job():
+                time.sleep(self.poll_interval)
+
+    def process_next_job(self) -> bool:
+        """Evaluate a single job. Returns False when the queue was empty."""
+        with SessionLocal() as session:
+            service = EvaluationService(session)
+            job = service.claim_next_job(self.worker_id)
+            if job is None:
+                return False
+
+            job_id = job.id
+            cached_result = service.get_cached_result(job.attempt.evaluation_key)
+            if cached_result is not None:
+                # An identical submission was evaluated after this one was queued
+                service.complete_job(job_id, cached_result)
+                logger.info(f"Job {job_id} resolved from cache: {cached_result.verdict}")
+                return True
+
+            code, test_cases = service.get_job_payload(job)
+            # Do not hold the connection while the submission is running
+            session.commit()
+
+            try:
+                result = self.sandbox.evaluate(code, test_cases, fingerprint=source_hash(code))
+            except Exception as e:
+                logger.error(f"Evaluation of job {job_id} failed: {e}", exc_info=True)
+                service.fail_job(job_id, str(e))
+                return True
+
+            service.complete_job(job_id, result)
+            logger.info(f"Job {job_id} evaluated: {result.verdict}")
+            return True
+
+
+def _run_worker(index: int):
+    logging.basicConfig(level=logging.INFO)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    start_metrics_server_from_env("EVALUATION_METRICS_PORT", offset=index)
+    EvaluationWorker(worker_id, CSharpSandbox(artifact_cache=ArtifactCache())).run_forever()
+
+
+def run_worker_pool(processes: int):
+    """Start `processes` evaluation workers and wait for them."""
+    # Spawn, so every worker creates its own database engine instead of sharing forked connections
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_run_worker, args=(index,), daemon=True) for index in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
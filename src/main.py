@@ -1,21 +1,55 @@
+import os
+
 from dotenv import load_dotenv
 
+from database.database import SessionLocal
+from metrics import start_metrics_server_from_env
 from rag.ai_tutor import AITutor
-from rag.utils import get_gemini_llm, get_retriever
+from rag.faq import FaqIndex
+from rag.llm_router import create_router_from_env
+from rag.utils import get_retriever, get_embeddings
+from services import TopicService
+from storage import create_store_from_env
 from telegram_bot.bot import TelegramBot
+from telegram_bot.persistence import StorePersistence
+from telegram_bot.webhook import WebhookConfig, run_webhook_server
 
 load_dotenv()
 
 
-def create_bot():
-    llm = get_gemini_llm()
-    retriever = get_retriever()
-    ai_tutor = AITutor(llm, retriever)
+def create_bot(background_tasks: bool = True):
+    # Each task runs on the backend LLM_ROUTES binds it to; only generation needs the remote LLM by default
+    router = create_router_from_env()
+    with SessionLocal() as session:
+        topics = [(topic.id, topic.name) for topic in TopicService(session).get_all().item or []]
+    retriever = get_retriever(topics)
+    ai_tutor = AITutor(router.chat_model("answer"), retriever, router)
+
+    store = create_store_from_env()
+    # Conversation states only need an external store when they must outlive or be shared by the process
+    persistence = StorePersistence(store) if os.getenv("PERSISTENCE_BACKEND", "memory") != "memory" else None
+
+    # Precomputed answers (build_faq.py) are looked up before the RAG chain unless disabled
+    faq = FaqIndex(get_embeddings()) if os.getenv("FAQ_ENABLED", "true").lower() == "true" else None
+
+    # Greetings, thanks and off-topic messages get a canned answer unless disabled
+    intent_filter = os.getenv("INTENT_FILTER_ENABLED", "true").lower() == "true"
+    # Follow-up questions are read with the student's recent ones unless disabled
+    conversation_memory = os.getenv("CONVERSATION_MEMORY_ENABLED", "true").lower() == "true"
+    # Every /ask question is written to the questions table, in batches, unless disabled
+    question_log = os.getenv("QUESTION_LOG_ENABLED", "true").lower() == "true"
 
-    telegram_bot = TelegramBot(ai_tutor=ai_tutor, llm=llm)
+    telegram_bot = TelegramBot(ai_tutor=ai_tutor, llm=router.chat_model("feedback"), background_tasks=background_tasks,
+                               store=store, persistence=persistence, faq=faq,
+                               intent_filter=intent_filter, conversation_memory=conversation_memory,
+                               question_log=question_log)
     return telegram_bot
 
 
 if __name__ == "__main__":
-    bot = create_bot()
-    bot.run()
+    start_metrics_server_from_env()
+    if os.getenv("BOT_MODE", "polling") == "webhook":
+        run_webhook_server(create_bot, WebhookConfig.from_env())
+    else:
+        bot = create_bot()
+        bot.run()
@@ -0,0 +1,2 @@
+from metrics.registry import MetricsRegistry, Counter, Gauge, Histogram, get_registry
+from metrics.server import start_metrics_server, start_metrics_server_from_env
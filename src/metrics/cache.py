@@ -0,0 +1,5 @@
+from metrics.registry import get_registry
+
+# Shared by every cache (answers, evaluation, compiled programs, feedback, FAQ) so hit rates compare by label
+CACHE_REQUESTS = get_registry().counter("cache_requests_total", "Cache lookups, by cache and result",
+                                        ("cache", "result"))
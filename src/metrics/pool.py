@@ -0,0 +1,20 @@
+import time
+
+from sqlalchemy.pool import QueuePool
+
+from metrics.registry import get_registry
+
+POOL_CHECKOUT_WAIT = get_registry().histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long every checkout waits for a free connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
@@ -0,0 +1,45 @@
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics.registry import MetricsRegistry, get_registry
+
+logger = logging.getLogger(__name__)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1", registry: MetricsRegistry | None = None) \
+        -> ThreadingHTTPServer:
+    """Serve GET /metrics in the Prometheus text format from a daemon thread."""
+    registry = registry or get_registry()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return server
+
+
+def start_metrics_server_from_env(port_variable: str = "METRICS_PORT", offset: int = 0) -> ThreadingHTTPServer | None:
+    """
+    Start the metrics endpoint if `port_variable` is set. Processes sharing the variable (webhook shards,
+    evaluation workers) pass their index as `offset` so each gets its own port.
+    """
+    port = os.getenv(port_variable)
+    if not port:
+        return None
+    return start_metrics_server(int(port) + offset, os.getenv("METRICS_HOST", "127.0.0.1"))
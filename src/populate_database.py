@@ -1,7 +1,11 @@
+import asyncio
+import json
+
 from sqlalchemy.orm import Session
-from database.models import Topic, Exercise
+from database.models import Topic, Exercise, ExerciseTestCase
 from database.database import engine
-import json
+from storage import create_store_from_env
+from storage.cache import bump_catalog_version
 
 # Path to the JSON file
 json_file_path = "../data/topics.json"
@@ -24,6 +28,11 @@ def populate_database(session: Session, data: list):
                 difficulty=exercise_data["difficulty"],
                 solution=exercise_data["solution"]
             )
+            exercise.test_cases = [
+                ExerciseTestCase(order=order, input=test_case.get("input"),
+                                 expected_output=test_case["expected_output"])
+                for order, test_case in enumerate(exercise_data.get("test_cases", []))
+            ]
             exercises.append(exercise)
         topic.exercises = exercises
 
@@ -36,4 +45,16 @@ def populate_database(session: Session, data: list):
 with Session(engine) as db_session:
     populate_database(db_session, topics_data)
 
+
+async def invalidate_catalog_caches():
+    store = create_store_from_env()
+    try:
+        await bump_catalog_version(store)
+    finally:
+        await store.close()
+
+
+# Cached answers depend on the catalog
+asyncio.run(invalidate_catalog_caches())
+
 print("Database populated successfully.")
@@ -2,9 +2,15 @@ from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
 
+from rag.intents import parse_intent
+from rag.llm_router import LLMRouter
+from rag.single_flight import SingleFlight
+from rag.text import canonical_question
+from rag.utils import tracing_callback
+
 
 class RAG:
-    def __init__(self, system_prompt: str, llm, retriever):
+    def __init__(self, system_prompt: str, llm, retriever, router: LLMRouter | None = None):
         """
         Base class for creating a Retrieval-Augmented Generation (RAG) chain.
 
@@ -12,8 +18,10 @@ class RAG:
             system_prompt (str): The system prompt template.
             llm: The language model to use.
             retriever: The retriever to use for context retrieval.
+            router (LLMRouter): Backends of the auxiliary tasks, such as query cleanup (default: all on `llm`).
         """
-        self.system_prompt = system_prompt + '\n ------ \n{context}'
+        # The history is only filled in for follow-up questions
+        self.system_prompt = system_prompt + '\n ------ \n{context}{history}'
 
         # Set up the prompt for the QA chain
         self.prompt = ChatPromptTemplate.from_messages(
@@ -24,13 +32,18 @@ class RAG:
         )
 
         self.llm = llm
+        self.router = router or LLMRouter.for_llm(llm)
 
         self.chain = create_stuff_documents_chain(llm, self.prompt)
         self.rag_chain = create_retrieval_chain(retriever, self.chain)
 
+        self.single_flight = SingleFlight("questions")
+        # Propagated to the retriever and the LLM inside the chain
+        self.chain_config = {"callbacks": [tracing_callback]}
+
     def clean_query_with_llm(self, question: str) -> str:
         """
-        Use the LLM to clean and normalize the user's question.
+        Clean and normalize the user's question with the backend the router binds to `clean_query`.
 
         Args:
             question (str): The user's question.
@@ -38,51 +51,90 @@ class RAG:
         Returns:
             str: The cleaned and normalized question.
         """
-        prompt = f"""
-        You are a helpful assistant that cleans and normalizes user queries in spanish for a RAG system.
-        Your task is to reformat the following query to make it more suitable for retrieval and generation:
-        - Correct any spelling or grammatical errors.
-        - Remove unnecessary words or phrases.
-        - Clarify ambiguous terms.
-        - Ensure the query is concise and clear.
+        return self.router.run("clean_query", question)
 
-        ----
-        Example:
-        query : qué es un array de direcciones
-        cleaned query: array de direcciones
+    async def aclean_query_with_llm(self, question: str) -> str:
+        """Async version of `clean_query_with_llm`."""
+        return await self.router.arun("clean_query", question)
 
-        ----
+    async def aclassify_intent(self, question: str) -> str:
+        """
+        Intent of the user's message, with the backend the router binds to `classify_intent`.
 
-        Original query: "{question}"
+        Args:
+            question (str): The user's message.
 
-        Cleaned query:
+        Returns:
+            str: One of `rag.intents.INTENTS`; only QUESTION needs the RAG chain.
         """
-        clean_query = self.llm.invoke(prompt)
-        return clean_query.content.strip()
+        return parse_intent(await self.router.arun("classify_intent", question))
 
-    def answer_question(self, question: str):
+    @staticmethod
+    def _chain_input(clean_question: str, topic_id: int | None, history: str) -> dict:
+        return {"input": clean_question, "topic_id": topic_id,
+                "history": f"\n ------ \nConversation so far:\n{history}" if history else ""}
+
+    def answer_question(self, question: str, topic_id: int | None = None, history: str = ""):
         """
         Use the RAG chain to answer a question.
 
         Args:
             question (str): The question to answer.
+            topic_id (int): Topic the student is working on; a topic-aware retriever searches it first.
+            history (str): Earlier turns of the conversation the question follows up on (`ConversationMemory`).
 
         Returns:
             str: The response from the RAG chain.
         """
         clean_question = self.clean_query_with_llm(question)
-        response = self.rag_chain.invoke({"input": clean_question})
+        with self.router.measure("answer"):
+            response = self.rag_chain.invoke(self._chain_input(clean_question, topic_id, history),
+                                             config=self.chain_config)
         return response
 
+    async def aanswer_question(self, question: str, topic_id: int | None = None, history: str = ""):
+        """
+        Async version of `answer_question` that coalesces identical concurrent questions.
+
+        Questions that normalize to the same text share one pipeline run. Different wordings that the
+        LLM cleans to the same query share the retrieval and generation step.
+
+        Args:
+            question (str): The question to answer, standalone (follow-ups already condensed).
+            topic_id (int): Topic the student is working on; a topic-aware retriever searches it first.
+            history (str): Earlier turns of the conversation the question follows up on. Coalesced callers
+                share the history of the first one.
+
+        Returns:
+            dict: The response from the RAG chain, shared by every coalesced caller (do not modify it).
+        """
+        return await self.single_flight.do(("question", topic_id, canonical_question(question)),
+                                           lambda: self._aanswer_question(question, topic_id, history))
+
+    def is_being_answered(self, question: str, topic_id: int | None = None) -> bool:
+        """Whether an identical question is being answered right now, so awaiting it costs nothing."""
+        return self.single_flight.is_in_flight(("question", topic_id, canonical_question(question)))
+
+    async def _aanswer_question(self, question: str, topic_id: int | None, history: str):
+        clean_question = await self.aclean_query_with_llm(question)
+        return await self.single_flight.do(("clean_question", topic_id, canonical_question(clean_question)),
+                                           lambda: self._arun_chain(clean_question, topic_id, history))
+
+    async def _arun_chain(self, clean_question: str, topic_id: int | None, history: str):
+        with self.router.measure("answer"):
+            return await self.rag_chain.ainvoke(self._chain_input(clean_question, topic_id, history),
+                                                config=self.chain_config)
+
 
 class AITutor(RAG):
-    def __init__(self, llm, retriever):
+    def __init__(self, llm, retriever, router: LLMRouter | None = None):
         """
         Specialized AI tutor class for C# programming.
 
         Args:
             llm: The language model to use.
             retriever: The retriever to use for context retrieval.
+            router (LLMRouter): Backends of the auxiliary tasks (default: all on `llm`).
         """
         # Define the specific system prompt for the AI tutor
         system_prompt = '''
@@ -104,4 +156,4 @@ class AITutor(RAG):
         Keep your answers concise, informative, and engaging, ensuring students feel supported in their learning journey.
         Do not add any information beyond what the material provides.
         '''
-        super().__init__(system_prompt, llm, retriever)
+        super().__init__(system_prompt, llm, retriever, router)
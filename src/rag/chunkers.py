@@ -0,0 +1,163 @@
+import re
+from dataclasses import dataclass
+from itertools import groupby
+
+from langchain_core.documents import Document
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?:])\s+")
+_PAGE_NUMBER = re.compile(r"^\s*(p[áa]g(ina)?\.?\s*)?\d{1,4}\s*$", re.IGNORECASE)
+
+_NUMBERED_HEADING = re.compile(r"^(\d+(\.\d+)*)\.?\s+[A-ZÁÉÍÓÚÑ¿¡]")
+_NAMED_HEADING = re.compile(r"^(cap[ií]tulo|tema|secci[oó]n|unidad|ejemplo|ejercicio)s?\s+[\w.]+", re.IGNORECASE)
+
+_CODE_START = re.compile(
+    r"^\s*(using\s|namespace\s|(public|private|protected|internal|static|abstract|sealed|override|virtual|async)\s"
+    r"|class\s|interface\s|struct\s|enum\s|void\s|int\s|double\s|float\s|bool\s|char\s|string\s|var\s|return\b"
+    r"|if\s*\(|else\b|for\s*\(|foreach\s*\(|while\s*\(|do\b|switch\s*\(|case\s|default:|break;|continue;|try\b"
+    r"|catch\b|finally\b|throw\s|new\s|Console\.|//|/\*|\*/|#region|#endregion|\[\w+)"
+)
+_CODE_END = re.compile(r"[;{}]\s*(//.*)?$")
+_CODE_SYMBOLS = re.compile(r"=>|\(\);|\[\]|\+\+|--|==|!=|&&|\|\|")
+
+
+def count_tokens(text: str) -> int:
+    """Cheap token estimate: words and punctuation marks, close to what subword tokenizers give for code."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def is_heading(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped or len(stripped) > 80 or stripped[-1] in ".,;:{}()" or is_code(stripped):
+        return False
+    if _NUMBERED_HEADING.match(stripped) or _NAMED_HEADING.match(stripped):
+        return True
+    letters = [char for char in stripped if char.isalpha()]
+    return len(letters) >= 4 and all(char.isupper() for char in letters)
+
+
+def is_code(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped:
+        return False
+    if stripped in ("{", "}", "};", "});"):
+        return True
+    return bool(_CODE_START.match(stripped) or _CODE_END.search(stripped) or _CODE_SYMBOLS.search(stripped))
+
+
+@dataclass
+class _Block:
+    kind: str  # heading, code or text
+    text: str
+    page: int
+    tokens: int
+
+
+class StructureAwareChunker:
+    def __init__(self, target_tokens: int = 400, max_tokens: int = 1000):
+        """
+        Splits text extracted from code-heavy PDFs along its structure: chunks start at headings, code samples
+        are kept whole and prose is packed up to a token budget. Each chunk carries the title of its section.
+
+        Args:
+            target_tokens (int): Size chunks are filled up to.
+            max_tokens (int): Largest chunk allowed; only a code sample longer than the target may reach it,
+                longer ones are split between lines.
+        """
+        self.target_tokens = target_tokens
+        self.max_tokens = max_tokens
+
+    def split_documents(self, documents: list[Document]) -> list[Document]:
+        """
+        Chunk page documents (as loaded by PyPDFLoader). Pages of the same source are joined first, so sections
+        and code samples continue across page breaks; every chunk gets the page where it starts.
+        """
+        chunks = []
+        for source, pages in groupby(documents, key=lambda document: document.metadata.get("source")):
+            pages = list(pages)
+            lines = [(line, page.metadata.get("page", 0)) for page in pages for line in page.page_content.splitlines()
+                     if not _PAGE_NUMBER.match(line)]
+            chunks.extend(self._chunk(self._blocks(lines), pages[0].metadata))
+        return chunks
+
+    def _blocks(self, lines: list[tuple[str, int]]) -> list[_Block]:
+        blocks = []
+        kind, buffer, page = None, [], 0
+
+        def flush():
+            if buffer:
+                text = "\n".join(buffer) if kind == "code" else " ".join(line.strip() for line in buffer)
+                blocks.append(_Block(kind, text.strip("\n"), page, count_tokens(text)))
+            buffer.clear()
+
+        for line, line_page in lines:
+            if not line.strip():
+                # A blank line ends a paragraph but not a code sample
+                if kind == "text":
+                    flush()
+                    kind = None
+                elif kind == "code":
+                    buffer.append("")
+                continue
+            line_kind = "heading" if is_heading(line) else "code" if is_code(line) else "text"
+            # Prose-looking lines inside braces (e.g. a string literal) stay in the code sample
+            if kind == "code" and line_kind != "heading" and line.startswith((" ", "\t")):
+                line_kind = "code"
+            if line_kind != kind or line_kind == "heading":
+                flush()
+                kind, page = line_kind, line_page
+            buffer.append(line.rstrip() if line_kind == "code" else line)
+        flush()
+        return blocks
+
+    def _chunk(self, blocks: list[_Block], metadata: dict) -> list[Document]:
+        chunks = []
+        section = ""
+        parts: list[_Block] = []
+        tokens = 0
+
+        def emit():
+            nonlocal tokens
+            if any(part.kind != "heading" for part in parts):
+                chunks.append(Document(
+                    page_content="\n\n".join(part.text for part in parts),
+                    metadata={**metadata, "page": parts[0].page, "section": section,
+                              "has_code": any(part.kind == "code" for part in parts)},
+                ))
+                parts.clear()
+                tokens = 0
+
+        for block in blocks:
+            if block.kind == "heading":
+                emit()
+                section = block.text.strip()
+                parts.append(block)
+                tokens = block.tokens
+                continue
+
+            for piece in self._fit(block):
+                if parts and tokens + piece.tokens > (self.max_tokens if piece.kind == "code" else self.target_tokens):
+                    emit()
+                parts.append(piece)
+                tokens += piece.tokens
+        emit()
+        return chunks
+
+    def _fit(self, block: _Block) -> list[_Block]:
+        """Split a block that does not fit in a chunk on its own: code between lines, prose between sentences."""
+        limit = self.max_tokens if block.kind == "code" else self.target_tokens
+        if block.tokens <= limit:
+            return [block]
+        units = block.text.split("\n") if block.kind == "code" else _SENTENCE_END.split(block.text)
+        separator = "\n" if block.kind == "code" else " "
+        pieces, current, current_tokens = [], [], 0
+        for unit in units:
+            unit_tokens = count_tokens(unit)
+            if current and current_tokens + unit_tokens > limit:
+                pieces.append(_Block(block.kind, separator.join(current), block.page, current_tokens))
+                current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += unit_tokens
+        if current:
+            pieces.append(_Block(block.kind, separator.join(current), block.page, current_tokens))
+        return pieces
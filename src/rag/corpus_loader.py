@@ -5,6 +5,8 @@ from pathlib import Path
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
 
+from rag.chunkers import StructureAwareChunker
+
 
 class CorpusLoader(ABC):
     """
@@ -32,20 +34,27 @@ class CorpusLoader(ABC):
 
 
 class PDFCorpusLoader(CorpusLoader):
-    def __init__(self, folder_path: str, chunk_size: int = 2000, chunk_overlap: int = 200):
+    def __init__(self, folder_path: str, chunk_size: int = 2000, chunk_overlap: int = 200,
+                 chunker: StructureAwareChunker | None = None):
+        """
+        :param folder_path: Path to the folder with the PDFs.
+        :param chunk_size: Characters per chunk of the default character splitter.
+        :param chunk_overlap: Characters shared by consecutive chunks of the default character splitter.
+        :param chunker: Splitter used instead of the character splitter, e.g. a StructureAwareChunker.
+        """
         super().__init__(folder_path)
-        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.text_splitter = chunker or RecursiveCharacterTextSplitter(chunk_size=chunk_size,
+                                                                       chunk_overlap=chunk_overlap)
 
-    def load_corpus(self):
+    def load_pages(self):
         """
-        Loads PDFs from the specified folder, splits their text into chunks,
-        and returns a list of processed document chunks.
+        Loads the PDFs from the specified folder without chunking them.
 
         Returns:
-            list: A list containing all chunked documents with metadata.
+            list: One document per PDF page, with `source` and `page` metadata.
         """
-        pdf_corpus = []
-        pdf_files = list(self.folder_path.glob("*.pdf"))
+        pages = []
+        pdf_files = sorted(self.folder_path.glob("*.pdf"))
 
         if not pdf_files:
             logging.warning(f"No PDF files found in {self.folder_path}")
@@ -53,11 +62,19 @@ class PDFCorpusLoader(CorpusLoader):
         for pdf_file in pdf_files:
             try:
                 loader = PyPDFLoader(str(pdf_file))
-                documents = loader.load()
-                chunked_documents = self.text_splitter.split_documents(documents)
-                pdf_corpus.extend(chunked_documents)
+                pages.extend(loader.load())
             except Exception as e:
                 logging.error(f"Failed to process {pdf_file.name}: {e}")
 
-        return pdf_corpus
+        return pages
+
+    def load_corpus(self):
+        """
+        Loads PDFs from the specified folder, splits their text into chunks,
+        and returns a list of processed document chunks.
+
+        Returns:
+            list: A list containing all chunked documents with metadata.
+        """
+        return self.text_splitter.split_documents(self.load_pages())
 
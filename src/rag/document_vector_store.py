@@ -1,9 +1,13 @@
 import os
 
+import numpy as np
 from langchain.schema import Document
 from langchain_chroma import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
+from rag.snapshot import SnapshotVectorStore, VectorSnapshot, write_snapshot
+from tracing.llm import TracedEmbeddings
+
 
 class ChromaVectorDatabase:
     def __init__(self, persist_directory: str, google_api_key: str, embedding_model="models/text-embedding-004"):
@@ -15,6 +19,7 @@ class ChromaVectorDatabase:
             embedding_model (str): The embedding model to use. Default is "models/embedding-001".
         """
         self.persist_directory = persist_directory
+        self.embedding_model = embedding_model
         self.embeddings = self._initialize_embeddings(embedding_model, google_api_key)
         self.vector_db = None
         self._initialize_vector_store()
@@ -27,9 +32,9 @@ class ChromaVectorDatabase:
             model (str): The embedding model to use.
 
         Returns:
-            GoogleGenerativeAIEmbeddings: Initialized embeddings.
+            TracedEmbeddings: Initialized embeddings, recording a span per call.
         """
-        return GoogleGenerativeAIEmbeddings(model=model, google_api_key=google_api_key)
+        return TracedEmbeddings(GoogleGenerativeAIEmbeddings(model=model, google_api_key=google_api_key))
 
     def _initialize_vector_store(self):
         """Initializes the Chroma vector store."""
@@ -96,3 +101,79 @@ class ChromaVectorDatabase:
         Deletes the entire collection in the vector store.
         """
         self.vector_db.delete_collection()
+
+    def _distance(self) -> str:
+        """Distance of the collection, so a snapshot scores like it."""
+        collection = self.vector_db._collection
+        configuration = getattr(collection, "configuration", None) or {}
+        hnsw = configuration.get("hnsw") if hasattr(configuration, "get") else None
+        return (hnsw or {}).get("space") or (collection.metadata or {}).get("hnsw:space") or "l2"
+
+    def export_snapshot(self, path: str, batch_size: int = 1000) -> dict:
+        """
+        Write every chunk, with its embedding, to a snapshot file (see `rag.snapshot`), so other instances can
+        load the store without the Chroma directory or any embedding call.
+
+        Args:
+            path (str): Snapshot file to write.
+            batch_size (int): Chunks read from Chroma at a time.
+
+        Returns:
+            dict: The snapshot's manifest.
+        """
+        ids, vectors, texts, metadatas = [], [], [], []
+        offset = 0
+        while True:
+            batch = self.vector_db.get(include=["embeddings", "documents", "metadatas"], limit=batch_size,
+                                       offset=offset)
+            if not batch["ids"]:
+                break
+            ids += batch["ids"]
+            vectors += list(batch["embeddings"])
+            texts += batch["documents"]
+            metadatas += batch["metadatas"]
+            offset += len(batch["ids"])
+        if not ids:
+            raise ValueError("The vector store is empty")
+        return write_snapshot(path, ids, vectors, texts, metadatas, self.embedding_model, self._distance())
+
+    def import_snapshot(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Load a snapshot into this Chroma store with the stored embeddings, replacing chunks with the same ids.
+
+        Returns:
+            int: Chunks imported.
+        """
+        snapshot = VectorSnapshot(path)
+        if snapshot.embedding_model != self.embedding_model:
+            raise ValueError(f"Snapshot was built with {snapshot.embedding_model}, not {self.embedding_model}")
+        for start in range(0, len(snapshot), batch_size):
+            positions = range(start, min(start + batch_size, len(snapshot)))
+            # The LangChain wrapper always embeds the texts; the collection takes the vectors as they are
+            self.vector_db._collection.upsert(
+                ids=[snapshot.id(position) for position in positions],
+                embeddings=np.asarray(snapshot.vectors[start:positions.stop]),
+                documents=[snapshot.text(position) for position in positions],
+                metadatas=[snapshot.metadata(position) or None for position in positions],
+            )
+        return len(snapshot)
+
+    def in_process_store(self, path: str, quantization: str = "none",
+                         rescore_factor: int | None = None) -> SnapshotVectorStore:
+        """
+        Search the chunks in this process instead of through Chroma: the store is exported to the snapshot at
+        `path` unless it exists, then memory-mapped. With `int8` or `binary` quantization only the compact codes
+        are scanned and the best candidates are rescored with their float32 vectors from the mapped file.
+
+        Args:
+            path (str): Snapshot file, written on first use.
+            quantization (str): `none`, `int8` or `binary`.
+            rescore_factor (int): Candidates rescored per result (default the quantization's).
+
+        Returns:
+            SnapshotVectorStore: Read-only store, re-export the snapshot after adding documents.
+        """
+        if not os.path.exists(path):
+            self.export_snapshot(path)
+        return SnapshotVectorStore.load(path, self.embeddings, self.embedding_model, quantization=quantization,
+                                        rescore_factor=rescore_factor)
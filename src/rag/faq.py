@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from metrics.cache import CACHE_REQUESTS
+from rag.text import canonical_question, strip_command
+from rag.topic_retrieval import NO_TOPIC
+
+logger = logging.getLogger(__name__)
+
+
+def question_key(question: str, topic_id: int | None) -> str:
+    """Identity of an FAQ entry: the topic and the canonical question."""
+    return hashlib.sha256(f"{topic_id or NO_TOPIC}:{canonical_question(question)}".encode("utf-8")).hexdigest()
+
+
+def to_unit_vectors(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+@dataclass
+class FaqCandidate:
+    question: str
+    topic_id: int | None
+    source: str  # Topic or History, as in faq_entries.source
+    # How many past questions it stands for
+    frequency: int = 1
+
+
+@dataclass
+class GeneratedAnswer:
+    candidate: FaqCandidate
+    answer: str
+    embedding: np.ndarray
+
+
+@dataclass
+class FaqMatch:
+    entry_id: int
+    question: str
+    answer: str
+    similarity: float
+
+
+def topic_candidates(topics: list[tuple[int, str]]) -> list[FaqCandidate]:
+    """One definition question per catalog topic."""
+    return [FaqCandidate(f"¿Qué es {name}?", topic_id, "Topic") for topic_id, name in topics]
+
+
+def cluster_questions(questions: list[str], embeddings: Embeddings, threshold: float = 0.85,
+                      top_n: int = 50) -> list[FaqCandidate]:
+    """
+    Group past questions that ask the same thing and return the most frequent groups.
+
+    Identical questions (after normalization) are counted once and embedded once. Then, from the most to the
+    least frequent, each question joins the first group whose leader is at least `threshold` similar, or leads
+    a new group. Each group is represented by its leader, the most frequent wording.
+
+    Args:
+        questions (list[str]): Past questions, repeated as many times as they were asked.
+        embeddings (Embeddings): Model used to compare the questions.
+        threshold (float): Cosine similarity for two questions to be considered the same.
+        top_n (int): Groups returned.
+
+    Returns:
+        list[FaqCandidate]: The leaders of the `top_n` largest groups, largest first.
+    """
+    counts = Counter()
+    wordings: dict[str, Counter] = {}
+    for question in questions:
+        question = question.strip()
+        normalized = canonical_question(question)
+        if not normalized:
+            continue
+        counts[normalized] += 1
+        wordings.setdefault(normalized, Counter())[question] += 1
+    if not counts:
+        return []
+
+    keys = [key for key, _ in counts.most_common()]
+    texts = [wordings[key].most_common(1)[0][0] for key in keys]
+    vectors = to_unit_vectors(embeddings.embed_documents(texts))
+
+    leaders: list[int] = []
+    sizes: list[int] = []
+    leader_vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+    for position, vector in enumerate(vectors):
+        if len(leaders):
+            similarities = leader_vectors @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                sizes[best] += counts[keys[position]]
+                continue
+        leaders.append(position)
+        sizes.append(counts[keys[position]])
+        leader_vectors = np.vstack([leader_vectors, vector])
+
+    groups = sorted(zip(leaders, sizes), key=lambda group: group[1], reverse=True)[:top_n]
+    return [FaqCandidate(texts[leader], None, "History", size) for leader, size in groups]
+
+
+class FaqBuilder:
+    def __init__(self, ai_tutor, embeddings: Embeddings, concurrency: int = 4):
+        """
+        Answers FAQ candidates in bulk with the tutor's RAG chain.
+
+        Args:
+            ai_tutor: The AI tutor answering /ask questions, so FAQ answers read like live ones.
+            embeddings (Embeddings): Model that embeds the questions for the lookup; must be the bot's.
+            concurrency (int): Questions answered at the same time.
+        """
+        self.ai_tutor = ai_tutor
+        self.embeddings = embeddings
+        self.concurrency = concurrency
+
+    async def build(self, candidates: list[FaqCandidate]) -> list[GeneratedAnswer]:
+        """Answer and embed every candidate; candidates that fail or get no answer are logged and left out."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def answer(candidate: FaqCandidate) -> str | None:
+            async with semaphore:
+                try:
+                    response = await self.ai_tutor.aanswer_question(candidate.question, candidate.topic_id)
+                except Exception as e:
+                    logger.warning(f"Could not answer FAQ question '{candidate.question}': {e}")
+                    return None
+            return response.get("answer")
+
+        answers = await asyncio.gather(*(answer(candidate) for candidate in candidates))
+        answered = [(candidate, text) for candidate, text in zip(candidates, answers) if text]
+        if not answered:
+            return []
+        vectors = await self.embeddings.aembed_documents([candidate.question for candidate, _ in answered])
+        return [GeneratedAnswer(candidate, text, np.asarray(vector, dtype=np.float32))
+                for (candidate, text), vector in zip(answered, vectors)]
+
+
+class FaqIndex:
+    def __init__(self, embeddings: Embeddings, min_similarity: float | None = None):
+        """
+        In-memory nearest-neighbour lookup over the approved FAQ entries, consulted before the RAG chain.
+
+        Args:
+            embeddings (Embeddings): Model that embeds the incoming questions; the entries must have been
+                embedded with the same one.
+            min_similarity (float): Cosine similarity a question needs to get an entry's answer
+                (default FAQ_MIN_SIMILARITY or 0.9).
+        """
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity or float(os.getenv("FAQ_MIN_SIMILARITY", "0.9"))
+        self._ids: list[int] = []
+        self._questions: list[str] = []
+        self._answers: list[str] = []
+        self._topics = np.empty(0, dtype=np.int64)
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._hits: Counter[int] = Counter()
+        self._hit_counter = CACHE_REQUESTS.labels("faq", "hit")
+        self._miss_counter = CACHE_REQUESTS.labels("faq", "miss")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, entries):
+        """
+        Replace the indexed entries.
+
+        Args:
+            entries: FaqEntry rows (id, question, answer, topic_id and a float32 `embedding`).
+        """
+        entries = list(entries)
+        matrix = to_unit_vectors([np.frombuffer(entry.embedding, dtype=np.float32) for entry in entries]) \
+            if entries else np.empty((0, 0), dtype=np.float32)
+        # Swapped together so a concurrent lookup sees either the old or the new entries
+        self._ids, self._questions, self._answers, self._topics, self._matrix = (
+            [entry.id for entry in entries],
+            [entry.question for entry in entries],
+            [entry.answer for entry in entries],
+            np.array([entry.topic_id or NO_TOPIC for entry in entries], dtype=np.int64),
+            matrix,
+        )
+
+    def match(self, vector, topic_id: int | None = None) -> FaqMatch | None:
+        """
+        Closest entry to an embedded question if it is similar enough. Among the entries above the threshold,
+        those of the student's topic (or of no topic) win over the rest.
+        """
+        ids, questions, answers, topics, matrix = \
+            self._ids, self._questions, self._answers, self._topics, self._matrix
+        if not ids:
+            return None
+        similarities = matrix @ to_unit_vectors(vector)
+        candidates = np.flatnonzero(similarities >= self.min_similarity)
+        if not len(candidates):
+            self._miss_counter.inc()
+            return None
+        preferred = candidates[(topics[candidates] == NO_TOPIC) | (topics[candidates] == (topic_id or NO_TOPIC))]
+        pool = preferred if len(preferred) else candidates
+        best = int(pool[np.argmax(similarities[pool])])
+        self._hit_counter.inc()
+        self._hits[ids[best]] += 1
+        return FaqMatch(ids[best], questions[best], answers[best], float(similarities[best]))
+
+    async def alookup(self, question: str, topic_id: int | None = None) -> FaqMatch | None:
+        """
+        Embed the question and look it up. Errors are logged and treated as a miss, so a failing lookup
+        never keeps the question from the live RAG path.
+        """
+        if not self._ids:
+            return None
+        try:
+            vector = await self.embeddings.aembed_query(strip_command(question))
+        except Exception as e:
+            logger.warning(f"FAQ lookup failed: {e}")
+            return None
+        return self.match(vector, topic_id)
+
+    def take_hits(self) -> dict[int, int]:
+        """Hits per entry id since the last call, to be added to faq_entries.hits."""
+        hits, self._hits = self._hits, Counter()
+        return dict(hits)
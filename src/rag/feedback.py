@@ -0,0 +1,67 @@
+import os
+from dataclasses import dataclass
+
+from langchain_core.prompts import ChatPromptTemplate
+
+
+@dataclass
+class FeedbackRequest:
+    exercise_title: str
+    exercise_description: str
+    code: str
+    verdict: str
+    evaluation_output: str | None = None
+
+
+class SubmissionFeedbackGenerator:
+    def __init__(self, llm, max_concurrency: int | None = None):
+        """
+        Generates tutor feedback for evaluated submissions, several at a time.
+
+        Args:
+            llm: The language model to use.
+            max_concurrency (int): Maximum number of LLM calls in flight for one batch.
+        """
+        self.llm = llm
+        self.max_concurrency = max_concurrency or int(os.getenv("FEEDBACK_MAX_CONCURRENCY", "4"))
+        self.prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", '''
+                You are an AI tutor specialized in C# programming reviewing a student's submission.
+                - Point out what the code does well and what should be improved, step by step.
+                - If the submission failed, explain the most likely cause of the failure.
+                - Do not write the complete solution; guide the student so they can fix it themselves.
+                - Respond **in Spanish**, in a warm and beginner-friendly tone, in at most a few short paragraphs.
+                '''),
+                ("human", "Ejercicio: {title}\n\n{description}\n\nResultado de la evaluación: {verdict}\n"
+                          "{evaluation_output}\n\nCódigo del estudiante:\n{code}")
+            ]
+        )
+
+    async def agenerate(self, requests: list[FeedbackRequest]) -> list[str | Exception]:
+        """
+        Generate feedback for every request with a single `abatch` call.
+
+        Args:
+            requests (list[FeedbackRequest]): The submissions to review.
+
+        Returns:
+            list[str | Exception]: The feedback for each request, or the exception raised for it.
+        """
+        if not requests:
+            return []
+
+        inputs = [
+            self.prompt.format_messages(
+                title=request.exercise_title,
+                description=request.exercise_description,
+                verdict=request.verdict,
+                evaluation_output=request.evaluation_output or "",
+                code=request.code,
+            )
+            for request in requests
+        ]
+        responses = await self.llm.abatch(inputs, config={"max_concurrency": self.max_concurrency},
+                                          return_exceptions=True)
+        return [response if isinstance(response, Exception) else response.content.strip()
+                for response in responses]
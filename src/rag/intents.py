@@ -0,0 +1,107 @@
+import re
+
+from rag.text import fold_text
+
+# What /ask does with a message: questions go to the tutor, the rest get a canned answer
+QUESTION = "question"
+GREETING = "greeting"
+THANKS = "thanks"
+GOODBYE = "goodbye"
+OFF_TOPIC = "off_topic"
+INTENTS = (QUESTION, GREETING, THANKS, GOODBYE, OFF_TOPIC)
+
+CANNED_ANSWERS = {
+    GREETING: "¡Hola! 👋 Soy tu tutor de C#. Pregúntame lo que quieras sobre el curso, por ejemplo: "
+              "/ask ¿Qué es un delegado?",
+    THANKS: "¡De nada! 😊 Si te surge otra duda sobre C#, pregúntame con /ask.",
+    GOODBYE: "¡Hasta luego! 👋 Aquí estaré cuando tengas otra pregunta sobre C#.",
+    OFF_TOPIC: "Solo puedo ayudarte con C# y el contenido del curso 🤓. Prueba a preguntarme, por ejemplo: "
+               "/ask ¿Cómo funciona un bucle for?",
+}
+
+
+# Any of these makes the message a question for the tutor, so the rules below can only reject messages that do
+# not mention programming at all
+_PROGRAMMING = re.compile(
+    r"c#|csharp|\.net|dotnet|visual studio|program|codigo|compil|ejecu|variable|funcion|metodo|clase|objeto|"
+    r"interfa[zc]|herencia|hereda|polimorfismo|encapsula|abstract|array|arreglo|matriz|lista|list<|diccionario|"
+    r"dictionary|string|cadena|caracter|\bint\b|entero|decimal|double|float|bool|\bchar\b|bucle|ciclo|\bfor\b|"
+    r"foreach|while|\bif\b|else|switch|condicion|operador|excepcion|exception|\btry\b|catch|delegado|delegate|"
+    r"evento|lambda|linq|async|await|\btask\b|hilo|thread|struct|enum|namespace|using|console|consola|recursi|"
+    r"algoritmo|orden|busqueda|buscar|puntero|referencia|\bref\b|\bout\b|propiedad|constructor|static|public|"
+    r"private|void|return|retorn|null|tipo|generic|generico|coleccion|ejercicio|solucion|pista|submit|error|"
+    r"depura|debug|archivo|fichero|imprim|leer|\blee\b|escrib|numero|suma|calcul|aleatori|random|parametro|"
+    r"argumento|declar|instancia|valor|indice|iterar|recorr|pila|cola|stack|queue|nodo|arbol|grafo|memoria|"
+    r"complejidad|sintaxis|compar|convert|parse|redonde|concaten|formato|punto y coma|llave|corchete|parentesis|"
+    r"\bpoo\b|\boop\b|orientad[ao] a objetos|fibonacci|factorial",
+)
+
+_SOCIAL = {
+    GREETING: ["hola", "holi", "buenas", "buenos dias", "buen dia", "buenas tardes", "buenas noches", "saludos",
+               "hey", "hi", "hello", "que tal", "como estas", "como esta", "como te va", "que onda", "quien eres",
+               "que eres", "que puedes hacer", "estas ahi", "hay alguien"],
+    THANKS: ["gracias", "muchas gracias", "mil gracias", "muchisimas gracias", "te lo agradezco", "genial",
+             "perfecto", "excelente", "entendido", "ya entendi", "ok", "okay", "vale", "listo", "de acuerdo",
+             "muy bien", "buenisimo", "thanks"],
+    GOODBYE: ["adios", "chao", "chau", "bye", "hasta luego", "hasta manana", "hasta pronto", "nos vemos"],
+}
+# Words that may come with the social phrases without changing what the message is
+_FILLER = {"profe", "profesor", "profesora", "tutor", "bot", "a", "todos", "ti", "y", "tu", "usted", "te", "por",
+           "todo", "la", "ayuda", "amigo", "crack", "jaja", "jajaja", "pues", "bueno", "oye", "hola", "si", "no"}
+
+# Prefixes, so plural and feminine forms also match. Words that are also classic programming examples (a series,
+# the Perro and Gato classes of an OOP lesson, a Coche object) only count with something that makes them personal
+_OFF_TOPIC = re.compile(
+    r"\b(clima|llover|lluvia|temperatura afuera|futbol|deporte|partido de|mundial|equipo favorito|pelicula|"
+    r"serie de (tv|television|netflix)|series de (tv|television|netflix)|serie favorita|ver una serie|"
+    r"musica|cancion|cantante|receta|cocinar|comida|restaurante|capital de|presidente|politic|elecciones|"
+    r"novia|novio|enamor|chiste|horoscopo|signo zodiacal|noticias|viaje|vacaciones|hotel|vuelo|quimica|biologia|"
+    r"medico|enfermedad|dieta|ropa|maquillaje|quien gano|cuantos anos tienes|poema|horario del|"
+    r"bitcoin|criptomoneda|apuesta|loteria|(mi|tu|su) (mascota|perro|perrito|gato|gatito|coche|carro))",
+)
+
+
+def _social_phrases(label: str) -> re.Pattern:
+    phrases = sorted(_SOCIAL[label], key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(phrase) for phrase in phrases) + r")\b")
+
+
+_SOCIAL_PATTERNS = {label: _social_phrases(label) for label in _SOCIAL}
+
+
+def classify_intent(message: str) -> str:
+    """
+    Keyword classifier of /ask messages, a few microseconds per message. It errs towards QUESTION: only messages
+    made of nothing but greetings, thanks or goodbyes, or that mention an unrelated subject and nothing about
+    programming, get another intent.
+
+    Args:
+        message (str): The student's message.
+
+    Returns:
+        str: One of INTENTS.
+    """
+    text = fold_text(message)
+    if not text or _PROGRAMMING.search(text):
+        return QUESTION
+
+    found = [label for label, pattern in _SOCIAL_PATTERNS.items() if pattern.search(text)]
+    if found:
+        rest = text
+        for label in found:
+            rest = _SOCIAL_PATTERNS[label].sub(" ", rest)
+        if all(word in _FILLER for word in re.findall(r"\w+", rest)):
+            # "hola, gracias" is mostly a thanks, "gracias, adiós" a goodbye
+            for label in (GOODBYE, THANKS, GREETING):
+                if label in found:
+                    return label
+
+    if _OFF_TOPIC.search(text):
+        return OFF_TOPIC
+    return QUESTION
+
+
+def parse_intent(label: str) -> str:
+    """Intent of a language model's answer; anything unexpected is treated as a question for the tutor."""
+    label = fold_text(label).strip(" .\"'`")
+    return label if label in INTENTS else QUESTION
@@ -0,0 +1,284 @@
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator
+
+from metrics import get_registry
+from rag.intents import classify_intent
+from rag.memory import condense_query, summarize
+from rag.text import strip_command
+from tracing import get_tracer
+
+LLM_TASK_LATENCY = get_registry().histogram("llm_task_latency_seconds", "Latency of each routed task, by backend",
+                                            ("task", "backend"),
+                                            buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60))
+
+# Prompts of the text-to-text tasks, for the backends that are language models
+TASK_PROMPTS = {
+    "clean_query": """
+        You are a helpful assistant that cleans and normalizes user queries in spanish for a RAG system.
+        Your task is to reformat the following query to make it more suitable for retrieval and generation:
+        - Correct any spelling or grammatical errors.
+        - Remove unnecessary words or phrases.
+        - Clarify ambiguous terms.
+        - Ensure the query is concise and clear.
+
+        ----
+        Example:
+        query : qué es un array de direcciones
+        cleaned query: array de direcciones
+
+        ----
+
+        Original query: "{text}"
+
+        Cleaned query:
+        """,
+    "condense_query": """
+        Rewrite the student's last message as a standalone question in spanish, using the conversation with a C#
+        tutor below. If it does not refer to the conversation, return it unchanged. Answer only with the question.
+
+        Conversation:
+        {history}
+
+        Last message: "{text}"
+
+        Standalone question:
+        """,
+    "summarize": """
+        Update the summary of a conversation between a student and a C# tutor with one more exchange.
+        Keep it to at most two sentences about the topics and doubts of the student.
+
+        Current summary: {summary}
+
+        Student: {text}
+        Tutor: {answer}
+
+        New summary:
+        """,
+    "classify_intent": """
+        You classify messages sent to a C# programming tutor. Answer with a single label:
+        - "greeting" if the message only greets or asks who you are,
+        - "thanks" if it only thanks or acknowledges an answer,
+        - "goodbye" if it only says goodbye,
+        - "off_topic" if it asks about something unrelated to programming,
+        - "question" otherwise, and whenever in doubt.
+
+        Message: "{text}"
+
+        Label:
+        """,
+}
+
+
+class TaskBackend(ABC):
+    name = ""
+
+    @abstractmethod
+    def run(self, task: str, text: str, **inputs: str) -> str:
+        """Run a task on `text`; some tasks take more inputs, such as the conversation history."""
+        pass
+
+    async def arun(self, task: str, text: str, **inputs: str) -> str:
+        return self.run(task, text, **inputs)
+
+    @property
+    def chat_model(self):
+        """LangChain chat model of the backend, for tasks that run inside a chain (answer generation)."""
+        raise ValueError(f"Backend '{self.name}' is not a chat model")
+
+
+class ChatModelBackend(TaskBackend):
+    def __init__(self, llm, name: str | None = None):
+        """
+        Runs tasks with a LangChain model: the remote LLM, or a small local one (Ollama, HuggingFace).
+
+        Args:
+            llm: Chat model or LLM.
+            name (str): Name reported in the task metrics (default: the model name).
+        """
+        self.llm = llm
+        self.name = name or getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+
+    @staticmethod
+    def _text(response) -> str:
+        return (response.content if hasattr(response, "content") else response).strip()
+
+    def run(self, task: str, text: str, **inputs: str) -> str:
+        return self._text(self.llm.invoke(TASK_PROMPTS[task].format(text=text, **inputs)))
+
+    async def arun(self, task: str, text: str, **inputs: str) -> str:
+        return self._text(await self.llm.ainvoke(TASK_PROMPTS[task].format(text=text, **inputs)))
+
+    @property
+    def chat_model(self):
+        return self.llm
+
+
+_ACCENTS = {"a": "[aá]", "e": "[eé]", "i": "[ií]", "o": "[oó]", "u": "[uú]"}
+
+
+def _phrase(words: str) -> str:
+    """Regex for a Spanish phrase written with or without accents."""
+    return r"\s+".join("".join(_ACCENTS.get(char, re.escape(char)) for char in word) for word in words.split())
+
+
+def _any_phrase(phrases: list[str]) -> str:
+    # Longest first, so "buenas tardes" is not cut at "buenas"
+    return "|".join(_phrase(words) for words in sorted(phrases, key=len, reverse=True))
+
+
+_GREETINGS = ["hola", "buenas", "buenos dias", "buenas tardes", "buenas noches", "saludos", "profe", "profesor",
+              "profesora", "disculpa", "perdon", "oye"]
+_LEAD_INS = ["tengo una pregunta", "tengo una duda", "una pregunta", "una duda", "quisiera saber", "quiero saber",
+             "me gustaria saber", "necesito saber", "me puedes explicar", "me podrias explicar", "puedes explicarme",
+             "podrias explicarme", "me explicas", "explicame", "me ayudas con", "necesito ayuda con", "ayuda con",
+             "no entiendo", "no se", "sabes", "dime", "que es", "que son", "que significa", "que quiere decir"]
+_POLITENESS = ["por favor", "porfa", "gracias", "muchas gracias"]
+_ARTICLES = ["un", "una", "el", "la", "los", "las", "unos", "unas", "lo"]
+
+_GREETING = re.compile(rf"^\W*(({_any_phrase(_GREETINGS)})\b[\s,.!¡]*)+", re.IGNORECASE)
+_LEAD_IN = re.compile(rf"^\W*({_any_phrase(_LEAD_INS)})\b[\s,:]*", re.IGNORECASE)
+_ARTICLE = re.compile(rf"^({_any_phrase(_ARTICLES)})\s+", re.IGNORECASE)
+_POLITE = re.compile(rf"[\s,]*\b({_any_phrase(_POLITENESS)})\b[\s,.!]*", re.IGNORECASE)
+# Only the marks around the question: `?` and `!` inside it may belong to C# operators (`!=`, `??`, `?.`, `?:`)
+_OPENING_MARKS = re.compile(r"[¿¡\"“”«»]")
+_CLOSING_MARK = re.compile(r"\s*[?!]$")
+_ATTACHED_CLOSING_MARKS = re.compile(r"(?<=[\w)\]#])[?!.]+$")
+
+
+class RuleBasedBackend(TaskBackend):
+    """
+    Cheap, local versions of the simple tasks: greetings, lead-ins and politeness are stripped from the query,
+    intents come from the keyword classifier of `rag.intents` and follow-ups are condensed and summarized as in
+    `rag.memory`. Spelling is left to the embeddings.
+    """
+    name = "rules"
+
+    def run(self, task: str, text: str, **inputs: str) -> str:
+        if task == "clean_query":
+            return self.clean_query(text)
+        if task == "classify_intent":
+            return classify_intent(text)
+        if task == "condense_query":
+            return condense_query(text, inputs.get("previous_question", ""))
+        if task == "summarize":
+            return summarize(inputs.get("summary", ""), text)
+        raise ValueError(f"The rule-based backend cannot run '{task}'")
+
+    @staticmethod
+    def _strip_closing_mark(query: str, text: str) -> str:
+        """
+        The last `?`/`!` when the question was opened with ¿¡, otherwise only marks right after a word, so
+        "operador ??" keeps its operator.
+        """
+        if "¿" in text or "¡" in text:
+            return _CLOSING_MARK.sub("", query)
+        return _ATTACHED_CLOSING_MARKS.sub("", query)
+
+    @classmethod
+    def clean_query(cls, text: str) -> str:
+        # A bot command would stop the greeting and lead-in rules, which only look at the start
+        text = strip_command(text)
+        query = " ".join(_OPENING_MARKS.sub(" ", text).split())
+        previous = None
+        while previous != query:
+            previous = query
+            query = _GREETING.sub("", query)
+            query = _LEAD_IN.sub("", query)
+            query = _POLITE.sub(" ", query).strip(" ,")
+        query = _ARTICLE.sub("", cls._strip_closing_mark(query, text))
+        return query or text.strip()
+
+
+class LLMRouter:
+    TASKS = ("clean_query", "classify_intent", "condense_query", "summarize", "answer", "feedback")
+
+    def __init__(self, routes: dict[str, TaskBackend]):
+        """
+        Binds every task to a backend, so cheap tasks do not pay for the remote LLM, and times each task.
+
+        Args:
+            routes (dict[str, TaskBackend]): Backend of each task of `TASKS`.
+        """
+        missing = set(self.TASKS) - set(routes)
+        if missing:
+            raise ValueError(f"No backend for the tasks {', '.join(sorted(missing))}")
+        self.routes = routes
+        self._latency = {task: LLM_TASK_LATENCY.labels(task, backend.name) for task, backend in routes.items()}
+
+    @classmethod
+    def for_llm(cls, llm) -> "LLMRouter":
+        """Every task on the same model, except the ones that never called it, which stay on the local rules."""
+        backend, rules = ChatModelBackend(llm), RuleBasedBackend()
+        return cls({task: backend for task in cls.TASKS} |
+                   {task: rules for task in ("classify_intent", "condense_query", "summarize")})
+
+    def backend(self, task: str) -> TaskBackend:
+        return self.routes[task]
+
+    def chat_model(self, task: str):
+        return self.routes[task].chat_model
+
+    @contextmanager
+    def measure(self, task: str) -> Iterator[None]:
+        """Span and latency metric of one run of a task, also for tasks run inside a chain."""
+        start = time.perf_counter()
+        try:
+            with get_tracer().start_span(f"rag.{task}", backend=self.routes[task].name):
+                yield
+        finally:
+            self._latency[task].observe(time.perf_counter() - start)
+
+    def run(self, task: str, text: str, **inputs: str) -> str:
+        with self.measure(task):
+            return self.routes[task].run(task, text, **inputs)
+
+    async def arun(self, task: str, text: str, **inputs: str) -> str:
+        with self.measure(task):
+            return await self.routes[task].arun(task, text, **inputs)
+
+
+def create_backend(spec: str) -> TaskBackend:
+    """
+    `rules` runs locally without a model, `gemini` is the bot's LLM and `gemini:<model>` another Gemini model,
+    `ollama:<model>` a model served by a local Ollama and `huggingface:<model>` a transformers model run on the CPU.
+    """
+    if spec == "rules":
+        return RuleBasedBackend()
+    if spec == "gemini":
+        from rag.utils import get_gemini_llm
+        return ChatModelBackend(get_gemini_llm())
+    if spec.startswith("gemini:"):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from rag.utils import tracing_callback
+        return ChatModelBackend(ChatGoogleGenerativeAI(model=spec.split(":", 1)[1], temperature=0,
+                                                       callbacks=[tracing_callback]))
+    if spec.startswith("ollama:"):
+        from langchain_community.chat_models import ChatOllama
+        return ChatModelBackend(ChatOllama(model=spec.split(":", 1)[1], temperature=0), name=spec)
+    if spec.startswith("huggingface:"):
+        from langchain_community.llms import HuggingFacePipeline
+        return ChatModelBackend(HuggingFacePipeline.from_model_id(
+            model_id=spec.split(":", 1)[1], task="text-generation", device=-1,
+            pipeline_kwargs={"max_new_tokens": 64, "return_full_text": False}), name=spec)
+    raise ValueError(f"Unknown backend '{spec}'")
+
+
+DEFAULT_ROUTES = {"clean_query": "rules", "classify_intent": "rules", "condense_query": "rules", "summarize": "rules",
+                  "answer": "gemini", "feedback": "gemini"}
+
+
+def create_router_from_env() -> LLMRouter:
+    """Router configured by LLM_ROUTES, e.g. `clean_query=ollama:qwen2.5:0.5b,answer=gemini`; unset tasks keep
+    DEFAULT_ROUTES. Tasks bound to the same spec share one backend."""
+    specs = dict(DEFAULT_ROUTES)
+    for route in filter(None, (route.strip() for route in os.getenv("LLM_ROUTES", "").split(","))):
+        task, _, spec = route.partition("=")
+        if task.strip() not in LLMRouter.TASKS:
+            raise ValueError(f"Unknown task '{task}' in LLM_ROUTES")
+        specs[task.strip()] = spec.strip()
+    backends = {spec: create_backend(spec) for spec in set(specs.values())}
+    return LLMRouter({task: backends[spec] for task, spec in specs.items()})
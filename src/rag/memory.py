@@ -0,0 +1,123 @@
+import os
+import re
+from dataclasses import dataclass, field
+
+from metrics import get_registry
+from rag.text import fold_text, strip_command
+from storage import KeyValueStore, SharedCache
+
+CONVERSATION_FOLLOW_UPS = get_registry().counter("conversation_follow_ups_total",
+                                                 "/ask questions condensed with the conversation history")
+
+# Follow-ups lean on the previous question: they start with a connector or point back at it
+_CONNECTOR = re.compile(r"^(y|e|o|pero|entonces|tambien|ademas|osea|o sea|y si|que pasa si|y que tal|y como|"
+                        r"y para|y con|y en|y por|y cuando|y donde)\b")
+_REFERENCE = re.compile(r"\b(eso|esto|ese|esa|esos|esas|aquello|lo mismo|lo anterior|otro ejemplo|un ejemplo|"
+                        r"mas ejemplos|ejemplo de eso|lo de antes|no entendi|explica mejor|mas simple|"
+                        r"mas detalle|por que)\b")
+MAX_FOLLOW_UP_WORDS = 8
+
+
+@dataclass
+class ConversationMemory:
+    # Older turns, rolled into a few lines
+    summary: str = ""
+    # Latest (standalone question, shortened answer) pairs, oldest first
+    turns: list[tuple[str, str]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.turns)
+
+    def render(self) -> str:
+        """History for the answer prompt."""
+        lines = [f"Summary of the earlier conversation: {self.summary}"] if self.summary else []
+        for question, answer in self.turns:
+            lines += [f"Student: {question}", f"Tutor: {answer}"]
+        return "\n".join(lines)
+
+
+def is_follow_up(question: str) -> bool:
+    """Whether the question leans on the previous one, e.g. "¿y con un for?" or "/ask ¿y con un for?"."""
+    text = fold_text(strip_command(question))
+    return bool(text) and (bool(_CONNECTOR.match(text)) or
+                           (len(text.split()) <= MAX_FOLLOW_UP_WORDS and bool(_REFERENCE.search(text))))
+
+
+def condense_query(question: str, previous_question: str, max_chars: int = 200) -> str:
+    """
+    Standalone version of a follow-up: the previous question with the follow-up appended, so
+    "¿y con un for?" after "¿cómo recorro una lista?" is searched as "cómo recorro una lista: y con un for".
+    Other questions are returned unchanged. A bot command in front of either is left out.
+    """
+    if not previous_question or not is_follow_up(question):
+        return question
+    question, previous = strip_command(question), strip_command(previous_question).strip(" ¿?")
+    # Chains of follow-ups keep the most recent context
+    previous = previous[-max_chars:].split(" ", 1)[-1] if len(previous) > max_chars else previous
+    return f"{previous}: {question.strip(' ¿?')}"
+
+
+def summarize(summary: str, question: str, max_chars: int = 300) -> str:
+    """
+    Add a turn falling out of the buffer to the summary: the topics asked about, the most recent kept.
+    Condensed follow-ups count as their original question.
+    """
+    topics = summary.removeprefix("Asked about: ").split("; ") if summary else []
+    topic = question.strip(" ¿?").split(": ", 1)[0]
+    if topic in topics:
+        return summary
+    topics.append(topic)
+    while len(topics) > 1 and len("Asked about: " + "; ".join(topics)) > max_chars:
+        topics.pop(0)
+    return ("Asked about: " + "; ".join(topics))[:max_chars]
+
+
+class ConversationStore:
+    def __init__(self, store: KeyValueStore, router, max_turns: int | None = None, ttl: float | None = None,
+                 answer_chars: int | None = None):
+        """
+        Per-student memory of /ask, shared by the bot workers: the last `max_turns` turns, older ones rolled into
+        a summary, so the prompt stays bounded. A student's memory expires `ttl` seconds after their last question.
+
+        Read-modify-write is safe because the updates of a student are processed one at a time.
+
+        Args:
+            store (KeyValueStore): Backing store.
+            router (LLMRouter): Runs the `condense_query` and `summarize` tasks.
+            max_turns (int): Turns kept verbatim (default CONVERSATION_MAX_TURNS or 3).
+            ttl (float): Seconds a memory lives without new questions (default CONVERSATION_TTL or 1800).
+            answer_chars (int): Characters of each answer kept (default CONVERSATION_ANSWER_CHARS or 400).
+        """
+        self.router = router
+        self.max_turns = max_turns or int(os.getenv("CONVERSATION_MAX_TURNS", "3"))
+        self.answer_chars = answer_chars or int(os.getenv("CONVERSATION_ANSWER_CHARS", "400"))
+        self.cache = SharedCache(store, "conversations",
+                                 default_ttl=ttl or float(os.getenv("CONVERSATION_TTL", "1800")))
+
+    async def get(self, user_id: int | str) -> ConversationMemory:
+        data = await self.cache.get(str(user_id))
+        if data is None:
+            return ConversationMemory()
+        summary, turns = data
+        return ConversationMemory(summary, [tuple(turn) for turn in turns])
+
+    async def condense(self, question: str, memory: ConversationMemory) -> str:
+        """Standalone question for retrieval and caching; unchanged unless it follows up on the conversation."""
+        if not memory:
+            return question
+        standalone = await self.router.arun("condense_query", question, history=memory.render(),
+                                            previous_question=memory.turns[-1][0] if memory.turns else "")
+        if standalone != question:
+            CONVERSATION_FOLLOW_UPS.inc()
+        return standalone
+
+    async def append(self, user_id: int | str, memory: ConversationMemory, question: str, answer: str):
+        """Store a turn, rolling the oldest ones into the summary once the buffer is full."""
+        answer = answer if len(answer) <= self.answer_chars else answer[:self.answer_chars].rsplit(" ", 1)[0] + "…"
+        turns = memory.turns + [(question, answer)]
+        summary = memory.summary
+        while len(turns) > self.max_turns:
+            (old_question, old_answer), turns = turns[0], turns[1:]
+            summary = await self.router.arun("summarize", old_question, summary=summary, answer=old_answer)
+        # Plain tuples keep the pickled entry small
+        await self.cache.set(str(user_id), (summary, tuple(turns)))
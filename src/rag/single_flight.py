@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from metrics import get_registry
+
+SINGLE_FLIGHT_CALLS = get_registry().counter(
+    "single_flight_calls_total", "Single-flight calls, by whether they started or joined a computation",
+    ("name", "result"))
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts the computation and every
+    caller arriving while it runs awaits the same result (or exception).
+
+    A caller being cancelled does not affect the others; the computation itself is only cancelled
+    when every caller waiting for it has gone away.
+    """
+
+    def __init__(self, name: str = "default"):
+        self._calls: dict[Hashable, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+        self._started_counter = SINGLE_FLIGHT_CALLS.labels(name, "started")
+        self._coalesced_counter = SINGLE_FLIGHT_CALLS.labels(name, "coalesced")
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def is_in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(function()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+            self._started_counter.inc()
+        else:
+            self.coalesced += 1
+            self._coalesced_counter.inc()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # Mark the exception as retrieved even if every waiter was cancelled
+            call.task.exception()
@@ -0,0 +1,376 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Callable, Iterable
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from rag.quantization import BinaryVectors, Int8Vectors, QuantizedVectors, quantize
+
+MAGIC = b"PTVSNAP\x00"
+FORMAT_VERSION = 1
+# Sections start at multiples of this, so the float32 matrix can be used in place from the memory map
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sII")  # magic, format version, manifest length
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _column_kind(values: list) -> str:
+    present = [value for value in values if value is not None]
+    if all(isinstance(value, bool) for value in present):
+        return "bool"
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return "int"
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return "float"
+    if all(isinstance(value, str) for value in present):
+        return "str"
+    return "json"
+
+
+def _encode_strings(values: Iterable[str]) -> tuple[np.ndarray, bytes]:
+    """Offsets (n + 1, uint64) into the concatenated UTF-8 bytes of the strings."""
+    blobs = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+    np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+    return offsets, b"".join(blobs)
+
+
+def write_snapshot(path: str, ids: list[str], vectors, texts: list[str], metadatas: list[dict | None],
+                   embedding_model: str, distance: str = "l2") -> dict:
+    """
+    Write a vector store snapshot: a single file with a manifest (format version, embedding model, distance and
+    the offset, shape and SHA-256 of every section) followed by the sections, each aligned for memory mapping:
+    the float32 vector matrix, the squared vector norms, its int8 and binary quantized copies (see
+    `rag.quantization`), and the ids, texts and metadata stored by column.
+
+    The file is written next to `path` and renamed over it, so readers never see a partial snapshot.
+
+    Returns:
+        dict: The manifest.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    if vectors.ndim != 2 or len(vectors) != len(ids) or len(texts) != len(ids) or len(metadatas) != len(ids):
+        raise SnapshotError("ids, vectors, texts and metadatas must have one entry per chunk")
+
+    sections: dict[str, np.ndarray | bytes] = {
+        "vectors": vectors,
+        "norms": np.einsum("ij,ij->i", vectors, vectors).astype("<f4"),
+    }
+    int8, binary = Int8Vectors.from_vectors(vectors), BinaryVectors.from_vectors(vectors)
+    sections["int8.codes"], sections["int8.scales"] = int8.codes, int8.scales.astype("<f4")
+    sections["binary.codes"], sections["binary.mean"] = binary.codes, binary.mean.astype("<f4")
+    sections["ids.offsets"], sections["ids.data"] = _encode_strings(ids)
+    sections["texts.offsets"], sections["texts.data"] = _encode_strings(texts)
+
+    metadatas = [metadata or {} for metadata in metadatas]
+    columns = {}
+    for key in sorted({key for metadata in metadatas for key in metadata}):
+        values = [metadata.get(key) for metadata in metadatas]
+        kind = _column_kind(values)
+        columns[key] = {"kind": kind}
+        prefix = f"metadata.{key}"
+        if any(value is None for value in values):
+            sections[f"{prefix}.present"] = np.array([value is not None for value in values], dtype="u1")
+        if kind == "bool":
+            sections[f"{prefix}.values"] = np.array([bool(value) for value in values], dtype="u1")
+        elif kind == "int":
+            sections[f"{prefix}.values"] = np.array([value or 0 for value in values], dtype="<i8")
+        elif kind == "float":
+            sections[f"{prefix}.values"] = np.array([value or 0.0 for value in values], dtype="<f8")
+        else:
+            encoded = [value if kind == "str" else json.dumps(value) for value in values]
+            sections[f"{prefix}.offsets"], sections[f"{prefix}.data"] = \
+                _encode_strings(value or "" for value in encoded)
+
+    # Offsets are relative to the end of the manifest, so they do not depend on its length
+    layout, position = {}, 0
+    for name, section in sections.items():
+        data = section if isinstance(section, bytes) else section.tobytes()
+        position = -(-position // ALIGNMENT) * ALIGNMENT
+        layout[name] = {
+            "offset": position,
+            "length": len(data),
+            "dtype": "|u1" if isinstance(section, bytes) else section.dtype.str,
+            "shape": [len(data)] if isinstance(section, bytes) else list(section.shape),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+        position += len(data)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": time.time(),
+        "embedding_model": embedding_model,
+        "distance": distance,
+        "count": len(ids),
+        "dimensions": int(vectors.shape[1]),
+        "metadata_columns": columns,
+        "sections": layout,
+    }
+    manifest_bytes = json.dumps(manifest).encode("utf-8")
+    header_length = -(-(_PREAMBLE.size + len(manifest_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(manifest_bytes)))
+            file.write(manifest_bytes)
+            for name, section in sections.items():
+                file.write(b"\0" * (header_length + layout[name]["offset"] - file.tell()))
+                file.write(section if isinstance(section, bytes) else section.tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return manifest
+
+
+class VectorSnapshot:
+    def __init__(self, path: str, verify: bool = True):
+        """
+        A snapshot mapped into memory: the arrays are views of the file, read lazily by the OS and shared by every
+        process mapping it, so opening it costs neither parsing nor copying.
+
+        Args:
+            path (str): Snapshot written by `write_snapshot`.
+            verify (bool): Check the SHA-256 of every section, which reads the whole file once.
+        """
+        self.path = path
+        self._raw = np.memmap(path, dtype="u1", mode="r")
+        if len(self._raw) < _PREAMBLE.size:
+            raise SnapshotError(f"{path} is not a vector store snapshot")
+        magic, version, manifest_length = _PREAMBLE.unpack(self._raw[:_PREAMBLE.size].tobytes())
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a vector store snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"Snapshot format {version} is not supported (expected {FORMAT_VERSION})")
+        self.manifest = json.loads(self._raw[_PREAMBLE.size:_PREAMBLE.size + manifest_length].tobytes())
+        self._base = -(-(_PREAMBLE.size + manifest_length) // ALIGNMENT) * ALIGNMENT
+        if verify:
+            self.verify()
+
+        self.vectors = self._section("vectors")
+        self.norms = self._section("norms")
+        self._ids = (self._section("ids.offsets"), self._section("ids.data"))
+        self._texts = (self._section("texts.offsets"), self._section("texts.data"))
+        self._quantized: dict[str, QuantizedVectors | None] = {}
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    @property
+    def embedding_model(self) -> str:
+        return self.manifest["embedding_model"]
+
+    @property
+    def distance(self) -> str:
+        return self.manifest["distance"]
+
+    def _bytes(self, name: str) -> np.ndarray:
+        section = self.manifest["sections"][name]
+        start = self._base + section["offset"]
+        if start + section["length"] > len(self._raw):
+            raise SnapshotError(f"Snapshot {self.path} is truncated")
+        return self._raw[start:start + section["length"]]
+
+    def _section(self, name: str) -> np.ndarray:
+        section = self.manifest["sections"][name]
+        return self._bytes(name).view(np.dtype(section["dtype"])).reshape(section["shape"])
+
+    def verify(self):
+        for name, section in self.manifest["sections"].items():
+            if hashlib.sha256(self._bytes(name)).hexdigest() != section["sha256"]:
+                raise SnapshotError(f"Snapshot {self.path} is corrupt: checksum mismatch in '{name}'")
+
+    @staticmethod
+    def _string(column: tuple[np.ndarray, np.ndarray], position: int) -> str:
+        offsets, data = column
+        return data[int(offsets[position]):int(offsets[position + 1])].tobytes().decode("utf-8")
+
+    def id(self, position: int) -> str:
+        return self._string(self._ids, position)
+
+    def text(self, position: int) -> str:
+        return self._string(self._texts, position)
+
+    def metadata(self, position: int) -> dict:
+        metadata = {}
+        for key, column in self.manifest["metadata_columns"].items():
+            prefix = f"metadata.{key}"
+            if f"{prefix}.present" in self.manifest["sections"] and not self._section(f"{prefix}.present")[position]:
+                continue
+            kind = column["kind"]
+            if kind in ("str", "json"):
+                value = self._string((self._section(f"{prefix}.offsets"), self._section(f"{prefix}.data")), position)
+                metadata[key] = value if kind == "str" else json.loads(value)
+            else:
+                value = self._section(f"{prefix}.values")[position]
+                metadata[key] = bool(value) if kind == "bool" else int(value) if kind == "int" else float(value)
+        return metadata
+
+    def document(self, position: int) -> Document:
+        return Document(page_content=self.text(position), metadata=self.metadata(position), id=self.id(position))
+
+    def mask(self, filter: dict[str, Any]) -> np.ndarray:
+        """Rows whose metadata equals every value of `filter` (the subset of Chroma's filters the bot uses)."""
+        mask = np.ones(len(self), dtype=bool)
+        for key, expected in filter.items():
+            column = self.manifest["metadata_columns"].get(key)
+            if column is None:
+                return np.zeros(len(self), dtype=bool)
+            prefix = f"metadata.{key}"
+            if column["kind"] in ("int", "float", "bool"):
+                mask &= self._section(f"{prefix}.values") == expected
+            else:
+                mask &= np.array([self.metadata(position).get(key) == expected for position in range(len(self))])
+            if f"{prefix}.present" in self.manifest["sections"]:
+                mask &= self._section(f"{prefix}.present").astype(bool)
+        return mask
+
+    def quantized(self, mode: str) -> QuantizedVectors | None:
+        """
+        The `int8` or `binary` copy of the vectors (None for `none`), mapped from the snapshot, or computed once
+        for snapshots written without it.
+        """
+        if mode not in self._quantized:
+            sections = self.manifest["sections"]
+            if mode == "int8" and "int8.codes" in sections:
+                self._quantized[mode] = Int8Vectors(self._section("int8.codes"), self._section("int8.scales"))
+            elif mode == "binary" and "binary.codes" in sections:
+                self._quantized[mode] = BinaryVectors(self._section("binary.codes"), self._section("binary.mean"))
+            else:
+                self._quantized[mode] = quantize(self.vectors, mode)
+        return self._quantized[mode]
+
+    def _distances(self, query: np.ndarray, positions: np.ndarray | None = None) -> np.ndarray:
+        vectors, norms = (self.vectors, self.norms) if positions is None else \
+            (self.vectors[positions], self.norms[positions])
+        products = vectors @ query
+        if self.distance == "cosine":
+            return 1 - products / (np.sqrt(norms) * (np.linalg.norm(query) or 1.0) + 1e-12)
+        if self.distance == "ip":
+            return 1 - products
+        return norms + float(query @ query) - 2 * products
+
+    @staticmethod
+    def _top(distances: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the `k` lowest finite distances, closest first."""
+        k = min(k, int(np.isfinite(distances).sum()))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(distances, k - 1)[:k]
+        return top[np.argsort(distances[top])]
+
+    def search(self, query_vector, k: int, filter: dict[str, Any] | None = None, quantization: str = "none",
+               rescore_factor: int | None = None) -> list[tuple[int, float]]:
+        """
+        Nearest chunks. Distances are the ones Chroma reports for the snapshot's distance (squared L2, or one minus
+        the cosine similarity or inner product), so relevance scores and thresholds carry over.
+
+        Args:
+            query_vector: Embedded query.
+            k (int): Results.
+            filter (dict): Metadata values the results must have.
+            quantization (str): `none` scans the float32 vectors. `int8` or `binary` scans the quantized copy
+                instead and rescores the best `k * rescore_factor` candidates with their float32 vectors, so only
+                those rows of the matrix are read; the distances returned are exact.
+            rescore_factor (int): Candidates rescored per result (default the quantization's).
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        quantized = self.quantized(quantization)
+        mask = self.mask(filter) if filter else None
+        if quantized is None:
+            distances = self._distances(query)
+            if mask is not None:
+                distances = np.where(mask, distances, np.inf)
+            return [(int(position), float(distances[position])) for position in self._top(distances, k)]
+
+        approximate = quantized.approximate_distances(query, self.norms, self.distance)
+        if mask is not None:
+            approximate = np.where(mask, approximate, np.inf)
+        candidates = np.sort(self._top(approximate, k * (rescore_factor or quantized.default_rescore_factor)))
+        distances = self._distances(query, candidates)
+        return [(int(candidates[position]), float(distances[position])) for position in self._top(distances, k)]
+
+
+class SnapshotVectorStore(VectorStore):
+    def __init__(self, snapshot: VectorSnapshot, embedding: Embeddings, quantization: str = "none",
+                 rescore_factor: int | None = None):
+        """
+        Read-only vector store over a memory-mapped snapshot, a drop-in for the Chroma store in the retrievers.
+        Only queries are embedded.
+
+        Args:
+            snapshot (VectorSnapshot): The snapshot.
+            embedding (Embeddings): The model the snapshot was built with, to embed queries.
+            quantization (str): Search mode, `none`, `int8` or `binary` (see `VectorSnapshot.search`).
+            rescore_factor (int): Candidates rescored per result in the quantized modes.
+        """
+        self.snapshot = snapshot
+        self.embedding = embedding
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        # Fails on an unknown mode at startup rather than on the first question
+        snapshot.quantized(quantization)
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings, embedding_model: str | None = None, verify: bool = True,
+             quantization: str = "none", rescore_factor: int | None = None) -> "SnapshotVectorStore":
+        snapshot = VectorSnapshot(path, verify=verify)
+        if embedding_model and snapshot.embedding_model != embedding_model:
+            raise SnapshotError(f"Snapshot {path} was built with {snapshot.embedding_model}, not {embedding_model}")
+        return cls(snapshot, embedding, quantization, rescore_factor)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        if self.snapshot.distance == "cosine":
+            return self._cosine_relevance_score_fn
+        if self.snapshot.distance == "ip":
+            return self._max_inner_product_relevance_score_fn
+        return self._euclidean_relevance_score_fn
+
+    def similarity_search_by_vector_with_score(self, embedding: list[float], k: int = 4,
+                                               filter: dict | None = None) -> list[tuple[Document, float]]:
+        return [(self.snapshot.document(position), distance)
+                for position, distance in self.snapshot.search(embedding, k, filter, self.quantization,
+                                                               self.rescore_factor)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict | None = None,
+                                     **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k, filter)
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4, filter: dict | None = None,
+                                            **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(await self.embedding.aembed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict | None = None,
+                          **kwargs: Any) -> list[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def similarity_search_by_vector(self, embedding: list[float], k: int = 4, filter: dict | None = None,
+                                    **kwargs: Any) -> list[Document]:
+        return [document for document, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def add_texts(self, texts: Iterable[str], metadatas: list[dict] | None = None, **kwargs: Any) -> list[str]:
+        raise NotImplementedError("Snapshots are read-only: add the documents to Chroma and export it again")
+
+    @classmethod
+    def from_texts(cls, texts: list[str], embedding: Embeddings, metadatas: list[dict] | None = None,
+                   **kwargs: Any) -> "SnapshotVectorStore":
+        raise NotImplementedError("Snapshots are written with write_snapshot or ChromaVectorDatabase.export_snapshot")
@@ -0,0 +1,41 @@
+import re
+import unicodedata
+
+
+def _fold(text: str) -> str:
+    """Lowercase and without accents."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def strip_command(message: str) -> str:
+    """
+    Text of a message after its bot command ("/ask" or "/ask@tutor_bot"), keeping the line breaks. Messages that
+    do not start with a command are only stripped.
+    """
+    return re.sub(r"^/\w+(@\w+)?(?=\s|$)", "", message.strip()).strip()
+
+
+def normalize_question(question: str) -> str:
+    """
+    Words of a question for term matching: lowercase, without accents, punctuation or extra spaces.
+    Not for keys: "¿qué hace i++?" and "¿qué hace i--?" both become "que hace i" (see `canonical_question`).
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", _fold(question)).split())
+
+
+def canonical_question(question: str) -> str:
+    """
+    Canonical form of a question for cache, coalescing and FAQ keys. Only the prose around the question is
+    dropped (a bot command, case, accents, the opening ¿¡, one closing ?!., commas, quotes and backticks), so
+    operators and language names keep questions apart: "/ask ¿Qué es un delegado?" and "que es un delegado"
+    share a key, while "¿qué hace i++?" and "¿qué hace i--?", or "¿qué es C#?" and "que es C++", do not.
+    """
+    text = re.sub(r"[¿¡\"“”«»`]", " ", _fold(strip_command(question)))
+    text = re.sub(r"[,;](?=\s|$)", " ", text)
+    return re.sub(r"\s*[?!.]$", "", " ".join(text.split()))
+
+
+def fold_text(text: str) -> str:
+    """Lowercase and without accents, keeping the symbols of C# names such as `c#`, `.net` or `List<int>`."""
+    return " ".join(re.sub(r"[^\w\s#.<>+]", " ", _fold(text)).split())
@@ -0,0 +1,116 @@
+import os
+import time
+
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
+from langchain_core.vectorstores import VectorStore
+
+from rag.text import normalize_question
+from tracing import get_tracer
+from tracing.llm import RETRIEVAL_LATENCY, RETRIEVAL_DOCUMENTS
+
+# Chroma metadata cannot be None: chunks that match no topic get this id
+NO_TOPIC = 0
+
+
+class TopicTagger:
+    def __init__(self, topics: list[tuple[int, str]], min_score: int = 2):
+        """
+        Assigns chunks to the topics of the `topics` table by looking for the topic name in the chunk's
+        section title (worth 3) and text (worth 1 per occurrence, up to 3).
+
+        Args:
+            topics (list[tuple[int, str]]): (id, name) of every topic.
+            min_score (int): Lowest score for a chunk to be tagged; weaker matches stay untagged.
+        """
+        self.topics = [(topic_id, f" {normalize_question(name)} ") for topic_id, name in topics]
+        self.min_score = min_score
+
+    def topic_for(self, text: str, section: str = "") -> int:
+        text = f" {normalize_question(text)} "
+        section = f" {normalize_question(section)} "
+        best_topic, best_score = NO_TOPIC, 0
+        for topic_id, name in self.topics:
+            score = (3 if name in section else 0) + min(3, text.count(name))
+            if score > best_score:
+                best_topic, best_score = topic_id, score
+        return best_topic if best_score >= self.min_score else NO_TOPIC
+
+    def tag(self, documents: list[Document]) -> list[Document]:
+        """Store the topic id of every chunk in its `topic_id` metadata."""
+        for document in documents:
+            document.metadata["topic_id"] = self.topic_for(document.page_content, document.metadata.get("section", ""))
+        return documents
+
+
+class TopicScopedRetriever:
+    def __init__(self, vector_store: VectorStore, k: int = 5, min_relevance: float | None = None,
+                 min_results: int | None = None):
+        """
+        Retriever that searches only the chunks of the student's current topic, falling back to the whole corpus
+        when the topic gives too few relevant chunks. Used through `as_runnable()`, which receives the whole
+        chain input ({"input": ..., "topic_id": ...}) instead of just the query.
+
+        Args:
+            vector_store (VectorStore): Store whose chunks have `topic_id` metadata.
+            k (int): Chunks returned.
+            min_relevance (float): Relevance score (0-1) a topic chunk needs to count (default TOPIC_MIN_RELEVANCE or 0.3).
+            min_results (int): Relevant topic chunks needed to skip the fallback (default TOPIC_MIN_RESULTS or 2).
+        """
+        self.vector_store = vector_store
+        self.k = k
+        self.min_relevance = min_relevance or float(os.getenv("TOPIC_MIN_RELEVANCE", "0.3"))
+        self.min_results = min_results or int(os.getenv("TOPIC_MIN_RESULTS", "2"))
+
+    def as_runnable(self) -> RunnableLambda:
+        return RunnableLambda(self.retrieve, afunc=self.aretrieve, name="TopicScopedRetriever")
+
+    def retrieve(self, inputs: dict) -> list[Document]:
+        query, topic_id = inputs["input"], inputs.get("topic_id")
+        with get_tracer().start_span("vector_search", topic_id=topic_id) as span:
+            start = time.perf_counter()
+            scoped = []
+            if topic_id:
+                scoped = self.vector_store.similarity_search_with_relevance_scores(
+                    query, k=self.k, filter={"topic_id": topic_id})
+            unscoped = [] if self._is_enough(scoped) else \
+                self.vector_store.similarity_search_with_relevance_scores(query, k=self.k)
+            documents = self._merge(scoped, unscoped)
+            self._record(span, documents, bool(unscoped), start)
+        return documents
+
+    async def aretrieve(self, inputs: dict) -> list[Document]:
+        query, topic_id = inputs["input"], inputs.get("topic_id")
+        with get_tracer().start_span("vector_search", topic_id=topic_id) as span:
+            start = time.perf_counter()
+            scoped = []
+            if topic_id:
+                scoped = await self.vector_store.asimilarity_search_with_relevance_scores(
+                    query, k=self.k, filter={"topic_id": topic_id})
+            unscoped = [] if self._is_enough(scoped) else \
+                await self.vector_store.asimilarity_search_with_relevance_scores(query, k=self.k)
+            documents = self._merge(scoped, unscoped)
+            self._record(span, documents, bool(unscoped), start)
+        return documents
+
+    def _is_enough(self, scored: list[tuple[Document, float]]) -> bool:
+        return sum(score >= self.min_relevance for _, score in scored) >= self.min_results
+
+    def _merge(self, scoped: list[tuple[Document, float]], unscoped: list[tuple[Document, float]]) -> list[Document]:
+        """Relevant topic chunks first, then the best chunks of the whole corpus, without duplicates."""
+        documents = [document for document, score in scoped if score >= self.min_relevance or not unscoped]
+        seen = {document.page_content for document in documents}
+        for document, _ in unscoped:
+            if len(documents) >= self.k:
+                break
+            if document.page_content not in seen:
+                documents.append(document)
+                seen.add(document.page_content)
+        return documents[:self.k]
+
+    @staticmethod
+    def _record(span, documents: list[Document], fallback: bool, start: float):
+        span.set_attribute("documents", len(documents))
+        span.set_attribute("fallback", fallback)
+        RETRIEVAL_LATENCY.observe(time.perf_counter() - start)
+        RETRIEVAL_DOCUMENTS.observe(len(documents))
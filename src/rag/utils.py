@@ -1,10 +1,15 @@
 import os
 
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 
+from rag.chunkers import StructureAwareChunker
 from rag.corpus_loader import PDFCorpusLoader
+from rag.rerank import RerankingRetriever, create_reranker
+from rag.snapshot import SnapshotVectorStore
+from rag.topic_retrieval import TopicScopedRetriever, TopicTagger
 from rag.document_vector_store import ChromaVectorDatabase
+from tracing.llm import TracedEmbeddings, TracingCallbackHandler
 
 # Load environment variables
 load_dotenv()
@@ -12,29 +17,79 @@ load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
 persist_dir = '../data/chroma_db'
 corpus_dir = "../data/corpus"
+embedding_model = "models/text-embedding-004"
+snapshot_path = os.getenv("VECTOR_SNAPSHOT_PATH", "../data/vector_store.snap")
+
+# Records llm and vector_search spans for every chain using these components
+tracing_callback = TracingCallbackHandler()
 
 
 def get_gemini_llm():
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
+    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3, callbacks=[tracing_callback])
     return llm
 
 
-def get_retriever():
+def get_embeddings():
+    """The embedding model of the vector store, for anything compared with its queries (e.g. the FAQ)."""
+    return TracedEmbeddings(GoogleGenerativeAIEmbeddings(model=embedding_model, google_api_key=api_key))
+
+
+def get_vector_database(topics: list[tuple[int, str]] | None = None) -> ChromaVectorDatabase:
+    """
+    The Chroma store of the course PDFs, indexed on first use.
+
+    Args:
+        topics (list[tuple[int, str]]): (id, name) of the catalog topics, used to tag the chunks when indexing
+            so that questions can be scoped to the student's current topic.
+    """
     # Initialize the vector database
     add_docs = not os.path.exists(persist_dir)
 
-    vector_db = ChromaVectorDatabase(persist_directory=persist_dir, google_api_key=api_key)
+    vector_db = ChromaVectorDatabase(persist_directory=persist_dir, google_api_key=api_key,
+                                     embedding_model=embedding_model)
 
     if add_docs:
         folder_path = os.path.abspath(corpus_dir)
-        pdf_loader = PDFCorpusLoader(folder_path, chunk_size=5000)
+        # Chunks follow the headings and keep code samples whole, within a token budget
+        pdf_loader = PDFCorpusLoader(folder_path, chunker=StructureAwareChunker(
+            target_tokens=int(os.getenv("CHUNK_TARGET_TOKENS", "400"))))
 
         pdf_corpus = pdf_loader.load_corpus()
         print(f"Loaded {len(pdf_corpus)} documents.")
+        if topics:
+            TopicTagger(topics).tag(pdf_corpus)
 
         # Load the PDFs and add them to the vector store
         vector_db.add_documents(pdf_corpus)
+    return vector_db
+
+
+def get_retriever(topics: list[tuple[int, str]] | None = None):
+    """
+    Retriever over the course PDFs: the snapshot at VECTOR_SNAPSHOT_PATH if there is one, otherwise the Chroma
+    store, indexed on first use. With VECTOR_QUANTIZATION (int8 or binary) the search runs in process over the
+    quantized snapshot, exported from Chroma if missing.
+
+    Args:
+        topics (list[tuple[int, str]]): (id, name) of the catalog topics, used to tag the chunks when indexing
+            so that questions can be scoped to the student's current topic.
+    """
+    quantization = os.getenv("VECTOR_QUANTIZATION", "none")
+    rescore_factor = int(os.getenv("VECTOR_RESCORE_FACTOR", "0")) or None
+    # A snapshot (vector_snapshot.py export) is memory-mapped instead: no Chroma directory and no re-embedding
+    if snapshot_path and os.path.exists(snapshot_path):
+        vector_store = SnapshotVectorStore.load(snapshot_path, get_embeddings(), embedding_model,
+                                                quantization=quantization, rescore_factor=rescore_factor)
+    elif quantization != "none":
+        vector_store = get_vector_database(topics).in_process_store(snapshot_path, quantization, rescore_factor)
+    else:
+        vector_store = get_vector_database(topics).vector_db
 
-    retriever = vector_db.vector_db.as_retriever(search_type="similarity", search_kwargs={"k": 5})
+    # Receives the whole chain input, so it can filter by the "topic_id" next to the question
+    reranker = create_reranker(os.getenv("RETRIEVAL_RERANKER", "none"))
+    if reranker is None:
+        return TopicScopedRetriever(vector_store, k=5).as_runnable()
 
-    return retriever
+    # Two stages: many candidates from the vector store, the few best after reranking
+    candidates = TopicScopedRetriever(vector_store, k=int(os.getenv("RERANK_CANDIDATES", "30")))
+    return RerankingRetriever(candidates, reranker).as_runnable()
@@ -0,0 +1,140 @@
+"""
+Offline benchmark of the bot handlers: simulated students talk to a TelegramBot whose Telegram API, LLM and
+embeddings are replaced by deterministic fakes, against a SQLite or local Postgres database.
+
+    python run_benchmark.py --students 50 --requests 20
+    python run_benchmark.py --save-baseline ../data/benchmarks/baseline.json
+    python run_benchmark.py --compare-baseline ../data/benchmarks/baseline.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20, help="simulated students talking at the same time")
+    parser.add_argument("--requests", type=int, default=20, help="commands each student sends after /start")
+    parser.add_argument("--mix", default=None, help="relative command weights, e.g. ask=3,exercise=2,hint=2")
+    parser.add_argument("--database-url", default=None,
+                        help="database to run against; a throwaway SQLite file by default")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="seconds per fake embedding call")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="seconds per fake Bot API call")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds between a student's messages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the report as a JSON baseline")
+    parser.add_argument("--compare-baseline", metavar="PATH", help="fail if the run regressed against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression (default 0.25)")
+    return parser.parse_args()
+
+
+async def run(args) -> dict:
+    # Imported here: the database engine is created on import from DB_URI
+    from langchain_chroma import Chroma
+
+    from benchmarks.fakes import FakeChatModel, FakeEmbeddings, synthetic_corpus
+    from benchmarks.report import event_loop_summary, summarize
+    from benchmarks.workload import (DEFAULT_MIX, SimulatedStudent, WorkloadResult, enable_sqlite_student_exercise_ids,
+                                     parse_mix, seed_catalog)
+    from database.database import engine, SessionLocal
+    from database.models import Base
+    from rag.ai_tutor import AITutor
+    from rag.utils import tracing_callback
+    from storage import InMemoryStore
+    from telegram_bot.bot import TelegramBot
+    from telegram_bot.fake_telegram import FakeBotApiRequest
+    from telegram_bot.webhook import start_application, stop_application
+    from tracing.llm import TracedEmbeddings
+    from tracing.watchdog import LoopWatchdog
+
+    # Statement logging would dominate the measurements
+    engine.echo = False
+    if engine.dialect.name == "sqlite":
+        enable_sqlite_student_exercise_ids()
+    Base.metadata.create_all(engine)
+    with SessionLocal() as session:
+        topics = seed_catalog(session)
+
+    llm = FakeChatModel(latency=args.llm_latency, callbacks=[tracing_callback])
+    vector_store = Chroma(collection_name=f"benchmark-{os.getpid()}",
+                          embedding_function=TracedEmbeddings(FakeEmbeddings(latency=args.embedding_latency)))
+    vector_store.add_texts(synthetic_corpus())
+    retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 5})
+
+    request = FakeBotApiRequest(latency=args.telegram_latency)
+    telegram_bot = TelegramBot(ai_tutor=AITutor(llm, retriever), llm=llm, request=request, background_tasks=False,
+                               store=InMemoryStore())
+    await start_application(telegram_bot.app)
+
+    mix = args.mix or DEFAULT_MIX
+    weights = parse_mix(mix)
+    rng = random.Random(args.seed)
+    result = WorkloadResult()
+    telegram_bot.app.add_error_handler(result.record_error)
+    # Offset the ids so students from earlier runs against the same database are not reused
+    first_user_id = 10_000_000 + int(time.time()) % 1_000_000 * 100
+    students = [SimulatedStudent(telegram_bot.app, request, first_user_id + index, topics, weights,
+                                 random.Random(rng.random()), result, args.think_time, telegram_bot.outbound)
+                for index in range(args.students)]
+
+    # Probes every 10 ms for the blocked time; blocks over a second also log what held the loop
+    watchdog = LoopWatchdog(threshold=1.0, interval=0.01)
+    watchdog.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(student.run(args.requests) for student in students))
+    duration = time.perf_counter() - start
+    await watchdog.stop()
+    await stop_application(telegram_bot.app)
+
+    config = {
+        "students": args.students,
+        "requests": args.requests,
+        "mix": mix,
+        "database": engine.dialect.name,
+        "llm_latency": args.llm_latency,
+        "embedding_latency": args.embedding_latency,
+        "telegram_latency": args.telegram_latency,
+        "think_time": args.think_time,
+        "seed": args.seed,
+    }
+    return summarize(config, result, duration, event_loop_summary(watchdog, duration))
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    # Never reaches Telegram: every Bot API call goes to FakeBotApiRequest
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:benchmark")
+    # The fake Bot API has no flood limits: by default do not throttle the replies either
+    os.environ.setdefault("OUTBOUND_CHAT_RATE", "1000")
+    os.environ.setdefault("OUTBOUND_CHAT_BURST", "1000")
+    os.environ.setdefault("OUTBOUND_GLOBAL_RATE", "100000")
+    if args.database_url:
+        os.environ["DB_URI"] = args.database_url
+    else:
+        os.environ["DB_URI"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')}"
+
+    from benchmarks.report import compare_with_baseline, format_report, save_report
+
+    report = asyncio.run(run(args))
+    print(format_report(report))
+
+    if args.save_baseline:
+        save_report(report, args.save_baseline)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.compare_baseline:
+        regressions = compare_with_baseline(report, args.compare_baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:\n" + "\n".join(f"- {line}" for line in regressions))
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import os
+
+from dotenv import load_dotenv
+
+from evaluation.worker import run_worker_pool
+
+load_dotenv()
+
+
+if __name__ == "__main__":
+    run_worker_pool(int(os.getenv("EVALUATION_WORKERS", "2")))
@@ -0,0 +1,49 @@
+"""
+Accuracy, false rejection rate and latency of the /ask intent classifier on a labeled set of messages.
+
+    python run_intent_eval.py
+    python run_intent_eval.py --backend ollama:qwen2.5:0.5b --output ../data/intent_eval_results.json
+"""
+import argparse
+import json
+import logging
+
+from benchmarks.intents import evaluate_classifier, load_labeled_messages
+from rag.intents import parse_intent
+from rag.llm_router import create_backend
+from rag.text import strip_command
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", default="benchmarks/intent_eval.json", help="labeled messages")
+    parser.add_argument("--backend", default="rules", help="backend of the classify_intent task, as in LLM_ROUTES")
+    parser.add_argument("--output", help="also write the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    messages = load_labeled_messages(args.messages)
+    backend = create_backend(args.backend)
+    # Classified as the /ask handler does, without the command
+    results = evaluate_classifier(
+        lambda message: parse_intent(backend.run("classify_intent", strip_command(message))), messages)
+
+    print(f"{results['messages']} messages, backend {args.backend}")
+    print(f"accuracy {results['accuracy']:.2%}, false rejections {results['false_rejection_rate']:.2%}, "
+          f"false acceptances {results['false_acceptance_rate']:.2%}")
+    print("recall " + ", ".join(f"{intent} {recall:.2%}" for intent, recall in results["recall"].items()))
+    print("latency (us) " + ", ".join(f"{name} {value}" for name, value in results["latency_us"].items()))
+    for error in results["errors"]:
+        print(f"  {error['expected']:>9} -> {error['predicted']:<9} {error['message']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"backend": args.backend, "results": results}, file, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
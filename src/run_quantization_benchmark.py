@@ -0,0 +1,56 @@
+"""
+Recall loss of the quantized in-process search (int8, binary) against exact float32 search, with the memory
+scanned and the latency of each mode, on the bot's snapshot or on synthetic vectors of the same shape.
+
+    python run_quantization_benchmark.py --snapshot ../data/vector_store.snap
+    python run_quantization_benchmark.py --count 50000 --dimensions 768 --rescore 2,4,8,16,32
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.quantization import evaluate_quantization, sample_queries, synthetic_vectors
+from benchmarks.retrieval import format_rows
+from rag.snapshot import VectorSnapshot, write_snapshot
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot", help="snapshot to search (default synthetic vectors)")
+    parser.add_argument("--count", type=int, default=20000, help="synthetic vectors")
+    parser.add_argument("--dimensions", type=int, default=768, help="synthetic vector dimensions")
+    parser.add_argument("--latent-dimensions", type=int, default=64,
+                        help="intrinsic dimension of the synthetic vectors, higher is harder for binary codes")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--modes", default="none,int8,binary", help="the first one is the speedup baseline")
+    parser.add_argument("--rescore", default="2,4,8,16", help="candidates rescored per result")
+    parser.add_argument("--output", help="also write the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.snapshot
+        if path is None:
+            path = os.path.join(directory, "synthetic.snap")
+            vectors = synthetic_vectors(args.count, args.dimensions, args.latent_dimensions)
+            write_snapshot(path, [str(i) for i in range(len(vectors))], vectors, [""] * len(vectors),
+                           [None] * len(vectors), "synthetic", "l2")
+        snapshot = VectorSnapshot(path, verify=False)
+        print(f"{len(snapshot)} vectors, {snapshot.vectors.shape[1]} dimensions, {snapshot.distance} distance")
+
+        queries = sample_queries(snapshot.vectors, args.queries)
+        rows = evaluate_quantization(snapshot, queries, args.k, args.modes.split(","),
+                                     [int(factor) for factor in args.rescore.split(",")])
+        print(format_rows(rows))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"snapshot": args.snapshot, "results": rows}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Retrieval quality and latency for every chunker × index configuration, measured on a labeled set of questions
+over the course PDFs.
+
+    python run_retrieval_eval.py --questions ../data/retrieval_eval.json
+    python run_retrieval_eval.py --chunkers recursive-5000,recursive-1000 --indexes numpy,hybrid --k 1,3,5
+"""
+import argparse
+import json
+import logging
+
+from benchmarks.retrieval import CHUNKERS, INDEXES, evaluate, format_rows, load_labeled_questions
+from rag.corpus_loader import PDFCorpusLoader
+from rag.utils import corpus_dir
+
+DEFAULT_EMBEDDINGS = "huggingface:sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def create_embeddings(name: str):
+    """
+    `huggingface:<model>` runs a sentence-transformers model locally, `gemini` uses the bot's embedding model
+    and `fake` uses the deterministic benchmark embeddings, to check the harness itself.
+    """
+    if name.startswith("huggingface:"):
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=name.split(":", 1)[1])
+    if name == "gemini":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        from rag.utils import api_key
+        return GoogleGenerativeAIEmbeddings(model="models/text-embedding-004", google_api_key=api_key)
+    if name == "fake":
+        from benchmarks.fakes import FakeEmbeddings
+        return FakeEmbeddings(latency=0.0)
+    raise ValueError(f"Unknown embeddings '{name}'")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=corpus_dir, help="folder with the PDFs")
+    parser.add_argument("--questions", default="../data/retrieval_eval.json", help="labeled questions")
+    parser.add_argument("--embeddings", default=DEFAULT_EMBEDDINGS)
+    parser.add_argument("--chunkers", default=",".join(CHUNKERS), help=f"any of {', '.join(CHUNKERS)}")
+    parser.add_argument("--indexes", default=",".join(INDEXES), help=f"any of {', '.join(INDEXES)}")
+    parser.add_argument("--k", default="1,3,5,10", help="cutoffs for recall@k")
+    parser.add_argument("--output", help="also write the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    questions = load_labeled_questions(args.questions)
+    pages = PDFCorpusLoader(args.corpus).load_pages()
+    print(f"{len(questions)} questions, {len(pages)} pages")
+
+    rows = evaluate(pages, questions, create_embeddings(args.embeddings), args.chunkers.split(","),
+                    args.indexes.split(","), [int(k) for k in args.k.split(",")])
+    print(format_rows(rows))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"embeddings": args.embeddings, "results": rows}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
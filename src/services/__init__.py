@@ -4,3 +4,10 @@ from services.topic_service import TopicService
 from services.hints_service import HintService
 from services.service_result import ServiceResult
 from services.submission_service import SubmissionService
+from services.evaluation_service import EvaluationService
+from services.feedback_service import FeedbackService
+from services.code_blob_service import CodeBlobService
+from services.faq_service import FaqService
+from services.attempt_archive_service import AttemptArchiveService
+from services.broadcast_service import BroadcastService
+from services.question_service import QuestionService
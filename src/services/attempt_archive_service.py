@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import exists, insert, literal, select
+from sqlalchemy.orm import Session
+
+from database.models import Attempt, AttemptArchive, EvaluationJob
+from tracing import trace_methods
+
+
+@trace_methods("service")
+class AttemptArchiveService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def archive_batch(self, submitted_before: datetime, batch_size: int = 1000) -> int:
+        """
+        Move up to `batch_size` finished attempts submitted before `submitted_before` to attempts_archive, in one
+        transaction. An attempt is finished once it is evaluated, its result was sent and its feedback, if any,
+        was sent too or given up on. Their code stays in code_blobs.
+
+        Returns:
+            int: Attempts moved; 0 when there is nothing left to archive.
+        """
+        unnotified_job = exists().where(EvaluationJob.attempt_id == Attempt.id, EvaluationJob.notified.is_(False))
+        attempt_ids = [
+            attempt_id for attempt_id, in
+            self.db.query(Attempt.id)
+            .filter(
+                Attempt.created_at < submitted_before,
+                Attempt.verdict != 'Pending',
+                Attempt.feedback_status.is_(None) | Attempt.feedback_status.in_(['Notified', 'Failed']),
+                ~unnotified_job,
+            )
+            .order_by(Attempt.id.asc())
+            .limit(batch_size)
+            .all()
+        ]
+        if not attempt_ids:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        self.db.execute(insert(AttemptArchive).from_select(
+            ["attempt_id", "student_id", "exercise_id", "code_hash", "verdict", "evaluation_output", "evaluated_at",
+             "evaluation_key", "feedback", "submitted_at", "created_at", "updated_at"],
+            select(Attempt.id, Attempt.student_id, Attempt.exercise_id, Attempt.code_hash, Attempt.verdict,
+                   Attempt.evaluation_output, Attempt.evaluated_at, Attempt.evaluation_key, Attempt.feedback,
+                   Attempt.created_at, literal(now), literal(now))
+            .where(Attempt.id.in_(attempt_ids)),
+        ))
+        self.db.query(EvaluationJob).filter(EvaluationJob.attempt_id.in_(attempt_ids)).delete(
+            synchronize_session=False)
+        self.db.query(Attempt).filter(Attempt.id.in_(attempt_ids)).delete(synchronize_session=False)
+        self.db.commit()
+        return len(attempt_ids)
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+from http import HTTPStatus
+
+from sqlalchemy.orm import Session
+
+from database.models import Broadcast, Student
+from services.service_result import ServiceResult
+from tracing import trace_methods
+
+
+@trace_methods("service")
+class BroadcastService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, message: str, requested_by_chat_id: str) -> ServiceResult[Broadcast]:
+        try:
+            broadcast = Broadcast(message=message, requested_by_chat_id=requested_by_chat_id)
+            self.db.add(broadcast)
+            self.db.commit()
+            return ServiceResult.success(broadcast, HTTPStatus.CREATED)
+        except Exception as e:
+            return ServiceResult.failure(f"Error inesperado: {str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def claim_next(self, include_sending: bool = False) -> Broadcast | None:
+        """
+        Mark the oldest pending broadcast as being sent and return it. With `include_sending`, broadcasts left
+        half-sent by a stopped process are returned too, to resume them from their checkpoint.
+        """
+        statuses = ['Pending', 'Sending'] if include_sending else ['Pending']
+        broadcast: Broadcast | None = (
+            self.db.query(Broadcast)
+            .filter(Broadcast.status.in_(statuses))
+            .order_by(Broadcast.id.asc())
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if broadcast is None:
+            self.db.rollback()
+            return None
+        if broadcast.status == 'Pending':
+            broadcast.status = 'Sending'
+            broadcast.started_at = datetime.now(timezone.utc)
+            broadcast.recipients = self.db.query(Student).count()
+        self.db.commit()
+        return broadcast
+
+    def get_recipients(self, after_user_id: int, limit: int) -> list[tuple[int, str]]:
+        """Next `limit` students after `after_user_id`, in id order (keyset pagination), as (id, chat_id)."""
+        return [
+            (student_id, chat_id) for student_id, chat_id in
+            self.db.query(Student.id, Student.chat_id)
+            .filter(Student.id > after_user_id)
+            .order_by(Student.id.asc())
+            .limit(limit)
+            .all()
+        ]
+
+    def save_progress(self, broadcast_id: int, last_user_id: int, sent: int, failed: int):
+        """Move the checkpoint past a batch of students and add its delivery counts."""
+        (
+            self.db.query(Broadcast)
+            .filter(Broadcast.id == broadcast_id)
+            .update({Broadcast.last_user_id: last_user_id,
+                     Broadcast.sent: Broadcast.sent + sent,
+                     Broadcast.failed: Broadcast.failed + failed},
+                    synchronize_session=False)
+        )
+        self.db.commit()
+
+    def finish(self, broadcast_id: int) -> Broadcast:
+        broadcast: Broadcast = self.db.get(Broadcast, broadcast_id)
+        broadcast.status = 'Done'
+        broadcast.finished_at = datetime.now(timezone.utc)
+        self.db.commit()
+        return broadcast
@@ -0,0 +1,28 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.code_blobs import compress_code, hash_code
+from database.models import CodeBlob
+from tracing import trace_methods
+
+
+@trace_methods("service")
+class CodeBlobService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def store(self, code: str) -> str:
+        """
+        Store a code body once and return its hash, for `Attempt.code_hash`. Added to the caller's transaction.
+        """
+        code_hash = hash_code(code)
+        if self.db.query(CodeBlob.id).filter_by(code_hash=code_hash).first() is not None:
+            return code_hash
+        encoded = code.encode("utf-8")
+        try:
+            with self.db.begin_nested():
+                self.db.add(CodeBlob(code_hash=code_hash, body=compress_code(code), size=len(encoded)))
+        except IntegrityError:
+            # An identical submission stored it concurrently
+            pass
+        return code_hash
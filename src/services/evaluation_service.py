@@ -0,0 +1,159 @@
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.models import EvaluationJob, Attempt, StudentExercise, Student, Exercise, EvaluationCacheEntry
+from evaluation.cache import code_fingerprint, compute_suite_version, evaluation_cache_key
+from evaluation.sandbox import EvaluationResult, TestCaseData
+from metrics import get_registry
+from metrics.cache import CACHE_REQUESTS
+from tracing import trace_methods
+
+EVALUATION_RESULTS = get_registry().counter("evaluation_results_total", "Attempts evaluated, by verdict", ("verdict",))
+
+
+@trace_methods("service")
+class EvaluationService:
+    MAX_TRIES = 3
+    STALE_JOB_TIMEOUT = timedelta(minutes=5)
+    # Verdicts that depend on the machine load rather than on the code are not cached, nor those whose output
+    # points at lines of the source: submissions sharing a key can differ in comments and line breaks
+    UNCACHEABLE_VERDICTS = {'Time Limit Exceeded', 'Internal Error', 'Compilation Error', 'Runtime Error'}
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(self, attempt: Attempt) -> EvaluationJob:
+        """Add an evaluation job for the attempt; committed together with the attempt by the caller."""
+        job = EvaluationJob(attempt=attempt)
+        self.db.add(job)
+        return job
+
+    def claim_next_job(self, worker_id: str) -> EvaluationJob | None:
+        """
+        Lock the oldest queued job (or a job whose worker died) for this worker.
+        SKIP LOCKED lets several workers poll the same table without handing out a job twice.
+        """
+        stale_before = datetime.now(timezone.utc) - self.STALE_JOB_TIMEOUT
+        job: EvaluationJob | None = (
+            self.db.query(EvaluationJob)
+            .filter(
+                (EvaluationJob.status == 'Queued') |
+                ((EvaluationJob.status == 'Running') & (EvaluationJob.locked_at < stale_before))
+            )
+            .order_by(EvaluationJob.id.asc())
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            self.db.rollback()
+            return None
+
+        job.status = 'Running'
+        job.tries += 1
+        job.locked_by = worker_id
+        job.locked_at = datetime.now(timezone.utc)
+        self.db.commit()
+        return job
+
+    def get_job_payload(self, job: EvaluationJob) -> tuple[str, list[TestCaseData]]:
+        attempt: Attempt = job.attempt
+        test_cases = [TestCaseData(input=test_case.input, expected_output=test_case.expected_output)
+                      for test_case in attempt.exercise.test_cases]
+        return attempt.submitted_code, test_cases
+
+    def get_evaluation_key(self, exercise: Exercise, code: str) -> str:
+        return evaluation_cache_key(exercise.id, compute_suite_version(exercise.test_cases), code_fingerprint(code))
+
+    def get_cached_result(self, evaluation_key: str | None) -> EvaluationResult | None:
+        if evaluation_key is None:
+            return None
+        entry: EvaluationCacheEntry | None = (
+            self.db.query(EvaluationCacheEntry)
+            .filter(EvaluationCacheEntry.cache_key == evaluation_key,
+                    # Entries stored before these verdicts became uncacheable
+                    EvaluationCacheEntry.verdict.not_in(self.UNCACHEABLE_VERDICTS))
+            .one_or_none()
+        )
+        if entry is None:
+            CACHE_REQUESTS.labels("evaluation", "miss").inc()
+            return None
+        CACHE_REQUESTS.labels("evaluation", "hit").inc()
+        # Incremented in SQL so concurrent workers do not lose hits
+        self.db.query(EvaluationCacheEntry).filter(EvaluationCacheEntry.id == entry.id).update(
+            {EvaluationCacheEntry.hits: EvaluationCacheEntry.hits + 1}, synchronize_session=False)
+        return EvaluationResult(verdict=entry.verdict, output=entry.output or "")
+
+    def complete_job(self, job_id: int, result: EvaluationResult):
+        job: EvaluationJob = self.db.get(EvaluationJob, job_id)
+        self.save_result(job.attempt, result)
+        self._store_in_cache(job.attempt.evaluation_key, result)
+        job.status = 'Done'
+        job.last_error = None
+        self.db.commit()
+
+    def fail_job(self, job_id: int, error: str):
+        """Requeue the job, or give up on it after MAX_TRIES."""
+        job: EvaluationJob = self.db.get(EvaluationJob, job_id)
+        job.last_error = error
+        if job.tries < self.MAX_TRIES:
+            job.status = 'Queued'
+            job.locked_by = None
+            job.locked_at = None
+        else:
+            job.status = 'Failed'
+            self.save_result(job.attempt, EvaluationResult(verdict='Internal Error'))
+        self.db.commit()
+
+    def get_unnotified_results(self, limit: int = 50) -> list[tuple[EvaluationJob, Attempt, str]]:
+        return (
+            self.db.query(EvaluationJob, Attempt, Student.chat_id)
+            .join(Attempt, EvaluationJob.attempt_id == Attempt.id)
+            .join(Student, Attempt.student_id == Student.id)
+            .filter(EvaluationJob.status.in_(['Done', 'Failed']), EvaluationJob.notified.is_(False))
+            .order_by(EvaluationJob.id.asc())
+            .limit(limit)
+            .all()
+        )
+
+    def mark_notified(self, job_ids: list[int]):
+        if not job_ids:
+            return
+        (
+            self.db.query(EvaluationJob)
+            .filter(EvaluationJob.id.in_(job_ids))
+            .update({EvaluationJob.notified: True}, synchronize_session=False)
+        )
+        self.db.commit()
+
+    def _store_in_cache(self, evaluation_key: str | None, result: EvaluationResult):
+        if evaluation_key is None or result.verdict in self.UNCACHEABLE_VERDICTS:
+            return
+        if self.db.query(EvaluationCacheEntry.id).filter_by(cache_key=evaluation_key).first() is not None:
+            return
+        try:
+            with self.db.begin_nested():
+                self.db.add(EvaluationCacheEntry(cache_key=evaluation_key, verdict=result.verdict,
+                                                 output=result.output))
+        except IntegrityError:
+            # Another worker evaluated the same code first
+            pass
+
+    def save_result(self, attempt: Attempt, result: EvaluationResult):
+        """Store the verdict of an attempt, evaluated or resolved from the cache; committed by the caller."""
+        EVALUATION_RESULTS.labels(result.verdict).inc()
+        attempt.verdict = result.verdict
+        attempt.evaluation_output = result.output
+        attempt.evaluated_at = datetime.now(timezone.utc)
+        if result.verdict != 'Internal Error':
+            attempt.feedback_status = 'Pending'
+
+        if result.verdict == 'Accepted':
+            # Flush pending changes first so they cannot overwrite the bulk update on commit
+            self.db.flush()
+            (
+                self.db.query(StudentExercise)
+                .filter_by(student_id=attempt.student_id, exercise_id=attempt.exercise_id)
+                .update({StudentExercise.status: 'Completed'}, synchronize_session=False)
+            )
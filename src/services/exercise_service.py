@@ -5,8 +5,10 @@ from sqlalchemy.orm import Session
 
 from database.models import Topic, Student, Exercise, StudentExercise
 from services.service_result import ServiceResult
+from tracing import trace_methods
 
 
+@trace_methods("service")
 class ExerciseService:
     DIFFICULTY_LEVELS = ['Basic', 'Intermediate', 'Advanced']
 
@@ -146,3 +148,16 @@ class ExerciseService:
             return ServiceResult.failure("No tenemos solución para este ejercicio.", HTTPStatus.BAD_REQUEST)
 
         return ServiceResult.success(exercise.solution)
+
+    def get_current_topic_id(self, user_id: str) -> ServiceResult[int | None]:
+        """Topic of the exercise the student was most recently given or worked on; None if there is none."""
+        topic_id = (
+            self.db.query(Exercise.topic_id)
+            .join(StudentExercise, StudentExercise.exercise_id == Exercise.id)
+            .join(Student, Student.id == StudentExercise.student_id)
+            .filter(Student.user_id == user_id)
+            .order_by(StudentExercise.updated_at.desc())
+            .limit(1)
+            .scalar()
+        )
+        return ServiceResult.success(topic_id)
@@ -0,0 +1,50 @@
+from sqlalchemy.orm import Session
+
+from database.models import FaqEntry
+from tracing import trace_methods
+
+
+@trace_methods("service")
+class FaqService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_approved_entries(self, embedding_model: str) -> list[FaqEntry]:
+        """Reviewed entries whose embeddings can be compared with queries embedded by `embedding_model`."""
+        return (
+            self.db.query(FaqEntry)
+            .filter(FaqEntry.approved.is_(True), FaqEntry.embedding_model == embedding_model)
+            .order_by(FaqEntry.id.asc())
+            .all()
+        )
+
+    def get_existing_keys(self, question_keys: list[str]) -> set[str]:
+        if not question_keys:
+            return set()
+        rows = self.db.query(FaqEntry.question_key).filter(FaqEntry.question_key.in_(question_keys)).all()
+        return {question_key for question_key, in rows}
+
+    def save_entries(self, entries: list[FaqEntry]):
+        """Insert new entries; an entry whose key already exists replaces its answer and goes back to review."""
+        existing = {
+            entry.question_key: entry
+            for entry in self.db.query(FaqEntry).filter(
+                FaqEntry.question_key.in_([entry.question_key for entry in entries])).all()
+        } if entries else {}
+        for entry in entries:
+            if current := existing.get(entry.question_key):
+                current.question = entry.question
+                current.answer = entry.answer
+                current.frequency = entry.frequency
+                current.embedding = entry.embedding
+                current.embedding_model = entry.embedding_model
+                current.approved = entry.approved
+            else:
+                self.db.add(entry)
+        self.db.commit()
+
+    def record_hits(self, hits: dict[int, int]):
+        for entry_id, count in hits.items():
+            self.db.query(FaqEntry).filter(FaqEntry.id == entry_id).update(
+                {FaqEntry.hits: FaqEntry.hits + count}, synchronize_session=False)
+        self.db.commit()
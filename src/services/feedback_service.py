@@ -0,0 +1,109 @@
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy.orm import Session, selectinload
+
+from database.models import Attempt, Student
+from tracing import trace_methods
+
+
+@trace_methods("service")
+class FeedbackService:
+    MAX_TRIES = 3
+    # A batch still 'Generating' after this long belongs to a stage that died, and is claimed again
+    STALE_CLAIM_TIMEOUT = timedelta(minutes=10)
+    # Wait before the n-th retry: RETRY_BACKOFF * 2 ** (n - 1)
+    RETRY_BACKOFF = timedelta(minutes=1)
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def claim_pending_attempts(self, limit: int = 100) -> list[Attempt]:
+        """
+        Mark up to `limit` evaluated attempts as being processed and return them with their exercise and code loaded:
+        pending attempts whose retry is due, and attempts left 'Generating' by a stage that died.
+        Use a session with expire_on_commit=False to read them after the claim is committed.
+        """
+        now = datetime.now(timezone.utc)
+        attempts: list[Attempt] = (
+            self.db.query(Attempt)
+            .options(selectinload(Attempt.exercise), selectinload(Attempt.code_blob))
+            .filter(
+                ((Attempt.feedback_status == 'Pending') &
+                 (Attempt.feedback_retry_at.is_(None) | (Attempt.feedback_retry_at <= now))) |
+                ((Attempt.feedback_status == 'Generating') &
+                 (Attempt.feedback_claimed_at < now - self.STALE_CLAIM_TIMEOUT))
+            )
+            .order_by(Attempt.id.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=Attempt)
+            .all()
+        )
+        claimed = []
+        for attempt in attempts:
+            if attempt.feedback_status == 'Generating' and attempt.feedback_tries >= self.MAX_TRIES:
+                # Its last try died with the stage: an attempt that keeps crashing it is not retried forever
+                attempt.feedback_status = 'Failed'
+                continue
+            attempt.feedback_status = 'Generating'
+            attempt.feedback_tries += 1
+            attempt.feedback_claimed_at = now
+            claimed.append(attempt)
+        self.db.commit()
+        return claimed
+
+    def get_existing_feedback(self, evaluation_keys: list[str]) -> dict[str, str]:
+        """Feedback already generated for identical submissions, by evaluation key."""
+        if not evaluation_keys:
+            return {}
+        rows = (
+            self.db.query(Attempt.evaluation_key, Attempt.feedback)
+            .filter(Attempt.evaluation_key.in_(evaluation_keys), Attempt.feedback.is_not(None))
+            .all()
+        )
+        return {evaluation_key: feedback for evaluation_key, feedback in rows}
+
+    def save_feedback(self, feedback_by_attempt: dict[int, str]):
+        for attempt_id, feedback in feedback_by_attempt.items():
+            attempt: Attempt = self.db.get(Attempt, attempt_id)
+            attempt.feedback = feedback
+            attempt.feedback_status = 'Ready'
+        self.db.commit()
+
+    def release_attempts(self, attempt_ids: list[int]) -> int:
+        """
+        Put attempts whose feedback could not be generated back in the queue, after an exponential backoff, or
+        give up on them once they have had MAX_TRIES. Returns the number given up on.
+        """
+        if not attempt_ids:
+            return 0
+        now = datetime.now(timezone.utc)
+        failed = 0
+        for attempt in self.db.query(Attempt).filter(Attempt.id.in_(attempt_ids)):
+            if attempt.feedback_tries >= self.MAX_TRIES:
+                attempt.feedback_status = 'Failed'
+                failed += 1
+            else:
+                attempt.feedback_status = 'Pending'
+                attempt.feedback_retry_at = now + self.RETRY_BACKOFF * 2 ** max(attempt.feedback_tries - 1, 0)
+        self.db.commit()
+        return failed
+
+    def get_ready_feedback(self, limit: int = 50) -> list[tuple[Attempt, str]]:
+        return (
+            self.db.query(Attempt, Student.chat_id)
+            .join(Student, Attempt.student_id == Student.id)
+            .filter(Attempt.feedback_status == 'Ready')
+            .order_by(Attempt.id.asc())
+            .limit(limit)
+            .all()
+        )
+
+    def mark_feedback_notified(self, attempt_ids: list[int]):
+        if not attempt_ids:
+            return
+        (
+            self.db.query(Attempt)
+            .filter(Attempt.id.in_(attempt_ids))
+            .update({Attempt.feedback_status: 'Notified'}, synchronize_session=False)
+        )
+        self.db.commit()
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from database.models import Question
+from rag.text import strip_command
+from tracing import trace_methods
+
+
+@trace_methods("service")
+class QuestionService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def save_questions(self, rows: list[dict]):
+        """Insert logged questions (column values of `questions`) in one multi-row statement."""
+        if not rows:
+            return
+        self.db.execute(insert(Question), rows)
+        self.db.commit()
+
+    def get_asked_questions(self, since: datetime, limit: int = 10000) -> list[str]:
+        """
+        Course questions asked since `since`, most recent first, as they were searched: follow-ups in their
+        standalone form, without the bot command rows logged before it was stripped still carry.
+        Greetings and off-topic messages are left out.
+        """
+        rows = (
+            self.db.query(Question.question, Question.standalone_question)
+            .filter(Question.asked_at >= since, Question.answered_by != 'Canned')
+            .order_by(Question.asked_at.desc())
+            .limit(limit)
+            .all()
+        )
+        questions = (strip_command(standalone or question) for question, standalone in rows)
+        return [question for question in questions if question]
@@ -4,8 +4,10 @@ from sqlalchemy.orm import Session
 
 from database.models import Student
 from services.service_result import ServiceResult
+from tracing import trace_methods
 
 
+@trace_methods("service")
 class StudentService:
     def __init__(self, db: Session):
         self.db = db
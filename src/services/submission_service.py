@@ -2,15 +2,21 @@ from http import HTTPStatus
 
 from sqlalchemy.orm import Session
 
-from database.models import Exercise, Student, Attempt
+from database.models import Exercise, Student, Attempt, StudentExercise
+from services.code_blob_service import CodeBlobService
+from services.evaluation_service import EvaluationService
 from services.service_result import ServiceResult
+from tracing import trace_methods
 
 
+@trace_methods("service")
 class SubmissionService:
     def __init__(self, db: Session):
         self.db = db
+        self.evaluation_service = EvaluationService(db)
+        self.code_blob_service = CodeBlobService(db)
 
-    def submit_code(self, user_id: str, exercise_id: int, code: str) -> ServiceResult[None]:
+    def submit_code(self, user_id: str, exercise_id: int, code: str) -> ServiceResult[Attempt]:
         try:
             exercise: Exercise | None = self.db.query(Exercise).filter(Exercise.id == exercise_id).one_or_none()
             if exercise is None:
@@ -21,19 +27,34 @@ class SubmissionService:
             if student is None:
                 return ServiceResult.failure("El estudiante no está registrado.", HTTPStatus.BAD_REQUEST)
 
-            if not any(ex.id == exercise_id for ex in student.exercises):
+            student_exercise: StudentExercise | None = next(
+                (ex for ex in student.exercises if ex.exercise_id == exercise_id), None)
+            if student_exercise is None:
                 return ServiceResult.failure("Parece que no te he recomendado ese ejercicio.",
                                              HTTPStatus.BAD_REQUEST)
 
+            evaluation_key = self.evaluation_service.get_evaluation_key(exercise, code)
             new_attempt = Attempt(
                 student_id=student.id,
                 exercise_id=exercise_id,
-                submitted_code=code,
+                code_hash=self.code_blob_service.store(code),
+                evaluation_key=evaluation_key,
             )
-
             self.db.add(new_attempt)
+
+            if student_exercise.status != 'Completed':
+                student_exercise.status = 'Submitted'
+
+            cached_result = self.evaluation_service.get_cached_result(evaluation_key)
+            if cached_result is not None:
+                # Identical code was already evaluated for this test suite: answer without compiling
+                self.evaluation_service.save_result(new_attempt, cached_result)
+            else:
+                # The job is committed with the attempt, so a submission is never stored without being queued
+                self.evaluation_service.enqueue(new_attempt)
             self.db.commit()
+            self.db.refresh(new_attempt)
 
-            return ServiceResult.success(None)
+            return ServiceResult.success(new_attempt)
         except Exception as e:
             return ServiceResult.failure(f"Error inesperado: {str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR)
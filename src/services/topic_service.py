@@ -5,8 +5,10 @@ from sqlalchemy.orm import Session
 
 from database.models import Topic
 from services.service_result import ServiceResult
+from tracing import trace_methods
 
 
+@trace_methods("service")
 class TopicService:
     def __init__(self, db: Session):
         self.db = db
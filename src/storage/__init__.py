@@ -0,0 +1,2 @@
+from storage.kv_store import KeyValueStore, InMemoryStore, SQLiteStore, RedisStore, create_store_from_env
+from storage.cache import SharedCache
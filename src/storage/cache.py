@@ -0,0 +1,56 @@
+import pickle
+from typing import Any
+
+from metrics.cache import CACHE_REQUESTS
+from storage.kv_store import KeyValueStore
+
+
+class SharedCache:
+    def __init__(self, store: KeyValueStore, namespace: str, default_ttl: float | None = None):
+        """
+        Cache of picklable values in a KeyValueStore, so every bot worker sees the same entries.
+
+        Args:
+            store (KeyValueStore): Backing store.
+            namespace (str): Prefix isolating this cache's keys.
+            default_ttl (float): Seconds an entry lives when `set` gets no ttl; None keeps it forever.
+        """
+        self.store = store
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._hit_counter = CACHE_REQUESTS.labels(namespace, "hit")
+        self._miss_counter = CACHE_REQUESTS.labels(namespace, "miss")
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Any | None:
+        data = await self.store.get(self._key(key))
+        if data is None:
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+        self.hits += 1
+        self._hit_counter.inc()
+        return pickle.loads(data)
+
+    async def set(self, key: str, value: Any, ttl: float | None = None):
+        await self.store.set(self._key(key), pickle.dumps(value), ttl or self.default_ttl)
+
+    async def delete(self, key: str):
+        await self.store.delete(self._key(key))
+
+
+CATALOG_VERSION_KEY = "catalog_version"
+
+
+async def get_catalog_version(store: KeyValueStore) -> int:
+    """Version of the topics/exercises catalog; cached entries derived from it include it in their key."""
+    value = await store.get(CATALOG_VERSION_KEY)
+    return int(value) if value else 0
+
+
+async def bump_catalog_version(store: KeyValueStore) -> int:
+    return await store.incr(CATALOG_VERSION_KEY)
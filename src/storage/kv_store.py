@@ -0,0 +1,347 @@
+import asyncio
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
+
+
+class KeyValueStore(ABC):
+    """
+    Abstract byte key-value store shared by the bot workers (conversation state, user data and caches).
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    async def get_prefix(self, prefix: str) -> dict[str, bytes]:
+        """Return every live entry whose key starts with `prefix`."""
+        pass
+
+    @abstractmethod
+    async def set_many(self, items: dict[str, bytes | None], ttl: float | None = None):
+        """Write several entries in one round trip; a None value deletes the key."""
+        pass
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Atomically increment an integer counter and return the new value."""
+        pass
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None):
+        await self.set_many({key: value}, ttl)
+
+    async def delete(self, key: str):
+        await self.set_many({key: None})
+
+    async def close(self):
+        pass
+
+
+def _store_limits(max_entries: int | None, purge_interval: float | None) -> tuple[int, float]:
+    return (max_entries or int(os.getenv("PERSISTENCE_MAX_ENTRIES", "100000")),
+            purge_interval or float(os.getenv("PERSISTENCE_PURGE_INTERVAL", "60")))
+
+
+# Share of max_entries left after evicting, so a full store does not evict on every write
+_EVICT_TO = 0.9
+
+
+class InMemoryStore(KeyValueStore):
+    def __init__(self, max_entries: int | None = None, purge_interval: float | None = None):
+        """
+        Process-local store, for a single bot process and for tests. Writes delete the expired entries every
+        `purge_interval` seconds, and beyond `max_entries` evict those closest to expiring (entries without a ttl,
+        such as conversation states, last).
+
+        Args:
+            max_entries (int): Entries kept (default PERSISTENCE_MAX_ENTRIES or 100000).
+            purge_interval (float): Seconds between purges of expired entries (default PERSISTENCE_PURGE_INTERVAL
+                or 60).
+        """
+        self.max_entries, self.purge_interval = _store_limits(max_entries, purge_interval)
+        self._data: dict[str, tuple[bytes, float | None]] = {}
+        self._purged_at = time.monotonic()
+
+    def _purge(self):
+        if time.monotonic() - self._purged_at >= self.purge_interval:
+            self._purged_at = time.monotonic()
+            now = time.time()
+            expired = [key for key, (_, expires_at) in self._data.items()
+                       if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._data[key]
+        if len(self._data) > self.max_entries:
+            # Stable sort: entries without a ttl go in write order
+            keys = sorted(self._data, key=lambda key: (self._data[key][1] is None, self._data[key][1] or 0))
+            for key in keys[:len(self._data) - int(self.max_entries * _EVICT_TO)]:
+                del self._data[key]
+
+    def _live(self, key: str) -> bytes | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> bytes | None:
+        return self._live(key)
+
+    async def get_prefix(self, prefix: str) -> dict[str, bytes]:
+        keys = [key for key in self._data if key.startswith(prefix)]
+        return {key: value for key in keys if (value := self._live(key)) is not None}
+
+    async def set_many(self, items: dict[str, bytes | None], ttl: float | None = None):
+        expires_at = time.time() + ttl if ttl else None
+        for key, value in items.items():
+            self._data.pop(key, None)
+            if value is not None:
+                self._data[key] = (value, expires_at)
+        self._purge()
+
+    async def incr(self, key: str) -> int:
+        value = int(self._live(key) or 0) + 1
+        self._data[key] = (str(value).encode(), None)
+        return value
+
+
+class SQLiteStore(KeyValueStore):
+    def __init__(self, path: str, max_entries: int | None = None, purge_interval: float | None = None):
+        """
+        On-disk store in a SQLite file. WAL mode lets several bot processes on one host share it. Every
+        `purge_interval` seconds a write deletes the expired entries and, beyond `max_entries`, those closest to
+        expiring (entries without a ttl last).
+
+        Args:
+            path (str): Path of the database file, created if missing.
+            max_entries (int): Entries kept (default PERSISTENCE_MAX_ENTRIES or 100000).
+            purge_interval (float): Seconds between purges (default PERSISTENCE_PURGE_INTERVAL or 60).
+        """
+        self.path = path
+        self.max_entries, self.purge_interval = _store_limits(max_entries, purge_interval)
+        self._purged_at = time.monotonic()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS kv_expires_at ON kv (expires_at)")
+        self._lock = asyncio.Lock()
+
+    async def _run(self, function, *args):
+        # sqlite3 connections are not safe to use from two threads at once
+        async with self._lock:
+            return await asyncio.to_thread(function, *args)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._run(self._get, key)
+
+    def _get(self, key: str) -> bytes | None:
+        row = self._connection.execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    async def get_prefix(self, prefix: str) -> dict[str, bytes]:
+        return await self._run(self._get_prefix, prefix)
+
+    def _get_prefix(self, prefix: str) -> dict[str, bytes]:
+        rows = self._connection.execute(
+            "SELECT key, value FROM kv WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\uffff", time.time())
+        ).fetchall()
+        return dict(rows)
+
+    async def set_many(self, items: dict[str, bytes | None], ttl: float | None = None):
+        if items:
+            await self._run(self._set_many, items, ttl)
+
+    def _set_many(self, items: dict[str, bytes | None], ttl: float | None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, value, expires_at) for key, value in items.items() if value is not None]
+            )
+            self._connection.executemany(
+                "DELETE FROM kv WHERE key = ?", [(key,) for key, value in items.items() if value is None]
+            )
+        if time.monotonic() - self._purged_at >= self.purge_interval:
+            self._purged_at = time.monotonic()
+            self._purge()
+
+    def _purge(self):
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute("DELETE FROM kv WHERE expires_at <= ?", (time.time(),))
+            count = self._connection.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+            if count > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM kv WHERE key IN "
+                    "(SELECT key FROM kv ORDER BY expires_at IS NULL, expires_at, rowid LIMIT ?)",
+                    (count - int(self.max_entries * _EVICT_TO),)
+                )
+
+    async def incr(self, key: str) -> int:
+        return await self._run(self._incr, key)
+
+    def _incr(self, key: str) -> int:
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            row = self._connection.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            value = int(row[0]) + 1 if row else 1
+            self._connection.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, NULL)",
+                                     (key, str(value).encode()))
+        return value
+
+    async def close(self):
+        self._connection.close()
+
+
+class RedisStore(KeyValueStore):
+    def __init__(self, url: str):
+        """
+        Store speaking the Redis protocol (RESP) over a single connection, with pipelined batch writes.
+        Works with Redis, compatible servers, and the local stand-in in storage.redis_standin.
+
+        Args:
+            url (str): Connection URL, e.g. redis://localhost:6379/0.
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._pipeline([("AUTH", self.password)], connected=True)
+        if self.db:
+            await self._pipeline([("SELECT", str(self.db))], connected=True)
+
+    @staticmethod
+    def _encode(command: tuple) -> bytes:
+        parts = [f"*{len(command)}\r\n".encode()]
+        for argument in command:
+            data = argument if isinstance(argument, bytes) else str(argument).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RuntimeError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+    async def _pipeline(self, commands: list[tuple], connected: bool = False) -> list:
+        """Send all commands in one write and read their replies in order."""
+        if connected:
+            return await self._send(commands)
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await self._send(commands)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self._disconnect()
+            except BaseException:
+                # Cancelled or failed halfway: replies left unread would be taken as those of the next commands
+                self._disconnect()
+                raise
+            # Reconnect once, e.g. after the server restarted
+            try:
+                await self._connect()
+                return await self._send(commands)
+            except BaseException:
+                self._disconnect()
+                raise
+
+    def _disconnect(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _send(self, commands: list[tuple]) -> list:
+        self._writer.write(b"".join(self._encode(command) for command in commands))
+        await self._writer.drain()
+        return [await self._read_reply() for _ in commands]
+
+    async def get(self, key: str) -> bytes | None:
+        return (await self._pipeline([("GET", key)]))[0]
+
+    async def get_prefix(self, prefix: str) -> dict[str, bytes]:
+        keys = []
+        cursor = "0"
+        while True:
+            cursor, batch = (await self._pipeline([("SCAN", cursor, "MATCH", f"{prefix}*", "COUNT", 500)]))[0]
+            keys.extend(key.decode() for key in batch)
+            cursor = cursor.decode() if isinstance(cursor, bytes) else str(cursor)
+            if cursor == "0":
+                break
+        if not keys:
+            return {}
+        values = (await self._pipeline([("MGET", *keys)]))[0]
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    async def set_many(self, items: dict[str, bytes | None], ttl: float | None = None):
+        if not items:
+            return
+        commands = []
+        for key, value in items.items():
+            if value is None:
+                commands.append(("DEL", key))
+            elif ttl:
+                commands.append(("SET", key, value, "PX", int(ttl * 1000)))
+            else:
+                commands.append(("SET", key, value))
+        await self._pipeline(commands)
+
+    async def incr(self, key: str) -> int:
+        return (await self._pipeline([("INCR", key)]))[0]
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._writer = None
+
+
+def create_store_from_env() -> KeyValueStore:
+    """Build the store selected by PERSISTENCE_BACKEND (memory, sqlite or redis)."""
+    backend = os.getenv("PERSISTENCE_BACKEND", "memory")
+    if backend == "sqlite":
+        return SQLiteStore(os.getenv("PERSISTENCE_SQLITE_PATH", "../data/bot_state.sqlite3"))
+    if backend == "redis":
+        return RedisStore(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    if backend == "memory":
+        return InMemoryStore()
+    raise ValueError(f"Unknown PERSISTENCE_BACKEND: {backend}")
@@ -0,0 +1,110 @@
+import asyncio
+import fnmatch
+import time
+
+
+class RedisStandIn:
+    """
+    Minimal in-memory server speaking the Redis protocol, enough for RedisStore:
+    PING, AUTH, SELECT, GET, MGET, SET (EX/PX), DEL, INCR, SCAN and FLUSHDB.
+    Lets the Redis backend be exercised locally without a Redis installation.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._data: dict[bytes, tuple[bytes, float | None]] = {}
+        self._server: asyncio.base_events.Server | None = None
+        self._clients: set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        for client in list(self._clients):
+            client.cancel()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if command is None:
+                    break
+                writer.write(self._execute(command))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> list[bytes] | None:
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        arguments = []
+        for _ in range(count):
+            length = int((await reader.readline())[1:-2])
+            arguments.append((await reader.readexactly(length + 2))[:-2])
+        return arguments
+
+    def _get(self, key: bytes) -> bytes | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    def _execute(self, command: list[bytes]) -> bytes:
+        name, arguments = command[0].upper(), command[1:]
+        if name in (b"PING", b"AUTH", b"SELECT", b"FLUSHDB"):
+            if name == b"FLUSHDB":
+                self._data.clear()
+            return b"+OK\r\n" if name != b"PING" else b"+PONG\r\n"
+        if name == b"GET":
+            return self._bulk(self._get(arguments[0]))
+        if name == b"MGET":
+            return b"*%d\r\n" % len(arguments) + b"".join(self._bulk(self._get(key)) for key in arguments)
+        if name == b"SET":
+            expires_at = None
+            options = [argument.upper() for argument in arguments[2:]]
+            if b"PX" in options:
+                expires_at = time.time() + int(arguments[2 + options.index(b"PX") + 1]) / 1000
+            elif b"EX" in options:
+                expires_at = time.time() + int(arguments[2 + options.index(b"EX") + 1])
+            self._data[arguments[0]] = (arguments[1], expires_at)
+            return b"+OK\r\n"
+        if name == b"DEL":
+            removed = sum(self._data.pop(key, None) is not None for key in arguments)
+            return b":%d\r\n" % removed
+        if name == b"INCR":
+            value = int(self._get(arguments[0]) or 0) + 1
+            self._data[arguments[0]] = (str(value).encode(), None)
+            return b":%d\r\n" % value
+        if name == b"SCAN":
+            pattern = arguments[arguments.index(b"MATCH") + 1].decode() if b"MATCH" in arguments else "*"
+            keys = [key for key in list(self._data) if self._get(key) is not None
+                    and fnmatch.fnmatchcase(key.decode(), pattern)]
+            return b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys) + b"".join(self._bulk(key) for key in keys)
+        return b"-ERR unknown command '%s'\r\n" % name
+
+    @staticmethod
+    def _bulk(value: bytes | None) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
@@ -0,0 +1,30 @@
+import chromadb
+from langchain_chroma.vectorstores import Chroma
+
+from database.database import SessionLocal
+from rag.topic_retrieval import TopicTagger
+from rag.utils import persist_dir
+from services import TopicService
+
+# Re-tag the chunks of an existing vector store with the current topics, without re-embedding them.
+# Run it after adding or renaming topics (populate_database.py).
+with SessionLocal() as session:
+    topics = [(topic.id, topic.name) for topic in TopicService(session).get_all().item or []]
+
+tagger = TopicTagger(topics)
+collection = chromadb.PersistentClient(path=persist_dir).get_collection(Chroma._LANGCHAIN_DEFAULT_COLLECTION_NAME)
+
+batch_size = 500
+tagged = 0
+total = collection.count()
+for offset in range(0, total, batch_size):
+    batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+    metadatas = []
+    for document, metadata in zip(batch["documents"], batch["metadatas"]):
+        metadata = dict(metadata or {})
+        metadata["topic_id"] = tagger.topic_for(document, metadata.get("section", ""))
+        tagged += metadata["topic_id"] != 0
+        metadatas.append(metadata)
+    collection.update(ids=batch["ids"], metadatas=metadatas)
+
+print(f"Tagged {tagged} of {total} chunks with one of {len(topics)} topics.")
@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import os
+import time
 from enum import Enum
 from http import HTTPStatus
 from typing import List
@@ -7,12 +9,34 @@ from typing import List
 from telegram import Update
 from telegram.constants import ParseMode
 from telegram.ext import filters, MessageHandler, Application, CommandHandler, CallbackContext, ContextTypes, \
-    ConversationHandler
+    ConversationHandler, BasePersistence
 from telegram.helpers import escape_markdown
-
-from database.models import Topic, Exercise, Student, ExerciseHint
-from services import StudentService, ExerciseService, TopicService, HintService, ServiceResult, SubmissionService
-from telegram_bot.utils import format_solution, inject_services
+from telegram.request import BaseRequest
+
+from database.database import SessionLocal
+from database.models import Topic, Exercise, Student, ExerciseHint, Attempt, Broadcast
+from evaluation.feedback import FeedbackStage
+from metrics import get_registry
+from rag.faq import FaqIndex
+from rag.feedback import SubmissionFeedbackGenerator
+from rag.intents import CANNED_ANSWERS, QUESTION
+from rag.memory import ConversationMemory, ConversationStore
+from rag.text import canonical_question, strip_command
+from rag.utils import embedding_model
+from services import StudentService, ExerciseService, TopicService, HintService, ServiceResult, SubmissionService, \
+    EvaluationService, FeedbackService, FaqService, BroadcastService
+from storage import KeyValueStore, InMemoryStore, SharedCache
+from storage.cache import get_catalog_version
+from tracing import get_tracer
+from tracing.profiler import get_profiler
+from tracing.watchdog import create_watchdog_from_env
+from telegram_bot.broadcast import BroadcastEngine
+from telegram_bot.outbound import OutboundSender
+from telegram_bot.question_log import QuestionLog, QuestionRecord
+from telegram_bot.scheduler import FairScheduler, SchedulerRejected
+from telegram_bot.update_processor import PerUserUpdateProcessor
+from telegram_bot.utils import format_solution, inject_services, format_evaluation_result, trace_handlers, \
+    UpdateService
 
 
 class RegistrationStates(Enum):
@@ -28,28 +52,214 @@ class SubmissionStates(Enum):
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ASK_INTENTS = get_registry().counter("ask_intents_total", "Messages sent to /ask, by detected intent", ("intent",))
+
 
 @inject_services
+@trace_handlers
 class TelegramBot:
-    def __init__(self, ai_tutor, llm):
+    EVALUATION_POLL_INTERVAL = 2.0
+    BROADCAST_POLL_INTERVAL = 5.0
+
+    # Bound to the session of the update being handled (see `_create_services`)
+    student_service = UpdateService()
+    exercise_service = UpdateService()
+    topic_service = UpdateService()
+    hint_service = UpdateService()
+    submission_service = UpdateService()
+    broadcast_service = UpdateService()
+
+    def __init__(self, ai_tutor, llm, request: BaseRequest | None = None, background_tasks: bool = True,
+                 store: KeyValueStore | None = None, persistence: BasePersistence | None = None,
+                 faq: FaqIndex | None = None, intent_filter: bool = True, conversation_memory: bool = True,
+                 question_log: bool = True):
+        """
+        Args:
+            ai_tutor: The AI tutor answering /ask questions.
+            llm: The language model used for submission feedback.
+            request (BaseRequest): Custom Bot API transport, e.g. a fake one for tests.
+            background_tasks (bool): Whether this instance sends notifications and generates feedback.
+                Only one process of a multi-worker deployment should.
+            store (KeyValueStore): Store for the caches shared between workers (in-process if omitted).
+            persistence (BasePersistence): Persistence for conversation states and user_data.
+            faq (FaqIndex): Precomputed answers tried before the RAG chain, reloaded from faq_entries.
+            intent_filter (bool): Whether greetings, thanks and off-topic messages sent to /ask get a canned answer
+                instead of going through the RAG chain.
+            conversation_memory (bool): Whether /ask remembers each student's recent questions, so follow-ups
+                are understood.
+            question_log (bool): Whether /ask questions, with how they were answered, are written to `questions`.
+        """
         self.ai_tutor = ai_tutor
         self.llm = llm
-        self.app = Application.builder().token(self._get_bot_token()).build()
+        self.background_tasks = background_tasks
+        self.feedback_stage = FeedbackStage(SubmissionFeedbackGenerator(llm))
+        self.store = store or InMemoryStore()
+        self.answer_cache = SharedCache(self.store, "answers",
+                                        default_ttl=float(os.getenv("ANSWER_CACHE_TTL", "86400")))
+        self.persistence = persistence
+        self.faq = faq
+        self.intent_filter = intent_filter
+        self.conversations = ConversationStore(self.store, ai_tutor.router) if conversation_memory else None
+        self.question_log = QuestionLog() if question_log else None
+
+        self.ask_scheduler = FairScheduler()
+        # Debug mode: only created when LOOP_WATCHDOG_MS is set
+        self.watchdog = create_watchdog_from_env()
+
+        builder = (
+            Application.builder()
+            .token(self._get_bot_token())
+            .concurrent_updates(PerUserUpdateProcessor())
+            .post_init(self._post_init)
+            .post_stop(self._post_stop)
+            .post_shutdown(self._post_shutdown)
+        )
+        if request is not None:
+            builder = builder.request(request).get_updates_request(request)
+        if persistence is not None:
+            builder = builder.persistence(persistence)
+        self.app = builder.build()
+        # Replies and notifications are queued and sent within Telegram's flood limits
+        self.outbound = OutboundSender(self.app.bot)
+        self.broadcast_engine = BroadcastEngine(self.outbound)
         self._setup_command_handlers()
 
-    def _initialize_services(self, session):
-        """ Initializes services with the given database session """
-        self.student_service = StudentService(session)
-        self.exercise_service = ExerciseService(session)
-        self.topic_service = TopicService(session)
-        self.hint_service = HintService(session)
-        self.submission_service = SubmissionService(session)
-        print("Services initialized")
+    @staticmethod
+    def _create_services(session) -> dict:
+        """Services of one update, on its own session; concurrent updates each get theirs."""
+        return {
+            "student_service": StudentService(session),
+            "exercise_service": ExerciseService(session),
+            "topic_service": TopicService(session),
+            "hint_service": HintService(session),
+            "submission_service": SubmissionService(session),
+            "broadcast_service": BroadcastService(session),
+        }
 
     def run(self):
         """Start polling for updates."""
         self.app.run_polling()
 
+    async def _post_init(self, application: Application):
+        """Start the background tasks once the application is initialized."""
+        if self.watchdog is not None:
+            self.watchdog.start()
+        if self.question_log is not None:
+            self.question_log.start()
+        if self.faq is not None:
+            application.create_task(self._refresh_faq())
+        if not self.background_tasks:
+            return
+        application.create_task(self._notify_evaluation_results())
+        application.create_task(self.feedback_stage.run_forever())
+        application.create_task(self._run_broadcasts())
+
+    async def _post_stop(self, application: Application):
+        """Send the queued messages while the bot can still reach Telegram, and write the logged questions."""
+        await self.outbound.stop()
+        if self.question_log is not None:
+            await self.question_log.stop()
+
+    async def _post_shutdown(self, application: Application):
+        if self.watchdog is not None:
+            await self.watchdog.stop()
+        if profiler := get_profiler():
+            profiler.stop()
+        await self.store.close()
+        get_tracer().shutdown()
+
+    async def _notify_evaluation_results(self):
+        """Push evaluation results and tutor feedback to the students as they become ready."""
+        while True:
+            try:
+                results, feedback = await asyncio.to_thread(self._fetch_notifications)
+                notified_job_ids = await self._send_notifications(results)
+                notified_attempt_ids = await self._send_notifications(feedback)
+                await asyncio.to_thread(self._mark_notified, notified_job_ids, notified_attempt_ids)
+            except Exception as e:
+                logger.error(f"Error fetching evaluation results: {e}", exc_info=True)
+
+            await asyncio.sleep(self.EVALUATION_POLL_INTERVAL)
+
+    async def _run_broadcasts(self):
+        """Send the broadcasts requested with /broadcast, one at a time, resuming any left half-sent."""
+        resuming = True
+        while True:
+            try:
+                while broadcast := await asyncio.to_thread(self._claim_broadcast, resuming):
+                    start = asyncio.get_running_loop().time()
+                    broadcast = await self.broadcast_engine.run(broadcast)
+                    self.outbound.send(broadcast.requested_by_chat_id, self._broadcast_report(
+                        broadcast, asyncio.get_running_loop().time() - start))
+                resuming = False
+            except Exception as e:
+                logger.error(f"Error sending broadcasts: {e}", exc_info=True)
+
+            await asyncio.sleep(self.BROADCAST_POLL_INTERVAL)
+
+    @staticmethod
+    def _claim_broadcast(include_sending: bool) -> Broadcast | None:
+        with SessionLocal(expire_on_commit=False) as session:
+            return BroadcastService(session).claim_next(include_sending)
+
+    @staticmethod
+    def _broadcast_report(broadcast: Broadcast, seconds: float) -> str:
+        return (f"Difusión #{broadcast.id} terminada en {seconds:.0f} s:\n"
+                f"- Enviados: {broadcast.sent}\n"
+                f"- Fallidos: {broadcast.failed}\n"
+                f"- Estudiantes: {broadcast.recipients}")
+
+    async def _refresh_faq(self):
+        """Reload the approved FAQ entries periodically, saving the hits counted since the last reload."""
+        interval = float(os.getenv("FAQ_REFRESH_SECONDS", "300"))
+        while True:
+            try:
+                await asyncio.to_thread(self._reload_faq)
+            except Exception as e:
+                logger.error(f"Error reloading the FAQ: {e}", exc_info=True)
+
+            await asyncio.sleep(interval)
+
+    def _reload_faq(self):
+        with SessionLocal() as session:
+            faq_service = FaqService(session)
+            if hits := self.faq.take_hits():
+                faq_service.record_hits(hits)
+            self.faq.load(faq_service.get_approved_entries(embedding_model))
+
+    async def _send_notifications(self, notifications: list[tuple[int, str, str]]) -> list[int]:
+        """Queue the notifications and return the ids of those that were sent; failures are logged by the sender."""
+        sent = [(notification_id, self.outbound.send(chat_id, message))
+                for notification_id, chat_id, message in notifications]
+        if sent:
+            await asyncio.wait([future for _, future in sent])
+        return [notification_id for notification_id, future in sent if future.exception() is None]
+
+    def _reply(self, update: Update, text: str, parse_mode: str | None = None) -> asyncio.Future:
+        """Queue a message to the chat of the update without waiting for it to be sent."""
+        return self.outbound.send(update.effective_chat.id, text, parse_mode=parse_mode)
+
+    @staticmethod
+    def _fetch_notifications() -> tuple[list[tuple[int, str, str]], list[tuple[int, str, str]]]:
+        with SessionLocal() as session:
+            results = [
+                (job.id, chat_id, format_evaluation_result(attempt.exercise_id, attempt.verdict,
+                                                           attempt.evaluation_output))
+                for job, attempt, chat_id in EvaluationService(session).get_unnotified_results()
+            ]
+            feedback = [
+                (attempt.id, chat_id, f"Comentarios sobre tu intento del ejercicio '{attempt.exercise_id}':\n\n"
+                                      f"{attempt.feedback}")
+                for attempt, chat_id in FeedbackService(session).get_ready_feedback()
+            ]
+            return results, feedback
+
+    @staticmethod
+    def _mark_notified(job_ids: list[int], attempt_ids: list[int]):
+        with SessionLocal() as session:
+            EvaluationService(session).mark_notified(job_ids)
+            FeedbackService(session).mark_feedback_notified(attempt_ids)
+
     @staticmethod
     def _get_bot_token() -> str:
         """Retrieve and validate the Telegram bot token."""
@@ -61,7 +271,10 @@ class TelegramBot:
 
     def _setup_command_handlers(self):
         """Configure command and message handlers."""
+        persistent = self.persistence is not None
         start_conversation_handler = ConversationHandler(
+            name="registration",
+            persistent=persistent,
             entry_points=[CommandHandler('start', self.handle_start)],
             states={
                 RegistrationStates.GET_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_name_input)],
@@ -71,6 +284,8 @@ class TelegramBot:
             fallbacks=[CommandHandler('cancel', self.handle_cancel)],
         )
         submit_conversation_handler = ConversationHandler(
+            name="submission",
+            persistent=persistent,
             entry_points=[CommandHandler("submit", self.start_submission)],
             states={
                 SubmissionStates.AWAITING_CODE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.receive_code)],
@@ -85,24 +300,129 @@ class TelegramBot:
         self.app.add_handler(CommandHandler("solution", self.handle_solution_request))
         self.app.add_handler(CommandHandler("topics", self.handle_topics_list))
         self.app.add_handler(CommandHandler("topic", self.handle_topic_description))
+        self.app.add_handler(CommandHandler("stats", self.handle_stats))
+        self.app.add_handler(CommandHandler("broadcast", self.handle_broadcast))
         self.app.add_handler(submit_conversation_handler)
         self.app.add_handler(MessageHandler(filters.COMMAND, self.handle_unknown_command))
 
     async def handle_user_question(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Process a user's question and provide an AI-generated answer."""
-        user_question = update.message.text.strip()
+        # Everything downstream (intent, memory, cache keys, the log) works on the question without "/ask"
+        user_question = strip_command(update.message.text)
         if not user_question:
-            await update.message.reply_text("Por favor, envía una pregunta válida. La pregunta no puede ser vacía.")
+            self._reply(update, "Por favor, envía una pregunta válida. La pregunta no puede ser vacía.")
             return
 
-        await update.message.reply_text("Pensando... 🤔")
+        # Filled in along the way and logged however the question ends up answered
+        record = QuestionRecord(user_id=str(update.effective_user.id), question=user_question, answered_by="Error",
+                                latency=0.0)
+        start = time.perf_counter()
         try:
-            ai_response = self.ai_tutor.answer_question(user_question)
+            await self._answer_user_question(update, user_question, record)
+        finally:
+            if self.question_log is not None:
+                record.latency = time.perf_counter() - start
+                self.question_log.log(record)
+
+    async def _answer_user_question(self, update: Update, user_question: str, record: QuestionRecord):
+        # Greetings, thanks and questions clearly unrelated to the course need neither retrieval nor the LLM
+        if self.intent_filter:
+            record.intent = await self._classify_intent(user_question)
+            if canned_answer := CANNED_ANSWERS.get(record.intent):
+                self._reply(update, canned_answer)
+                record.answered_by, record.answer = "Canned", canned_answer
+                return
+
+        # Follow-ups ("¿y con un for?") are condensed with the student's earlier questions into a standalone one,
+        # which is the one cached, looked up and answered
+        memory = await self.conversations.get(update.effective_user.id) if self.conversations else None
+        question = await self.conversations.condense(user_question, memory) if memory else user_question
+        history = memory.render() if question != user_question else ""
+        if question != user_question:
+            record.standalone_question = question
+
+        # Answers are scoped to the topic the student is working on
+        topic_id = record.topic_id = self.exercise_service.get_current_topic_id(str(update.effective_user.id)).item
+        # Give the connection back: the question may wait for the scheduler and the LLM for seconds
+        self.exercise_service.db.commit()
+        cache_key = f"{await get_catalog_version(self.store)}:{topic_id or 0}:{canonical_question(question)}"
+        if cached_answer := await self.answer_cache.get(cache_key):
+            self._reply(update, cached_answer, parse_mode="Markdown")
+            record.answered_by, record.answer = "Cache", cached_answer
+            await self._remember(update, memory, question, cached_answer)
+            return
+
+        # Frequent questions were answered offline; a close enough match skips the RAG chain
+        if self.faq is not None and (faq_match := await self.faq.alookup(question, topic_id)):
+            sent = self._reply(update, faq_match.answer, parse_mode="Markdown")
+            record.answered_by, record.answer = "Faq", faq_match.answer
+            self.app.create_task(self._cache_when_sent(sent, cache_key, faq_match.answer))
+            await self._remember(update, memory, question, faq_match.answer)
+            return
+
+        async def notify_queue_position(position: int):
+            self._reply(
+                update, f"Hay muchas preguntas en este momento. La tuya es la número {position} en la cola ⏳")
+
+        try:
+            if self.ai_tutor.is_being_answered(question, topic_id):
+                # Joining a computation already in flight does not need a scheduler slot
+                ai_response = await self._answer_question(update, question, topic_id, history)
+            else:
+                ai_response = await self.ask_scheduler.submit(
+                    update.effective_user.id,
+                    lambda: self._answer_question(update, question, topic_id, history),
+                    on_queued=notify_queue_position,
+                )
             answer = ai_response.get("answer", "Lo siento, no encontré una respuesta.")
-            await update.message.reply_text(answer, parse_mode="Markdown")
+            sent = self._reply(update, answer, parse_mode="Markdown")
+            record.clean_query = ai_response.get("input")
+            record.chunk_ids = [document.id for document in ai_response.get("context", []) if document.id]
+            if "answer" in ai_response:
+                record.answered_by, record.answer = "Rag", answer
+                self.app.create_task(self._cache_when_sent(sent, cache_key, answer))
+                await self._remember(update, memory, question, answer)
+        except SchedulerRejected as e:
+            self._reply(update, self._rejection_message(e))
+            record.answered_by = "Rejected"
         except Exception as e:
             logger.error(f"Error procesando la pregunta del usuario: {e}", exc_info=True)
-            await update.message.reply_text("Ocurrió un error al procesar tu pregunta. Intenta nuevamente más tarde.")
+            self._reply(update, "Ocurrió un error al procesar tu pregunta. Intenta nuevamente más tarde.")
+
+    async def _cache_when_sent(self, sent: asyncio.Future, cache_key: str, answer: str):
+        """Cache an answer once it reached the student, so an answer Telegram rejects is not served again."""
+        try:
+            await sent
+        except Exception:
+            # Already logged by the sender
+            return
+        await self.answer_cache.set(cache_key, answer)
+
+    async def _remember(self, update: Update, memory: ConversationMemory | None, question: str, answer: str):
+        if self.conversations is not None:
+            await self.conversations.append(update.effective_user.id, memory, question, answer)
+
+    async def _classify_intent(self, question: str) -> str:
+        try:
+            intent = await self.ai_tutor.aclassify_intent(question)
+        except Exception as e:
+            logger.warning(f"Could not classify the intent of a question: {e}")
+            intent = QUESTION
+        ASK_INTENTS.labels(intent).inc()
+        return intent
+
+    async def _answer_question(self, update: Update, question: str, topic_id: int | None, history: str) -> dict:
+        self._reply(update, "Pensando... 🤔")
+        return await self.ai_tutor.aanswer_question(question, topic_id, history)
+
+    @staticmethod
+    def _rejection_message(rejection: SchedulerRejected) -> str:
+        if rejection.reason == "rate_limited":
+            return (f"Estás haciendo preguntas muy rápido. Espera {max(1, round(rejection.retry_after))} "
+                    f"segundos e inténtalo de nuevo.")
+        if rejection.reason == "too_many_pending":
+            return "Ya tienes preguntas esperando respuesta. Espera a que terminen antes de enviar otra."
+        return "Hay demasiadas preguntas en este momento. Inténtalo de nuevo en unos minutos."
 
     async def handle_start(self, update: Update, context: CallbackContext):
         """Start the user registration process."""
@@ -111,22 +431,22 @@ class TelegramBot:
 
         if result.is_success:
             user: Student = result.item
-            await update.message.reply_text(
-                f"¡Hola, {user.first_name}! 👋 Bienvenido de nuevo. Escribe /help para ver qué puedes hacer.")
+            self._reply(
+                update, f"¡Hola, {user.first_name}! 👋 Bienvenido de nuevo. Escribe /help para ver qué puedes hacer.")
             return ConversationHandler.END
         elif result.status_code == HTTPStatus.NOT_FOUND:
-            await update.message.reply_text(
-                "¡Hola! 👋 Parece que es la primera vez que usas este bot. Por favor, ingresa tu nombre:")
+            self._reply(
+                update, "¡Hola! 👋 Parece que es la primera vez que usas este bot. Por favor, ingresa tu nombre:")
             return RegistrationStates.GET_NAME
         else:
             logger.error(f"Error getting user: {result.message}", exc_info=True)
-            await update.message.reply_text("Ocurrió un error al procesar tu solicitud :(.")
+            self._reply(update, "Ocurrió un error al procesar tu solicitud :(.")
             return ConversationHandler.END
 
     async def handle_name_input(self, update: Update, context: CallbackContext):
         """Store the user's first name and request last name."""
         context.user_data['first_name'] = update.message.text
-        await update.message.reply_text(f"Gracias, {context.user_data['first_name']}. Ahora, ingresa tus apellidos:")
+        self._reply(update, f"Gracias, {context.user_data['first_name']}. Ahora, ingresa tus apellidos:")
         return RegistrationStates.GET_LASTNAME
 
     async def handle_lastname_input(self, update: Update, context: CallbackContext):
@@ -139,22 +459,22 @@ class TelegramBot:
         result: ServiceResult[Student] = self.student_service.create_user(user_id, chat_id, first_name, last_name)
         if result.is_success:
             user = result.item
-            await update.message.reply_text(
-                f"¡Gracias, {user.first_name} {user.last_name}! 🎉 Ahora estás registrado. Escribe /help para ver qué puedes hacer.")
+            self._reply(
+                update, f"¡Gracias, {user.first_name} {user.last_name}! 🎉 Ahora estás registrado. Escribe /help para ver qué puedes hacer.")
             return ConversationHandler.END
         else:
             logger.error(f"Error creating user: {result.message}", exc_info=True)
-            await update.message.reply_text("Ocurrió un error al registrarte en el sistema :(.")
+            self._reply(update, "Ocurrió un error al registrarte en el sistema :(.")
             return ConversationHandler.END
 
     async def handle_cancel(self, update: Update, context: CallbackContext):
-        await update.message.reply_text("Proceso cancelado.")
+        self._reply(update, "Proceso cancelado.")
         return ConversationHandler.END
 
     async def handle_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Provide a list of available commands."""
-        await update.message.reply_text(
-            "Estos son los comandos que puedes usar:\n"
+        self._reply(
+            update, "Estos son los comandos que puedes usar:\n"
             "/start - Inicia la interacción con el bot\n"
             "/help - Obtén ayuda sobre cómo usar el bot\n"
             "/topics - Lista todos los temas\n"
@@ -172,22 +492,22 @@ class TelegramBot:
 
         if not result.is_success:
             logger.error(f"Error recommending exercise: {result.message}", exc_info=True)
-            await update.message.reply_text("Ocurrió un error al obtener la lista de temas :(.")
+            self._reply(update, "Ocurrió un error al obtener la lista de temas :(.")
             return
 
         topics: List[Topic] = result.item
         if not topics:
-            await update.message.reply_text("No hay temas disponibles en este momento.")
+            self._reply(update, "No hay temas disponibles en este momento.")
         else:
             topics_list = "\n".join([f"- {topic.name}" for topic in topics])
-            await update.message.reply_text(f"Estos son los temas disponibles:\n{topics_list}")
+            self._reply(update, f"Estos son los temas disponibles:\n{topics_list}")
 
     async def handle_topic_description(self, update: Update, context: CallbackContext):
         """Provide a description for a specific topic."""
         args: List[str] = context.args
 
         if not args:
-            await update.message.reply_text("Por favor, indica un tema para recomendar ejercicios.")
+            self._reply(update, "Por favor, indica un tema para recomendar ejercicios.")
             return
 
         topic_name = ' '.join(args)
@@ -196,12 +516,12 @@ class TelegramBot:
 
         if result.is_success:
             topic: Topic = result.item
-            await update.message.reply_text(topic.description)
+            self._reply(update, topic.description)
         elif result.status_code == HTTPStatus.NOT_FOUND:
-            await update.message.reply_text(f"El tema '{topic_name}' no existe. Por favor, elige otro.")
+            self._reply(update, f"El tema '{topic_name}' no existe. Por favor, elige otro.")
         else:
             logger.error(f"Error recommending exercise: {result.message}", exc_info=True)
-            await update.message.reply_text("Ocurrió un error al obtener la descripción del tema :(.")
+            self._reply(update, "Ocurrió un error al obtener la descripción del tema :(.")
 
     async def handle_exercise_request(self, update: Update, context: CallbackContext):
         """Recommend an exercise based on the given topic."""
@@ -209,7 +529,7 @@ class TelegramBot:
         args: List[str] = context.args
 
         if not args:
-            await update.message.reply_text("Por favor, indica un tema para recomendar ejercicios.")
+            self._reply(update, "Por favor, indica un tema para recomendar ejercicios.")
             return
 
         topic_name = ' '.join(args)
@@ -221,22 +541,22 @@ class TelegramBot:
             escaped_title = escape_markdown(exercise.title, version=2)
             formatted_exercise = format_solution(exercise.description)
 
-            await update.message.reply_text(
-                f"*{exercise.id}\. {escaped_title}*\n\n{formatted_exercise}",
+            self._reply(
+                update, f"*{exercise.id}\. {escaped_title}*\n\n{formatted_exercise}",
                 parse_mode=ParseMode.MARKDOWN_V2
             )
         elif result.status_code == HTTPStatus.NOT_FOUND or result.status_code == HTTPStatus.BAD_REQUEST:
-            await update.message.reply_text(result.message)
+            self._reply(update, result.message)
         else:
             logger.error(f"Error recommending exercise: {result.message}", exc_info=True)
-            await update.message.reply_text("Ocurrió un error mientras intentaba recomendarte un ejercicio :(.")
+            self._reply(update, "Ocurrió un error mientras intentaba recomendarte un ejercicio :(.")
 
     async def handle_hint_request(self, update: Update, context: CallbackContext):
         """Provide a hint for a given exercise."""
         args: List[str] = context.args
 
         if not args:
-            await update.message.reply_text("Por favor, indica el número del ejercicio para sugerir una pista.")
+            self._reply(update, "Por favor, indica el número del ejercicio para sugerir una pista.")
             return
 
         exercise_id = args[0]
@@ -246,19 +566,19 @@ class TelegramBot:
 
         if result.is_success:
             hint: ExerciseHint = result.item
-            await update.message.reply_text(hint.hint_text)
+            self._reply(update, hint.hint_text)
         elif result.status_code == HTTPStatus.NOT_FOUND or result.status_code == HTTPStatus.BAD_REQUEST:
-            await update.message.reply_text(result.message)
+            self._reply(update, result.message)
         else:
             logger.error(f"Error recommending hint: {result.message}", exc_info=True)
-            await update.message.reply_text("Ocurrió un error mientras intentaba sugerirte una pista :(.")
+            self._reply(update, "Ocurrió un error mientras intentaba sugerirte una pista :(.")
 
     async def handle_solution_request(self, update: Update, context: CallbackContext):
         """Provide the solution for a given exercise."""
         args = context.args
 
         if not args:
-            await update.message.reply_text("Por favor, indica el número del ejercicio para darte la solución.")
+            self._reply(update, "Por favor, indica el número del ejercicio para darte la solución.")
             return
 
         exercise_id = args[0]
@@ -268,24 +588,24 @@ class TelegramBot:
 
         if result.is_success:
             formatted_solution = format_solution(result.item)
-            await update.message.reply_text(formatted_solution, parse_mode=ParseMode.MARKDOWN_V2)
+            self._reply(update, formatted_solution, parse_mode=ParseMode.MARKDOWN_V2)
         elif result.status_code == HTTPStatus.NOT_FOUND or result.status_code == HTTPStatus.BAD_REQUEST:
-            await update.message.reply_text(result.message)
+            self._reply(update, result.message)
         else:
             logger.error(f"Error al obtener la solución: {result.message}", exc_info=True)
-            await update.message.reply_text("Ocurrió un error mientras intentaba darte la solución :(.")
+            self._reply(update, "Ocurrió un error mientras intentaba darte la solución :(.")
 
     async def start_submission(self, update: Update, context: CallbackContext):
         """Recibe el número del ejercicio desde el comando y solicita el código."""
         args = context.args
 
         if not args or not args[0].isdigit():
-            await update.message.reply_text("Por favor, proporciona el número del ejercicio. Ejemplo: /submit 1")
+            self._reply(update, "Por favor, proporciona el número del ejercicio. Ejemplo: /submit 1")
             return ConversationHandler.END
 
         exercise_id = args[0]
         context.user_data["exercise_id"] = int(exercise_id)
-        await update.message.reply_text(f"Ahora introduce el código para el ejercicio '{exercise_id}'.")
+        self._reply(update, f"Ahora introduce el código para el ejercicio '{exercise_id}'.")
         return SubmissionStates.AWAITING_CODE
 
     async def receive_code(self, update: Update, context: CallbackContext):
@@ -294,22 +614,77 @@ class TelegramBot:
         user_id = str(update.message.from_user.id)
         code = update.message.text
 
-        result = self.submission_service.submit_code(user_id, exercise_id, code)
+        result: ServiceResult[Attempt] = self.submission_service.submit_code(user_id, exercise_id, code)
 
         if result.is_success:
-            await update.message.reply_text(f"¡Intento guardado para el ejercicio '{exercise_id}'!")
+            attempt: Attempt = result.item
+            if attempt.verdict != 'Pending':
+                self._reply(
+                    update, format_evaluation_result(exercise_id, attempt.verdict, attempt.evaluation_output))
+            else:
+                self._reply(update, f"¡Intento guardado para el ejercicio '{exercise_id}'! "
+                                    f"Te avisaré cuando termine la evaluación.")
         elif result.status_code == HTTPStatus.NOT_FOUND or result.status_code == HTTPStatus.BAD_REQUEST:
-            await update.message.reply_text(result.message)
+            self._reply(update, result.message)
         else:
             logger.error(f"Error al guardar la solución: {result.message}", exc_info=True)
-            await update.message.reply_text("Ocurrió un error al guardar el intento :(.")
+            self._reply(update, "Ocurrió un error al guardar el intento :(.")
 
         return ConversationHandler.END
 
+    async def handle_stats(self, update: Update, context: CallbackContext):
+        """Report load metrics to the administrators."""
+        if not self._is_admin(update):
+            self._reply(update, "Este comando solo está disponible para administradores.")
+            return
+
+        metrics = self.ask_scheduler.metrics.snapshot()
+        rejections = ", ".join(f"{reason}: {count}" for reason, count in metrics["rejections"].items()) or "ninguno"
+        latencies = "\n".join(
+            f"- {stage} (n={stats['count']}): {stats['p50']:.0f} / {stats['p95']:.0f} / {stats['p99']:.0f} ms"
+            for stage, stats in sorted(get_tracer().stats.percentiles().items())
+        ) or "Sin datos todavía."
+        self._reply(
+            update,
+            "Cola de /ask:\n"
+            f"- En ejecución: {self.ask_scheduler.running}\n"
+            f"- En espera: {self.ask_scheduler.backlog}\n"
+            f"- Completadas: {metrics['completed']}\n"
+            f"- Fallidas: {metrics['failed']}\n"
+            f"- Espera p50/p95/p99: {metrics['wait_p50']:.2f}s / {metrics['wait_p95']:.2f}s / "
+            f"{metrics['wait_p99']:.2f}s\n"
+            f"- Rechazos: {rejections}\n\n"
+            f"Latencia por etapa (p50 / p95 / p99):\n{latencies}"
+        )
+
+    async def handle_broadcast(self, update: Update, context: CallbackContext):
+        """Queue a message for every registered student (administrators only)."""
+        if not self._is_admin(update):
+            self._reply(update, "Este comando solo está disponible para administradores.")
+            return
+
+        # Everything after the command, keeping the line breaks
+        parts = update.message.text.split(None, 1)
+        message = parts[1].strip() if len(parts) > 1 else ""
+        if not message:
+            self._reply(update, "Escribe el mensaje después del comando. Ejemplo: /broadcast Hay ejercicios nuevos.")
+            return
+
+        result: ServiceResult[Broadcast] = self.broadcast_service.create(message, str(update.effective_chat.id))
+        if result.is_success:
+            self._reply(update, f"Difusión #{result.item.id} programada. Te avisaré cuando termine.")
+        else:
+            logger.error(f"Error creating broadcast: {result.message}", exc_info=True)
+            self._reply(update, "Ocurrió un error al programar la difusión :(.")
+
+    @staticmethod
+    def _is_admin(update: Update) -> bool:
+        admin_ids = {user_id.strip() for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+        return str(update.effective_user.id) in admin_ids
+
     async def handle_unknown_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle unknown commands by informing the user."""
-        await context.bot.send_message(chat_id=update.effective_chat.id,
-                                       text="Lo siento, no entiendo ese comando. 😕. Escribe /help para ver qué puedes hacer.")
+        self._reply(update, "Lo siento, no entiendo ese comando. 😕. Escribe /help para ver qué puedes hacer.")
 
     @staticmethod
     async def _handle_service_result(result: ServiceResult, success_callback, update, error_callback=None,
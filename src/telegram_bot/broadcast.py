@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import os
+
+from database.database import SessionLocal
+from database.models import Broadcast
+from metrics import get_registry
+from services import BroadcastService
+from telegram_bot.outbound import OutboundSender
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_MESSAGES = get_registry().counter("broadcast_messages_total", "Broadcast messages, by result", ("result",))
+
+
+class BroadcastEngine:
+    def __init__(self, outbound: OutboundSender, batch_size: int | None = None, max_pending: int | None = None):
+        """
+        Sends a broadcast to every student. Students are read in id-ordered batches, so the whole table is never
+        loaded, and the checkpoint is saved after each batch: a broadcast interrupted by a restart resumes from
+        the last finished batch (students of the unfinished one may get the message twice).
+
+        Args:
+            outbound (OutboundSender): Sender the messages go through, within Telegram's limits.
+            batch_size (int): Students read and checkpointed at a time (default BROADCAST_BATCH_SIZE or 500).
+            max_pending (int): Broadcast messages waiting in the sender at once, so replies to students are not
+                queued behind a whole class (default BROADCAST_MAX_PENDING or 10).
+        """
+        self.outbound = outbound
+        self.batch_size = batch_size or int(os.getenv("BROADCAST_BATCH_SIZE", "500"))
+        self.max_pending = max_pending or int(os.getenv("BROADCAST_MAX_PENDING", "10"))
+        self._sent = BROADCAST_MESSAGES.labels("sent")
+        self._failed = BROADCAST_MESSAGES.labels("failed")
+
+    async def run(self, broadcast: Broadcast) -> Broadcast:
+        """Send a claimed broadcast from its checkpoint to the last student and return it finished."""
+        broadcast_id, message, last_user_id = broadcast.id, broadcast.message, broadcast.last_user_id
+        while True:
+            recipients = await asyncio.to_thread(self._get_recipients, last_user_id, self.batch_size)
+            if not recipients:
+                break
+            sent, failed = await self._send_batch(message, [chat_id for _, chat_id in recipients])
+            last_user_id = recipients[-1][0]
+            await asyncio.to_thread(self._save_progress, broadcast_id, last_user_id, sent, failed)
+            logger.info(f"Broadcast {broadcast_id}: sent up to student {last_user_id} ({sent} sent, {failed} failed)")
+        return await asyncio.to_thread(self._finish, broadcast_id)
+
+    async def _send_batch(self, message: str, chat_ids: list[str]) -> tuple[int, int]:
+        slots = asyncio.Semaphore(self.max_pending)
+        futures = []
+        for chat_id in chat_ids:
+            await slots.acquire()
+            future = self.outbound.send(chat_id, message)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        await asyncio.wait(futures)
+        failed = sum(future.exception() is not None for future in futures)
+        self._sent.inc(len(futures) - failed)
+        self._failed.inc(failed)
+        return len(futures) - failed, failed
+
+    @staticmethod
+    def _get_recipients(after_user_id: int, limit: int) -> list[tuple[int, str]]:
+        with SessionLocal() as session:
+            return BroadcastService(session).get_recipients(after_user_id, limit)
+
+    @staticmethod
+    def _save_progress(broadcast_id: int, last_user_id: int, sent: int, failed: int):
+        with SessionLocal() as session:
+            BroadcastService(session).save_progress(broadcast_id, last_user_id, sent, failed)
+
+    @staticmethod
+    def _finish(broadcast_id: int) -> Broadcast:
+        with SessionLocal(expire_on_commit=False) as session:
+            return BroadcastService(session).finish(broadcast_id)
@@ -0,0 +1,106 @@
+import asyncio
+import itertools
+import json
+import time
+from typing import Any
+
+import httpx
+from telegram.request import BaseRequest, RequestData
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class FakeBotApiRequest(BaseRequest):
+    """
+    Offline stand-in for the Telegram Bot API. Every call succeeds and outgoing messages are recorded,
+    so a TelegramBot can run in tests and benchmarks without a network connection.
+    """
+    BOT_USER = {"id": 1, "is_bot": True, "first_name": "Tutor", "username": "programming_tutor_bot"}
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency (float): Seconds every API call takes, to simulate the round trip to Telegram.
+        """
+        self.latency = latency
+        self.sent_messages: list[dict[str, Any]] = []
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self) -> float | None:
+        # Calls never wait on a network
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: RequestData | None = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> tuple[int, bytes]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        api_method = url.rsplit("/", 1)[-1]
+        parameters = request_data.parameters if request_data else {}
+        self.calls.append((api_method, parameters))
+        return 200, json.dumps({"ok": True, "result": self._result(api_method, parameters)}).encode("utf-8")
+
+    def _result(self, api_method: str, parameters: dict[str, Any]):
+        if api_method == "getMe":
+            return self.BOT_USER
+        if api_method in ("sendMessage", "editMessageText"):
+            self.sent_messages.append(parameters)
+            return {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(parameters["chat_id"]), "type": "private"},
+                "from": self.BOT_USER,
+                "text": parameters.get("text", ""),
+            }
+        if api_method == "getUpdates":
+            return []
+        return True
+
+
+def make_message_update(update_id: int, user_id: int, text: str, first_name: str = "Estudiante") -> dict[str, Any]:
+    """Build the JSON Telegram sends for a private text message, recognising a leading /command."""
+    message: dict[str, Any] = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private", "first_name": first_name},
+        "from": {"id": user_id, "is_bot": False, "first_name": first_name},
+        "text": text,
+    }
+    if text.startswith("/"):
+        command_length = len(text.split(maxsplit=1)[0])
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": command_length}]
+    return {"update_id": update_id, "message": message}
+
+
+class FakeUpdatePoster:
+    def __init__(self, url: str, secret_token: str | None = None, verify: bool | str = False):
+        """
+        Posts synthetic updates to a webhook the way Telegram does.
+
+        Args:
+            url (str): Full webhook URL.
+            secret_token (str): Secret sent in the X-Telegram-Bot-Api-Secret-Token header.
+            verify (bool | str): TLS verification; a path to the self-signed certificate also works.
+        """
+        self.url = url
+        self.secret_token = secret_token
+        self.client = httpx.AsyncClient(verify=verify)
+        self._update_ids = itertools.count(1)
+
+    async def post(self, update: dict[str, Any]) -> httpx.Response:
+        headers = {SECRET_TOKEN_HEADER: self.secret_token} if self.secret_token else {}
+        return await self.client.post(self.url, json=update, headers=headers)
+
+    async def send_text(self, user_id: int, text: str) -> httpx.Response:
+        return await self.post(make_message_update(next(self._update_ids), user_id, text))
+
+    async def close(self):
+        await self.client.aclose()
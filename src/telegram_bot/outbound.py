@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Hashable
+
+from telegram import Bot
+from telegram.constants import MessageLimit
+from telegram.error import BadRequest, RetryAfter
+
+from metrics import get_registry
+from telegram_bot.scheduler import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_MESSAGES = get_registry().counter("outbound_messages_total", "Messages handed to the outbound sender, by result",
+                                           ("result",))
+OUTBOUND_REQUESTS = get_registry().counter("outbound_requests_total", "sendMessage calls made by the outbound sender")
+OUTBOUND_RETRIES = get_registry().counter("outbound_retries_total", "Sends retried after a flood control error")
+OUTBOUND_WAIT = get_registry().histogram("outbound_queue_wait_seconds", "Time messages wait before being sent")
+
+
+class _OutboundMessage:
+    __slots__ = ("text", "parse_mode", "future", "enqueued_at", "tries", "mergeable")
+
+    def __init__(self, text: str, parse_mode: str | None):
+        self.text = text
+        self.parse_mode = parse_mode
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.tries = 0
+        self.mergeable = True
+
+
+class OutboundSender:
+    MERGE_SEPARATOR = "\n\n"
+
+    def __init__(self, bot: Bot, chat_rate: float | None = None, chat_burst: float | None = None,
+                 global_rate: float | None = None, max_in_flight: int | None = None, max_retries: int = 5,
+                 merge_limit: int = MessageLimit.MAX_TEXT_LENGTH):
+        """
+        Queue for the messages the bot sends, so handlers do not wait for Telegram and bursts (notifications,
+        broadcasts) stay within its flood limits. Messages to a chat are sent in order, one request at a time;
+        chats are served round-robin. Messages that queue up behind a chat's limit are merged into one. When
+        Telegram cannot parse the formatting of a merged message its parts are sent one by one, and a single
+        message it cannot parse is sent as plain text.
+
+        Args:
+            bot (Bot): Bot the messages are sent with.
+            chat_rate (float): Messages per second to a single chat (default OUTBOUND_CHAT_RATE or 1).
+            chat_burst (float): Messages a chat can get in a burst (default OUTBOUND_CHAT_BURST or 3).
+            global_rate (float): Messages per second to all chats (default OUTBOUND_GLOBAL_RATE or 25).
+            max_in_flight (int): Requests to Telegram at the same time (default OUTBOUND_MAX_IN_FLIGHT or 16).
+            max_retries (int): Flood control errors a message survives before its send fails.
+            merge_limit (int): Longest text merged messages can add up to.
+        """
+        self.bot = bot
+        self.chat_rate = chat_rate or float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+        self.chat_burst = chat_burst or float(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+        global_rate = global_rate or float(os.getenv("OUTBOUND_GLOBAL_RATE", "25"))
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.max_in_flight = max_in_flight or int(os.getenv("OUTBOUND_MAX_IN_FLIGHT", "16"))
+        self.max_retries = max_retries
+        self.merge_limit = merge_limit
+        get_registry().gauge("outbound_backlog", "Messages waiting in the outbound queue", function=lambda: self.backlog)
+
+        # Chats with waiting messages, in round-robin order
+        self._queues: OrderedDict[Hashable, deque[_OutboundMessage]] = OrderedDict()
+        self._buckets: dict[Hashable, TokenBucket] = {}
+        self._paused_until: dict[Hashable, float] = {}
+        self._in_flight: dict[Hashable, list[_OutboundMessage]] = {}
+        self._deliveries: set[asyncio.Task] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def backlog(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def send(self, chat_id: int | str, text: str, parse_mode: str | None = None) -> asyncio.Future:
+        """
+        Queue a message and return right away.
+
+        Returns:
+            asyncio.Future: Resolves to the sent Message, or to the error if it could not be sent. It does not need
+                to be awaited; failures are logged.
+        """
+        if self._task is None or self._task.done():
+            self.start()
+        message = _OutboundMessage(text, parse_mode)
+        self._queues.setdefault(int(chat_id), deque()).append(message)
+        self._wakeup.set()
+        return message.future
+
+    async def flush(self, chat_id: int | str | None = None):
+        """Wait until the messages queued so far (to `chat_id`, or to every chat) are sent or have failed."""
+        chats = list(self._queues.keys() | self._in_flight.keys()) if chat_id is None else [int(chat_id)]
+        futures = [message.future for chat in chats
+                   for message in (*self._in_flight.get(chat, ()), *self._queues.get(chat, ()))]
+        if futures:
+            await asyncio.wait(futures)
+
+    async def stop(self, timeout: float = 10.0):
+        """Send what is queued, for up to `timeout` seconds, and stop the dispatcher."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.backlog} outbound messages were not sent before shutdown")
+        self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._dispatch()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self) -> float | None:
+        """Start every send allowed right now. Returns how long until another one may be, if known."""
+        now = time.monotonic()
+        next_delay = None
+        for chat_id in list(self._queues):
+            if len(self._deliveries) >= self.max_in_flight:
+                # A finishing delivery wakes the dispatcher up
+                return next_delay
+            if chat_id in self._in_flight:
+                continue
+            bucket = self._buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            wait = max(self._paused_until.get(chat_id, 0.0) - now, bucket.time_until_available())
+            if wait > 0:
+                next_delay = wait if next_delay is None else min(next_delay, wait)
+                continue
+            global_wait = self.global_bucket.time_until_available()
+            if global_wait > 0:
+                return global_wait if next_delay is None else min(next_delay, global_wait)
+
+            bucket.try_acquire()
+            self.global_bucket.try_acquire()
+            messages = self._take_batch(self._queues[chat_id])
+            if self._queues[chat_id]:
+                self._queues.move_to_end(chat_id)
+            else:
+                del self._queues[chat_id]
+            self._in_flight[chat_id] = messages
+            delivery = asyncio.create_task(self._deliver(chat_id, messages))
+            self._deliveries.add(delivery)
+            delivery.add_done_callback(self._deliveries.discard)
+        self._forget_idle_chats(now)
+        return next_delay
+
+    def _take_batch(self, queue: deque[_OutboundMessage]) -> list[_OutboundMessage]:
+        """The next message, merged with the ones queued behind it while they fit in a single message."""
+        messages = [queue.popleft()]
+        length = len(messages[0].text)
+        while messages[0].mergeable and queue and queue[0].mergeable and \
+                queue[0].parse_mode == messages[0].parse_mode and \
+                length + len(self.MERGE_SEPARATOR) + len(queue[0].text) <= self.merge_limit:
+            length += len(self.MERGE_SEPARATOR) + len(queue[0].text)
+            messages.append(queue.popleft())
+        return messages
+
+    async def _deliver(self, chat_id: int, messages: list[_OutboundMessage]):
+        try:
+            OUTBOUND_REQUESTS.inc()
+            sent = await self.bot.send_message(chat_id=chat_id,
+                                               text=self.MERGE_SEPARATOR.join(message.text for message in messages),
+                                               parse_mode=messages[0].parse_mode)
+        except RetryAfter as e:
+            OUTBOUND_RETRIES.inc()
+            self._paused_until[chat_id] = time.monotonic() + float(e.retry_after)
+            retried = [message for message in messages if message.tries < self.max_retries]
+            for message in retried:
+                message.tries += 1
+            self._fail([message for message in messages if message not in retried], e, chat_id)
+            if retried:
+                queue = self._queues.setdefault(chat_id, deque())
+                queue.extendleft(reversed(retried))
+        except BadRequest as e:
+            if messages[0].parse_mode is None or "parse" not in str(e).lower():
+                self._fail(messages, e, chat_id)
+                return
+            # One bad answer must not sink the messages merged with it, nor reach the student as nothing at all
+            if len(messages) > 1:
+                for message in messages:
+                    message.mergeable = False
+            else:
+                logger.warning(f"Sending a message to chat {chat_id} as plain text: {e}")
+                messages[0].parse_mode = None
+            self._queues.setdefault(chat_id, deque()).extendleft(reversed(messages))
+        except Exception as e:
+            self._fail(messages, e, chat_id)
+        else:
+            now = time.monotonic()
+            for message in messages:
+                OUTBOUND_WAIT.observe(now - message.enqueued_at)
+                if not message.future.done():
+                    message.future.set_result(sent)
+            OUTBOUND_MESSAGES.labels("sent").inc(len(messages))
+        finally:
+            del self._in_flight[chat_id]
+            self._wakeup.set()
+
+    @staticmethod
+    def _fail(messages: list[_OutboundMessage], error: Exception, chat_id: int):
+        if not messages:
+            return
+        logger.error(f"Could not send {len(messages)} messages to chat {chat_id}: {error}")
+        OUTBOUND_MESSAGES.labels("failed").inc(len(messages))
+        for message in messages:
+            if not message.future.done():
+                message.future.set_exception(error)
+                # Already logged: do not warn again if nobody awaits the future
+                message.future.exception()
+
+    def _forget_idle_chats(self, now: float, max_chats: int = 10000):
+        """Drop the limiter state of chats whose bucket has refilled, once too many chats are tracked."""
+        if len(self._buckets) <= max_chats:
+            return
+        for chat_id in list(self._buckets):
+            if chat_id not in self._queues and chat_id not in self._in_flight and \
+                    self._buckets[chat_id].time_until_available(self.chat_burst) == 0 and \
+                    self._paused_until.get(chat_id, 0.0) <= now:
+                del self._buckets[chat_id]
+                self._paused_until.pop(chat_id, None)
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+import pickle
+from typing import Any
+
+from telegram.ext import BasePersistence, PersistenceInput
+from telegram.ext._utils.types import ConversationDict, ConversationKey, CDCData
+
+from storage.kv_store import KeyValueStore
+
+logger = logging.getLogger(__name__)
+
+
+class StorePersistence(BasePersistence):
+    USER_DATA_PREFIX = "user_data:"
+    CONVERSATION_PREFIX = "conversation:"
+
+    def __init__(self, store: KeyValueStore, update_interval: float = 5, write_delay: float = 0.2):
+        """
+        Persists conversation states and user_data in a KeyValueStore, so they survive restarts and
+        can be shared by several bot processes (each user is routed to one process, see telegram_bot.webhook).
+
+        Writes are buffered and sent to the store in one batch shortly after they happen, so handlers never
+        wait on the store.
+
+        Args:
+            store (KeyValueStore): Backing store.
+            update_interval (float): Seconds between the application's persistence updates.
+            write_delay (float): Seconds to accumulate writes before flushing them as a batch.
+        """
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.store = store
+        self.write_delay = write_delay
+        self._pending: dict[str, bytes | None] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    def _write(self, key: str, value: Any | None):
+        # Serialize now: the application keeps mutating the same dicts
+        self._pending[key] = pickle.dumps(value) if value is not None else None
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.write_delay)
+        await self._write_pending()
+
+    async def _write_pending(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            await self.store.set_many(batch)
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} persistence entries: {e}", exc_info=True)
+            # Keep them for the next flush, unless they were overwritten in the meantime
+            self._pending = {**batch, **self._pending}
+
+    @classmethod
+    def _conversation_key(cls, name: str, key: ConversationKey) -> str:
+        return f"{cls.CONVERSATION_PREFIX}{name}:{json.dumps(list(key))}"
+
+    async def get_user_data(self) -> dict[int, dict[Any, Any]]:
+        entries = await self.store.get_prefix(self.USER_DATA_PREFIX)
+        return {int(key[len(self.USER_DATA_PREFIX):]): pickle.loads(value) for key, value in entries.items()}
+
+    async def get_chat_data(self) -> dict[int, dict[Any, Any]]:
+        return {}
+
+    async def get_bot_data(self) -> dict[Any, Any]:
+        return {}
+
+    async def get_callback_data(self) -> CDCData | None:
+        return None
+
+    async def get_conversations(self, name: str) -> ConversationDict:
+        prefix = f"{self.CONVERSATION_PREFIX}{name}:"
+        entries = await self.store.get_prefix(prefix)
+        return {tuple(json.loads(key[len(prefix):])): pickle.loads(value) for key, value in entries.items()}
+
+    async def update_conversation(self, name: str, key: ConversationKey, new_state: object | None) -> None:
+        self._write(self._conversation_key(name, key), new_state)
+
+    async def update_user_data(self, user_id: int, data: dict[Any, Any]) -> None:
+        self._write(f"{self.USER_DATA_PREFIX}{user_id}", data)
+
+    async def update_chat_data(self, chat_id: int, data: dict[Any, Any]) -> None:
+        pass
+
+    async def update_bot_data(self, data: dict[Any, Any]) -> None:
+        pass
+
+    async def update_callback_data(self, data: CDCData) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._write(f"{self.USER_DATA_PREFIX}{user_id}", None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict[Any, Any]) -> None:
+        pass
+
+    async def flush(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self._write_pending()
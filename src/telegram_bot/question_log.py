@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from database.database import SessionLocal
+from metrics import get_registry
+from services.question_service import QuestionService
+
+logger = logging.getLogger(__name__)
+
+QUESTION_LOG_RECORDS = get_registry().counter("question_log_records_total",
+                                              "Questions handed to the question log, by result", ("result",))
+QUESTION_LOG_FLUSH = get_registry().histogram("question_log_flush_seconds", "Time to insert a batch of questions")
+
+
+@dataclass
+class QuestionRecord:
+    user_id: str
+    question: str
+    answered_by: str
+    latency: float
+    topic_id: int | None = None
+    standalone_question: str | None = None
+    clean_query: str | None = None
+    intent: str | None = None
+    chunk_ids: list[str] | None = None
+    answer: str | None = None
+    asked_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def to_row(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "topic_id": self.topic_id,
+            "question": self.question,
+            "standalone_question": self.standalone_question,
+            "clean_query": self.clean_query,
+            "intent": self.intent,
+            "answered_by": self.answered_by,
+            "chunk_ids": json.dumps(self.chunk_ids) if self.chunk_ids is not None else None,
+            "answer": self.answer,
+            "latency_ms": round(self.latency * 1000),
+            "asked_at": self.asked_at,
+        }
+
+
+class QuestionLog:
+    def __init__(self, batch_size: int | None = None, flush_interval: float | None = None,
+                 max_buffer: int | None = None):
+        """
+        Write-behind log of the /ask questions: handlers add records to an in-memory buffer and return, and a
+        background task inserts them into `questions` in bulk, once `batch_size` are waiting or every
+        `flush_interval` seconds. Inserts run in a thread, out of the event loop. If the database falls behind,
+        the oldest records beyond `max_buffer` are dropped rather than slowing the handlers down; a failed batch
+        is retried with the next one.
+
+        Args:
+            batch_size (int): Records per insert (default QUESTION_LOG_BATCH_SIZE or 200).
+            flush_interval (float): Longest time a record waits in the buffer (default
+                QUESTION_LOG_FLUSH_INTERVAL or 5).
+            max_buffer (int): Records kept while they cannot be written (default QUESTION_LOG_MAX_BUFFER or 10000).
+        """
+        self.batch_size = batch_size or int(os.getenv("QUESTION_LOG_BATCH_SIZE", "200"))
+        self.flush_interval = flush_interval or float(os.getenv("QUESTION_LOG_FLUSH_INTERVAL", "5"))
+        self.max_buffer = max_buffer or int(os.getenv("QUESTION_LOG_MAX_BUFFER", "10000"))
+        get_registry().gauge("question_log_backlog", "Questions waiting to be written", function=lambda: self.backlog)
+
+        self._buffer: deque[QuestionRecord] = deque()
+        self._wakeup: asyncio.Event | None = None
+        self._stop_requested: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._written = QUESTION_LOG_RECORDS.labels("written")
+        self._dropped = QUESTION_LOG_RECORDS.labels("dropped")
+
+    @property
+    def backlog(self) -> int:
+        return len(self._buffer)
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._stop_requested = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def log(self, record: QuestionRecord):
+        """Queue a record and return right away."""
+        if self._task is None or self._task.done():
+            self.start()
+        self._buffer.append(record)
+        if len(self._buffer) > self.max_buffer:
+            self._buffer.popleft()
+            self._dropped.inc()
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def stop(self, timeout: float = 10.0):
+        """Write what is buffered, for up to `timeout` seconds, and stop the writer."""
+        if self._task is None:
+            return
+        self._stop_requested.set()
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.backlog} logged questions were not written before shutdown")
+            self._dropped.inc(self.backlog)
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        retrying = False
+        while True:
+            if (retrying or len(self._buffer) < self.batch_size) and not self._stop_requested.is_set():
+                # After a failed insert only the timeout or shutdown end the pause, so an outage is not hammered
+                self._wakeup.clear()
+                event = self._stop_requested if retrying else self._wakeup
+                try:
+                    await asyncio.wait_for(event.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            stopping = self._stop_requested.is_set()
+            if not self._buffer:
+                if stopping:
+                    return
+                retrying = False
+                continue
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            retrying = not await self._write(batch)
+            if retrying and stopping:
+                self._dropped.inc(len(batch) + len(self._buffer))
+                self._buffer.clear()
+                return
+            if retrying:
+                # Back at the front, within the buffer limit
+                room = max(0, self.max_buffer - len(self._buffer))
+                kept = batch[len(batch) - room:] if room < len(batch) else batch
+                self._buffer.extendleft(reversed(kept))
+                self._dropped.inc(len(batch) - len(kept))
+
+    async def _write(self, batch: list[QuestionRecord]) -> bool:
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._insert, [record.to_row() for record in batch])
+        except Exception as e:
+            logger.warning(f"Could not write {len(batch)} logged questions: {e}")
+            return False
+        QUESTION_LOG_FLUSH.observe(time.perf_counter() - start)
+        self._written.inc(len(batch))
+        return True
+
+    @staticmethod
+    def _insert(rows: list[dict]):
+        with SessionLocal() as session:
+            QuestionService(session).save_questions(rows)
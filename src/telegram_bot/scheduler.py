@@ -0,0 +1,239 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque, Counter
+from typing import Any, Awaitable, Callable, Hashable
+
+from metrics import get_registry
+
+ASK_WAIT = get_registry().histogram("ask_queue_wait_seconds", "Time /ask questions wait for a free slot")
+ASK_COMPLETED = get_registry().counter("ask_completed_total", "/ask questions answered")
+ASK_FAILED = get_registry().counter("ask_failed_total", "/ask questions whose answer raised an error")
+ASK_REJECTED = get_registry().counter("ask_rejected_total", "/ask questions rejected, by reason", ("reason",))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum tokens, i.e. the allowed burst.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        self._refill()
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    def time_until_available(self, tokens: float = 1) -> float:
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+
+class SchedulerRejected(Exception):
+    def __init__(self, reason: str, retry_after: float | None = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class SchedulerMetrics:
+    def __init__(self, samples: int = 1000):
+        self.wait_times: deque[float] = deque(maxlen=samples)
+        self.rejections: Counter[str] = Counter()
+        self.completed = 0
+        self.failed = 0
+
+    def record_wait(self, seconds: float):
+        self.wait_times.append(seconds)
+        ASK_WAIT.observe(seconds)
+
+    def record_rejection(self, reason: str):
+        self.rejections[reason] += 1
+        ASK_REJECTED.labels(reason).inc()
+
+    def record_completed(self):
+        self.completed += 1
+        ASK_COMPLETED.inc()
+
+    def record_failed(self):
+        self.failed += 1
+        ASK_FAILED.inc()
+
+    @staticmethod
+    def percentile(values, fraction: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejections": dict(self.rejections),
+            "wait_p50": self.percentile(self.wait_times, 0.50),
+            "wait_p95": self.percentile(self.wait_times, 0.95),
+            "wait_p99": self.percentile(self.wait_times, 0.99),
+        }
+
+
+class _Job:
+    __slots__ = ("function", "future", "enqueued_at")
+
+    def __init__(self, function: Callable[[], Awaitable[Any]]):
+        self.function = function
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+
+class FairScheduler:
+    def __init__(self, max_concurrency: int | None = None, max_backlog: int | None = None,
+                 user_rate: float | None = None, user_burst: float | None = None, max_pending_per_user: int = 3):
+        """
+        Admission control for expensive calls. Each user has a token bucket, at most `max_concurrency`
+        calls run at once, and waiting calls are served round-robin across users so that one user
+        cannot starve the rest of the class.
+
+        Args:
+            max_concurrency (int): Calls running at the same time (default ASK_MAX_CONCURRENCY or 4).
+            max_backlog (int): Calls allowed to wait; beyond it new calls are rejected (default ASK_MAX_BACKLOG or 100).
+            user_rate (float): Calls per second a user earns (default ASK_USER_RATE_PER_MINUTE / 60, 5 per minute).
+            user_burst (float): Calls a user can make in a burst (default ASK_USER_BURST or 3).
+            max_pending_per_user (int): Calls a single user can have waiting at once.
+        """
+        self.max_concurrency = max_concurrency or int(os.getenv("ASK_MAX_CONCURRENCY", "4"))
+        self.max_backlog = max_backlog or int(os.getenv("ASK_MAX_BACKLOG", "100"))
+        self.user_rate = user_rate or float(os.getenv("ASK_USER_RATE_PER_MINUTE", "5")) / 60
+        self.user_burst = user_burst or float(os.getenv("ASK_USER_BURST", "3"))
+        self.max_pending_per_user = max_pending_per_user
+        self.metrics = SchedulerMetrics()
+        get_registry().gauge("ask_running", "/ask questions being answered", function=lambda: self.running)
+        get_registry().gauge("ask_backlog", "/ask questions waiting for a slot", function=lambda: self.backlog)
+
+        self._buckets: dict[Hashable, TokenBucket] = {}
+        # Users with waiting jobs, in round-robin order
+        self._queues: OrderedDict[Hashable, deque[_Job]] = OrderedDict()
+        self._backlog = 0
+        self._running = 0
+
+    @property
+    def backlog(self) -> int:
+        return self._backlog
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    async def submit(self, user_id: Hashable, function: Callable[[], Awaitable[Any]],
+                     on_queued: Callable[[int], Awaitable[None]] | None = None) -> Any:
+        """
+        Run `function` when its turn comes and return its result.
+
+        Args:
+            user_id: The user the call is made for.
+            function: Coroutine function performing the call.
+            on_queued: Awaited with the 1-based queue position when the call has to wait.
+
+        Raises:
+            SchedulerRejected: The user is over its rate, has too many waiting calls, or the backlog is full.
+        """
+        bucket = self._buckets.setdefault(user_id, TokenBucket(self.user_rate, self.user_burst))
+        if len(self._queues.get(user_id, ())) >= self.max_pending_per_user:
+            self._reject("too_many_pending")
+        if self._backlog >= self.max_backlog:
+            self._reject("backlog_full")
+        if not bucket.try_acquire():
+            self._reject("rate_limited", bucket.time_until_available())
+
+        job = _Job(function)
+        self._queues.setdefault(user_id, deque()).append(job)
+        self._backlog += 1
+        self._dispatch()
+
+        if on_queued is not None and not job.future.done() and self._is_waiting(user_id, job):
+            await on_queued(self.position(user_id, job))
+
+        try:
+            return await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            if self._remove_waiting(user_id, job):
+                job.future.cancel()
+            raise
+
+    def _reject(self, reason: str, retry_after: float | None = None):
+        self.metrics.record_rejection(reason)
+        raise SchedulerRejected(reason, retry_after)
+
+    def _is_waiting(self, user_id: Hashable, job: _Job) -> bool:
+        return job in self._queues.get(user_id, ())
+
+    def _remove_waiting(self, user_id: Hashable, job: _Job) -> bool:
+        queue = self._queues.get(user_id)
+        if queue is None or job not in queue:
+            return False
+        queue.remove(job)
+        self._backlog -= 1
+        if not queue:
+            del self._queues[user_id]
+        return True
+
+    def position(self, user_id: Hashable, job: _Job) -> int:
+        """1-based position of a waiting job in round-robin order."""
+        queues = [list(queue) for queue in self._queues.values()]
+        users = list(self._queues)
+        position = 0
+        for round_index in range(max(len(queue) for queue in queues)):
+            for queue_user, queue in zip(users, queues):
+                if round_index < len(queue):
+                    position += 1
+                    if queue_user == user_id and queue[round_index] is job:
+                        return position
+        return position
+
+    def _dispatch(self):
+        while self._running < self.max_concurrency and self._queues:
+            user_id, queue = self._queues.popitem(last=False)
+            job = queue.popleft()
+            if queue:
+                # The user goes to the back of the rotation
+                self._queues[user_id] = queue
+            self._backlog -= 1
+            self._running += 1
+            asyncio.create_task(self._run(job))
+        self._forget_idle_users()
+
+    def _forget_idle_users(self, max_users: int = 10000):
+        """Drop the buckets of users without waiting calls whose bucket has refilled, once too many are tracked."""
+        if len(self._buckets) <= max_users:
+            return
+        for user_id in list(self._buckets):
+            if user_id not in self._queues and \
+                    self._buckets[user_id].time_until_available(self.user_burst) == 0:
+                del self._buckets[user_id]
+
+    async def _run(self, job: _Job):
+        self.metrics.record_wait(time.monotonic() - job.enqueued_at)
+        try:
+            result = await job.function()
+            if not job.future.done():
+                job.future.set_result(result)
+            self.metrics.record_completed()
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            self.metrics.record_failed()
+        finally:
+            self._running -= 1
+            self._dispatch()
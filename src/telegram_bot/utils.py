@@ -1,20 +1,72 @@
+import asyncio
+import functools
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
 from typing import Callable
 
 from telegram.helpers import escape_markdown
 
 from database.database import SessionLocal
+from metrics import get_registry
+from tracing import get_tracer
+from tracing.profiler import get_profiler
+
+UPDATES = get_registry().counter("bot_updates_total", "Updates handled, by handler", ("handler", "status"))
+HANDLER_LATENCY = get_registry().histogram(
+    "bot_handler_latency_seconds", "Time spent in each update handler", ("handler",))
+
+
+# Services of the call being handled. Every update is processed in its own task, with its own copy of the
+# context, so concurrent updates never see each other's services or session
+_current_services: ContextVar[dict | None] = ContextVar("current_services", default=None)
+
+
+class UpdateService:
+    """Class attribute resolving to the service of that name created by `inject_services` for the current call."""
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        services = _current_services.get()
+        if services is None:
+            raise RuntimeError(f"{self.name} is only available inside a method wrapped by inject_services")
+        return services[self.name]
 
 
 def inject_services(cls):
-    """ Class decorator that initializes services before executing any method """
+    """
+    Class decorator that gives every public method call its own session and services: `_create_services(session)`
+    returns them by name and `UpdateService` attributes read them for the current call only.
+    """
 
     def ensure_services_before_call(method: Callable):
-        """ Wrapper to initialize services before each method call """
+        """ Wrapper to create the services before each method call """
+
+        if asyncio.iscoroutinefunction(method):
+            # Keep the session open until the handler finishes, instead of only while the coroutine is created
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                with SessionLocal() as session:
+                    token = _current_services.set(self._create_services(session))
+                    try:
+                        return await method(self, *args, **kwargs)
+                    finally:
+                        _current_services.reset(token)
+
+            return async_wrapper
 
+        @functools.wraps(method)
         def wrapper(self, *args, **kwargs):
             with SessionLocal() as session:
-                self._initialize_services(session)  # Initialize services on each method call
-                return method(self, *args, **kwargs)
+                token = _current_services.set(self._create_services(session))
+                try:
+                    return method(self, *args, **kwargs)
+                finally:
+                    _current_services.reset(token)
 
         return wrapper
 
@@ -26,6 +78,42 @@ def inject_services(cls):
     return cls
 
 
+def trace_handlers(cls):
+    """
+    Class decorator that opens a root span per update around every public async method and counts and times
+    the update in the handler metrics. Handlers selected in PROFILE_HANDLERS are also sampled by the profiler.
+    """
+
+    def trace_handler(name: str, method: Callable):
+        succeeded, failed = UPDATES.labels(name, "ok"), UPDATES.labels(name, "error")
+        latency = HANDLER_LATENCY.labels(name)
+
+        @functools.wraps(method)
+        async def wrapper(self, update, *args, **kwargs):
+            user = getattr(update, "effective_user", None)
+            start = time.perf_counter()
+            try:
+                profiler = get_profiler()
+                with get_tracer().start_span(f"update.{name}", user_id=user.id if user else None), \
+                        profiler.profile(name) if profiler and profiler.wants(name) else nullcontext():
+                    result = await method(self, update, *args, **kwargs)
+            except Exception:
+                failed.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - start)
+            succeeded.inc()
+            return result
+
+        return wrapper
+
+    for attr_name, attr_value in list(cls.__dict__.items()):
+        if asyncio.iscoroutinefunction(attr_value) and not attr_name.startswith("_"):
+            setattr(cls, attr_name, trace_handler(attr_name, attr_value))
+
+    return cls
+
+
 def format_solution(solution: str) -> str:
     parts = solution.split("```")
     formatted_parts = []
@@ -39,3 +127,20 @@ def format_solution(solution: str) -> str:
             formatted_parts.append(f"```{part}```")
 
     return "".join(formatted_parts)
+
+
+VERDICT_MESSAGES = {
+    'Accepted': "✅ ¡Tu solución es correcta!",
+    'Wrong Answer': "❌ Tu solución no produce la salida esperada.",
+    'Compilation Error': "⚠️ Tu código no compila.",
+    'Runtime Error': "💥 Tu programa terminó con un error durante la ejecución.",
+    'Time Limit Exceeded': "⏱️ Tu programa tardó demasiado en terminar.",
+    'Internal Error': "Ocurrió un error al evaluar tu intento :(. Inténtalo de nuevo más tarde.",
+}
+
+
+def format_evaluation_result(exercise_id: int, verdict: str, output: str | None) -> str:
+    message = f"Resultado del ejercicio '{exercise_id}':\n{VERDICT_MESSAGES.get(verdict, verdict)}"
+    if output and verdict != 'Accepted':
+        message += f"\n\n{output}"
+    return message
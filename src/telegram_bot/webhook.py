@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import subprocess
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, PlainTextResponse
+from starlette.routing import Route
+from telegram import Bot, Update
+from telegram.ext import Application
+
+from metrics import start_metrics_server_from_env
+from telegram_bot.fake_telegram import SECRET_TOKEN_HEADER
+
+logger = logging.getLogger(__name__)
+
+UpdateHandler = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class WebhookConfig:
+    url: str
+    host: str = "0.0.0.0"
+    port: int = 8443
+    path: str = "/telegram"
+    secret_token: str | None = None
+    workers: int = 1
+    certificate: str | None = None
+    private_key: str | None = None
+
+    @classmethod
+    def from_env(cls) -> "WebhookConfig":
+        """Read the webhook settings from WEBHOOK_* environment variables."""
+        url = os.getenv("WEBHOOK_URL")
+        if not url:
+            raise EnvironmentError("WEBHOOK_URL is not set.")
+        return cls(
+            url=url,
+            host=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+            port=int(os.getenv("WEBHOOK_PORT", "8443")),
+            path=os.getenv("WEBHOOK_PATH", "/telegram"),
+            secret_token=os.getenv("WEBHOOK_SECRET"),
+            workers=int(os.getenv("WEBHOOK_WORKERS", "1")),
+            certificate=os.getenv("WEBHOOK_CERT"),
+            private_key=os.getenv("WEBHOOK_KEY"),
+        )
+
+
+def generate_self_signed_certificate(certificate_path: str, private_key_path: str, common_name: str):
+    """Create a self-signed certificate with openssl; Telegram accepts it when uploaded with set_webhook."""
+    subprocess.run(
+        ["openssl", "req", "-newkey", "rsa:2048", "-sha256", "-nodes", "-x509", "-days", "365",
+         "-keyout", private_key_path, "-out", certificate_path, "-subj", f"/CN={common_name}"],
+        check=True, capture_output=True,
+    )
+
+
+def get_update_user_id(data: dict[str, Any]) -> int:
+    """User that sent a raw update, or 0 for updates without a sender (e.g. channel posts)."""
+    for value in data.values():
+        if isinstance(value, dict):
+            sender = value.get("from") or value.get("user")
+            if isinstance(sender, dict) and "id" in sender:
+                return int(sender["id"])
+    return 0
+
+
+class PerUserSerialExecutor:
+    def __init__(self, handler: UpdateHandler):
+        """
+        Runs updates of different users concurrently while keeping each user's updates in arrival order,
+        which the conversation handlers rely on.
+
+        Args:
+            handler: Coroutine function that processes one raw update.
+        """
+        self.handler = handler
+        self._pending: dict[int, deque] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    def submit(self, data: dict[str, Any]):
+        user_id = get_update_user_id(data)
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            pending.append(data)
+            return
+        self._pending[user_id] = deque([data])
+        self._tasks[user_id] = asyncio.create_task(self._drain(user_id))
+
+    async def _drain(self, user_id: int):
+        pending = self._pending[user_id]
+        try:
+            while pending:
+                data = pending.popleft()
+                try:
+                    await self.handler(data)
+                except Exception as e:
+                    logger.error(f"Error processing update {data.get('update_id')}: {e}", exc_info=True)
+        finally:
+            # No await between the last popleft and here, so no update can be appended in between
+            del self._pending[user_id]
+            del self._tasks[user_id]
+
+    async def join(self):
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+
+async def start_application(application: Application):
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+
+
+async def stop_application(application: Application):
+    if application.running:
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+def _application_update_handler(application: Application) -> UpdateHandler:
+    async def handle(data: dict[str, Any]):
+        await application.process_update(Update.de_json(data, application.bot))
+    return handle
+
+
+def create_webhook_app(submit: Callable[[dict[str, Any]], None], path: str, secret_token: str | None,
+                       on_startup: Callable[[], Awaitable[None]] | None = None,
+                       on_shutdown: Callable[[], Awaitable[None]] | None = None) -> Starlette:
+    """
+    ASGI app receiving Telegram updates. Updates are handed to `submit` and acknowledged right away,
+    so Telegram never waits for a handler to finish.
+    """
+    async def telegram_webhook(request: Request) -> Response:
+        if secret_token and request.headers.get(SECRET_TOKEN_HEADER) != secret_token:
+            return Response(status_code=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            return Response(status_code=400)
+        submit(data)
+        return Response(status_code=200)
+
+    async def health(_: Request) -> Response:
+        return PlainTextResponse("ok")
+
+    @asynccontextmanager
+    async def lifespan(_: Starlette):
+        if on_startup:
+            await on_startup()
+        try:
+            yield
+        finally:
+            if on_shutdown:
+                await on_shutdown()
+
+    return Starlette(
+        routes=[Route(path, telegram_webhook, methods=["POST"]), Route("/healthcheck", health, methods=["GET"])],
+        lifespan=lifespan,
+    )
+
+
+async def _register_webhook(bot: Bot, config: WebhookConfig):
+    certificate = open(config.certificate, "rb") if config.certificate else None
+    try:
+        await bot.set_webhook(url=config.url, secret_token=config.secret_token, certificate=certificate,
+                              allowed_updates=Update.ALL_TYPES)
+    finally:
+        if certificate:
+            certificate.close()
+
+
+def _run_shard(bot_factory: Callable[..., Any], index: int, updates: multiprocessing.Queue):
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve_shard(bot_factory, index, updates))
+
+
+async def _serve_shard(bot_factory: Callable[..., Any], index: int, updates: multiprocessing.Queue):
+    """Worker process: consumes the updates routed to it and processes them per user, in order."""
+    # The server process serves METRICS_PORT; each worker exposes its own metrics on the following ports
+    start_metrics_server_from_env(offset=index + 1)
+    # Background jobs (notifications, feedback) run in a single worker so nothing is sent twice
+    telegram_bot = bot_factory(background_tasks=index == 0)
+    await start_application(telegram_bot.app)
+    executor = PerUserSerialExecutor(_application_update_handler(telegram_bot.app))
+    loop = asyncio.get_running_loop()
+    try:
+        while (data := await loop.run_in_executor(None, updates.get)) is not None:
+            executor.submit(data)
+        await executor.join()
+    finally:
+        await stop_application(telegram_bot.app)
+
+
+def run_webhook_server(bot_factory: Callable[..., Any], config: WebhookConfig):
+    """
+    Serve the bot behind an ASGI webhook.
+
+    With one worker the application runs inside the server process. With several, the server only
+    receives updates and routes each user to a fixed worker process (user id modulo workers), which
+    spreads the load while keeping every user's updates in order.
+
+    Args:
+        bot_factory: Callable returning a TelegramBot; called with background_tasks=... in each worker.
+        config (WebhookConfig): Webhook settings.
+    """
+    if config.workers <= 1:
+        telegram_bot = bot_factory()
+        executor = PerUserSerialExecutor(_application_update_handler(telegram_bot.app))
+
+        async def on_startup():
+            await start_application(telegram_bot.app)
+            await _register_webhook(telegram_bot.app.bot, config)
+
+        async def on_shutdown():
+            await executor.join()
+            await stop_application(telegram_bot.app)
+
+        app = create_webhook_app(executor.submit, config.path, config.secret_token, on_startup, on_shutdown)
+    else:
+        context = multiprocessing.get_context("spawn")
+        queues = [context.Queue() for _ in range(config.workers)]
+        shards = [context.Process(target=_run_shard, args=(bot_factory, index, queue))
+                  for index, queue in enumerate(queues)]
+        bot = Bot(os.getenv("TELEGRAM_BOT_TOKEN"))
+
+        def submit(data: dict[str, Any]):
+            queues[get_update_user_id(data) % config.workers].put(data)
+
+        async def on_startup():
+            for shard in shards:
+                shard.start()
+            async with bot:
+                await _register_webhook(bot, config)
+
+        async def on_shutdown():
+            for queue in queues:
+                queue.put(None)
+            for shard in shards:
+                await asyncio.to_thread(shard.join)
+
+        app = create_webhook_app(submit, config.path, config.secret_token, on_startup, on_shutdown)
+
+    uvicorn.run(app, host=config.host, port=config.port,
+                ssl_certfile=config.certificate, ssl_keyfile=config.private_key)
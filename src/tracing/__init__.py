@@ -0,0 +1,2 @@
+from tracing.tracer import Span, Tracer, SpanExporter, InMemoryExporter, JsonLinesExporter, LatencyStatsExporter, \
+    get_tracer, traced, trace_methods
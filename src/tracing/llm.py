@@ -0,0 +1,127 @@
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.outputs import LLMResult
+
+from metrics import get_registry
+from tracing.tracer import get_tracer, Span
+
+EMBEDDING_CALLS = get_registry().counter("embedding_calls_total", "Calls to the embedding model")
+EMBEDDING_LATENCY = get_registry().histogram("embedding_latency_seconds", "Latency of embedding calls")
+LLM_CALLS = get_registry().counter("llm_calls_total", "Calls to the LLM", ("model", "status"))
+LLM_TOKENS = get_registry().counter("llm_tokens_total", "Tokens used by LLM calls", ("model", "direction"))
+LLM_LATENCY = get_registry().histogram("llm_latency_seconds", "Latency of LLM calls", ("model",),
+                                       buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60))
+RETRIEVAL_LATENCY = get_registry().histogram("retrieval_latency_seconds", "Latency of vector store searches")
+RETRIEVAL_DOCUMENTS = get_registry().histogram("retrieval_documents", "Documents returned per vector store search",
+                                               buckets=(0, 1, 2, 3, 5, 8, 10, 20))
+
+
+class TracedEmbeddings(Embeddings):
+    """Wraps an embedding model to record an `embedding` span and the embedding metrics per call."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    @staticmethod
+    def _record(span: Span):
+        EMBEDDING_CALLS.inc()
+        EMBEDDING_LATENCY.observe(span.duration_ms / 1000)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        with get_tracer().start_span("embedding", texts=len(texts)) as span:
+            vectors = self.embeddings.embed_documents(texts)
+        self._record(span)
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        with get_tracer().start_span("embedding", texts=1) as span:
+            vector = self.embeddings.embed_query(text)
+        self._record(span)
+        return vector
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        with get_tracer().start_span("embedding", texts=len(texts)) as span:
+            vectors = await self.embeddings.aembed_documents(texts)
+        self._record(span)
+        return vectors
+
+    async def aembed_query(self, text: str) -> list[float]:
+        with get_tracer().start_span("embedding", texts=1) as span:
+            vector = await self.embeddings.aembed_query(text)
+        self._record(span)
+        return vector
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback recording `llm` spans (with token counts) and `vector_search` spans for retrievers, along
+    with the matching LLM and retrieval metrics.
+    """
+
+    # Run in the caller's context so spans get the right parent
+    run_inline = True
+
+    def __init__(self):
+        self._spans: dict[UUID, Span] = {}
+
+    def _begin(self, run_id: UUID, name: str, **attributes):
+        self._spans[run_id] = get_tracer().begin(name, **attributes)
+
+    def _end(self, run_id: UUID, error: BaseException | None = None) -> Span | None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            get_tracer().end(span, error)
+        return span
+
+    def on_chat_model_start(self, serialized: dict[str, Any], messages, *, run_id: UUID, **kwargs):
+        self._begin(run_id, "llm", model=(kwargs.get("metadata") or {}).get("ls_model_name"))
+
+    def on_llm_start(self, serialized: dict[str, Any], prompts: list[str], *, run_id: UUID, **kwargs):
+        self._begin(run_id, "llm", model=(kwargs.get("metadata") or {}).get("ls_model_name"))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        span = self._spans.get(run_id)
+        if span is None:
+            return
+        input_tokens, output_tokens = self.token_usage(response)
+        span.set_attribute("input_tokens", input_tokens)
+        span.set_attribute("output_tokens", output_tokens)
+        self._end(run_id)
+        model = span.attributes.get("model") or "unknown"
+        LLM_CALLS.labels(model, "ok").inc()
+        LLM_TOKENS.labels(model, "input").inc(input_tokens)
+        LLM_TOKENS.labels(model, "output").inc(output_tokens)
+        LLM_LATENCY.labels(model).observe(span.duration_ms / 1000)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        span = self._end(run_id, error)
+        if span is not None:
+            LLM_CALLS.labels(span.attributes.get("model") or "unknown", "error").inc()
+
+    def on_retriever_start(self, serialized: dict[str, Any], query: str, *, run_id: UUID, **kwargs):
+        self._begin(run_id, "vector_search")
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs):
+        span = self._spans.get(run_id)
+        if span is None:
+            return
+        span.set_attribute("documents", len(documents))
+        self._end(run_id)
+        RETRIEVAL_LATENCY.observe(span.duration_ms / 1000)
+        RETRIEVAL_DOCUMENTS.observe(len(documents))
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._end(run_id, error)
+
+    @staticmethod
+    def token_usage(response: LLMResult) -> tuple[int, int]:
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        return input_tokens, output_tokens
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from types import FrameType
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)})"
+
+
+def _thread_stack(frame: FrameType | None) -> list[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    return stack[::-1]
+
+
+def _awaiting_stack(task: asyncio.Task) -> list[str]:
+    """Stack of a suspended task, following the chain of awaited coroutines down to the innermost one."""
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_name(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return stack
+
+
+class HandlerProfiler:
+    def __init__(self, handlers: set[str], output_dir: str, interval: float = 0.005):
+        """
+        Sampling profiler for selected update handlers. A thread samples every `interval` seconds each task
+        running a profiled handler: the loop thread's stack if the task is running, or the chain of awaited
+        coroutines (marked `[awaiting]`) if it is suspended, so the profile shows wall time, not only CPU.
+        Samples are written per handler as collapsed stacks, the input format of flamegraph.pl and speedscope.
+
+        Args:
+            handlers (set[str]): Names of the handlers to profile, or {"all"}.
+            output_dir (str): Folder for the `<handler>.folded` files.
+            interval (float): Seconds between samples.
+        """
+        self.handlers = handlers
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.samples: dict[str, Counter[str]] = {}
+        self._tasks: dict[asyncio.Task, str] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def wants(self, handler: str) -> bool:
+        return "all" in self.handlers or handler in self.handlers
+
+    @contextmanager
+    def profile(self, handler: str) -> Iterator[None]:
+        """Sample the current task while it runs the handler."""
+        task = asyncio.current_task()
+        if task is None:
+            yield
+            return
+        if self._thread is None:
+            self._start()
+        self._tasks[task] = handler
+        try:
+            yield
+        finally:
+            self._tasks.pop(task, None)
+
+    def _start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample_forever, name="handler-profiler", daemon=True)
+        self._thread.start()
+
+    def _sample_forever(self):
+        while not self._stopped.wait(self.interval):
+            running = asyncio.tasks._current_tasks.get(self._loop)
+            frame = sys._current_frames().get(self._loop_thread_id)
+            for task, handler in list(self._tasks.items()):
+                if task is running:
+                    stack = _thread_stack(frame)
+                else:
+                    stack = _awaiting_stack(task) + ["[awaiting]"]
+                self.samples.setdefault(handler, Counter())[";".join([handler, *stack])] += 1
+
+    def write(self):
+        """Write the samples collected so far, one collapsed-stack file per handler."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for handler, samples in list(self.samples.items()):
+            lines = [f"{stack} {count}" for stack, count in sorted(samples.items())]
+            (self.output_dir / f"{handler}.folded").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        logger.info(f"Handler profiles written to {self.output_dir}")
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
+
+
+_profiler: HandlerProfiler | None = None
+_profiler_loaded = False
+
+
+def get_profiler() -> HandlerProfiler | None:
+    """
+    Process-wide handler profiler, enabled by PROFILE_HANDLERS (comma-separated handler names or `all`).
+    Profiles go to PROFILE_OUTPUT_DIR (default ../data/profiles) every PROFILE_INTERVAL_MS (default 5).
+    """
+    global _profiler, _profiler_loaded
+    if not _profiler_loaded:
+        _profiler_loaded = True
+        if handlers := os.getenv("PROFILE_HANDLERS"):
+            _profiler = HandlerProfiler(
+                {handler.strip() for handler in handlers.split(",")},
+                os.getenv("PROFILE_OUTPUT_DIR", "../data/profiles"),
+                float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+            )
+    return _profiler
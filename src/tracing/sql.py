@@ -0,0 +1,26 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from tracing.tracer import get_tracer
+
+
+def instrument_sqlalchemy(engine: Engine):
+    """Record a `sql` span for every statement executed by the engine."""
+    tracer = get_tracer()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("tracing_spans", []).append(tracer.begin("sql", statement=statement[:200]))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("tracing_spans")
+        if spans:
+            tracer.end(spans.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        spans = connection.info.get("tracing_spans") if connection is not None else None
+        if spans:
+            tracer.end(spans.pop(), exception_context.original_exception)
@@ -0,0 +1,228 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_time", "end_time", "attributes", "error",
+                 "_started")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: dict[str, Any] | None = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_time = time.time()
+        self.end_time: float | None = None
+        self.attributes = attributes or {}
+        self.error: str | None = None
+        self._started = time.perf_counter()
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_time - self.start_time) * 1000 if self.end_time else 0.0
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.end_time = self.start_time + (time.perf_counter() - self._started)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, span: Span):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class InMemoryExporter(SpanExporter):
+    """Keeps finished spans in a list, for tests."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+
+class JsonLinesExporter(SpanExporter):
+    def __init__(self, path: str, flush_every: int = 100):
+        """
+        Appends one JSON object per finished span to a file.
+
+        Args:
+            path (str): Output file.
+            flush_every (int): Spans buffered before writing them to disk.
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer: list[str] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str, ensure_ascii=False)
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.flush_every:
+                self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("\n".join(self._buffer) + "\n")
+        self._buffer.clear()
+
+    def shutdown(self):
+        with self._lock:
+            self._flush()
+
+
+class LatencyStatsExporter(SpanExporter):
+    """Keeps the latest durations per span name to report latency percentiles per stage."""
+
+    def __init__(self, samples_per_stage: int = 2048):
+        self._durations: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=samples_per_stage))
+
+    def export(self, span: Span):
+        self._durations[span.name].append(span.duration_ms)
+
+    def percentiles(self, fractions: tuple[float, ...] = (0.5, 0.95, 0.99)) -> dict[str, dict[str, float]]:
+        report = {}
+        for name, durations in list(self._durations.items()):
+            ordered = sorted(durations)
+            if not ordered:
+                continue
+            report[name] = {"count": len(ordered)}
+            for fraction in fractions:
+                index = min(len(ordered) - 1, int(fraction * len(ordered)))
+                report[name][f"p{round(fraction * 100)}"] = ordered[index]
+        return report
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, exporters: list[SpanExporter] | None = None):
+        """
+        Creates spans and hands them to the exporters when they finish. The current span lives in a
+        context variable, so it follows asyncio tasks and `asyncio.to_thread` calls.
+
+        Args:
+            exporters (list[SpanExporter]): Where finished spans go, besides the latency statistics.
+        """
+        self.stats = LatencyStatsExporter()
+        self.exporters: list[SpanExporter] = [self.stats, *(exporters or [])]
+
+    def add_exporter(self, exporter: SpanExporter):
+        self.exporters.append(exporter)
+
+    @staticmethod
+    def current_span() -> Span | None:
+        return _current_span.get()
+
+    def begin(self, name: str, parent: Span | None = None, **attributes) -> Span:
+        """Start a span without making it current, for callbacks that cannot wrap the work they observe."""
+        parent = parent or _current_span.get()
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        return Span(name, trace_id, parent.span_id if parent else None, attributes)
+
+    def end(self, span: Span, error: BaseException | None = None):
+        span.finish()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    @contextmanager
+    def start_span(self, name: str, **attributes) -> Iterator[Span]:
+        span = self.begin(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end(span, e)
+            raise
+        else:
+            self.end(span)
+        finally:
+            _current_span.reset(token)
+
+    def shutdown(self):
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+
+_tracer: Tracer | None = None
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer. Spans are also written to TRACE_EXPORT_PATH as JSON lines when it is set."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+        if path := os.getenv("TRACE_EXPORT_PATH"):
+            _tracer.add_exporter(JsonLinesExporter(path))
+    return _tracer
+
+
+def trace_methods(prefix: str):
+    """Class decorator recording a span around every public method, named `<prefix>.<Class>.<method>`."""
+
+    def decorator(cls):
+        for attr_name, attr_value in list(cls.__dict__.items()):
+            if callable(attr_value) and not attr_name.startswith("_"):
+                setattr(cls, attr_name, traced(f"{prefix}.{cls.__name__}.{attr_name}")(attr_value))
+        return cls
+
+    return decorator
+
+
+def traced(name: str | None = None) -> Callable:
+    """Decorator recording a span around each call of a sync or async function."""
+
+    def decorator(function: Callable) -> Callable:
+        span_name = name or function.__qualname__
+
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with get_tracer().start_span(span_name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with get_tracer().start_span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorator
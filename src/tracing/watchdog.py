@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+LOOP_BLOCKED = get_registry().histogram("event_loop_blocked_seconds", "Duration of event loop blocks over the threshold",
+                                        buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float, interval: float | None = None, samples: int = 10000):
+        """
+        Detects when the event loop stops running callbacks for longer than `threshold` seconds. A task on the
+        loop updates a heartbeat; a thread checks it and logs the loop thread's stack while it is blocked. Each
+        heartbeat also records its lag, how much later than `interval` it woke up, the time the loop spent
+        running code that did not yield.
+
+        Args:
+            threshold (float): Seconds without a heartbeat reported as a block.
+            interval (float): Seconds between heartbeats and checks (default a quarter of the threshold).
+            samples (int): Latest heartbeat lags kept.
+        """
+        self.threshold = threshold
+        self.interval = interval or threshold / 4
+        self.blocks = 0
+        self.lags: deque[float] = deque(maxlen=samples)
+        self.lagged_seconds = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start watching the running loop."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        self._stopped.clear()
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _beat(self):
+        while True:
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._heartbeat - self.interval)
+            self.lags.append(lag)
+            self.lagged_seconds += lag
+
+    def _watch(self):
+        blocked_since = None
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat
+            if stalled > self.threshold + self.interval:
+                if blocked_since != heartbeat:
+                    # First check of this block: the stack shows what is holding the loop
+                    blocked_since = heartbeat
+                    self.blocks += 1
+                    logger.warning(f"Event loop blocked for {stalled * 1000:.0f} ms at:\n{self._loop_stack()}")
+            elif blocked_since is not None:
+                blocked = heartbeat - blocked_since - self.interval
+                LOOP_BLOCKED.observe(blocked)
+                logger.warning(f"Event loop unblocked after {blocked * 1000:.0f} ms")
+                blocked_since = None
+
+    def _loop_stack(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        return "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>"
+
+
+def create_watchdog_from_env() -> LoopWatchdog | None:
+    """Watchdog enabled by LOOP_WATCHDOG_MS, the block duration worth reporting."""
+    threshold = os.getenv("LOOP_WATCHDOG_MS")
+    return LoopWatchdog(float(threshold) / 1000) if threshold else None
@@ -0,0 +1,46 @@
+"""
+Export the Chroma store of the course PDFs to a single snapshot file, or load one, so new bot instances and
+replicas start from the snapshot instead of the Chroma directory or re-embedding the corpus. The bot memory-maps
+VECTOR_SNAPSHOT_PATH when it exists; re-export after re-indexing.
+
+    python vector_snapshot.py export --path ../data/vector_store.snap
+    python vector_snapshot.py inspect --path ../data/vector_store.snap
+    python vector_snapshot.py import --path ../data/vector_store.snap
+"""
+import argparse
+import json
+import time
+
+from rag.snapshot import VectorSnapshot
+from rag.utils import get_vector_database, snapshot_path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("export", "inspect", "import"),
+                        help="write the snapshot from Chroma, check and describe it, or load it into Chroma")
+    parser.add_argument("--path", default=snapshot_path, help="snapshot file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == "export":
+        start = time.perf_counter()
+        manifest = get_vector_database().export_snapshot(args.path)
+        print(f"Exported {manifest['count']} chunks ({manifest['dimensions']} dimensions) to {args.path} "
+              f"in {time.perf_counter() - start:.1f}s.")
+    elif args.command == "inspect":
+        start = time.perf_counter()
+        snapshot = VectorSnapshot(args.path, verify=True)
+        seconds = time.perf_counter() - start
+        manifest = {key: value for key, value in snapshot.manifest.items() if key != "sections"}
+        print(json.dumps(manifest, indent=2))
+        print(f"Checksums verified, loaded in {seconds * 1000:.1f} ms.")
+    else:
+        imported = get_vector_database().import_snapshot(args.path)
+        print(f"Imported {imported} chunks into the Chroma store.")
+
+
+if __name__ == "__main__":
+    main()